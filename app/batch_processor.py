@@ -0,0 +1,436 @@
+# app/batch_processor.py
+
+import contextlib
+import importlib.util
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from app import stats
+from app.file_processor import extract_to_file, partial_path, process_file
+from app.file_handlers.ocr_utils import configure_ocr, get_ocr_settings
+from app.file_handlers.pdf_backends import configure_pdf_backend, get_pdf_backend
+
+# --- Safely import the per-file limits from config ---
+try:
+    from app.config_manager import FILE_TIMEOUT, FILE_MAX_MEMORY_MB
+except ImportError:
+    FILE_TIMEOUT, FILE_MAX_MEMORY_MB = None, None
+
+# Set inside each worker process by _init_worker. Workers push ("step", 1) per
+# page/slide and ("grow", n) when a document's real page count is known, so
+# the parent can drive its progress bar. With a task id, they also push
+# ("start", (task, pid)) when they pick a file up, so the parent can hold
+# them to the per-file limits.
+_progress_queue = None
+
+
+def default_jobs():
+    """Returns the default number of worker processes (one per CPU core)."""
+    return os.cpu_count() or 1
+
+
+def _init_worker(progress_queue, ocr_settings, pdf_backend, jobs, preload=False):
+    """
+    Pool initializer: remembers the parent's progress queue in this worker and
+    applies the parent's OCR settings and PDF backend. Unless set explicitly, the CPU cores are
+    split between the workers' OCR threads instead of each worker using all of them.
+    With preload, the handlers are imported right away rather than on first use.
+    """
+    global _progress_queue
+    _progress_queue = progress_queue
+    configure_ocr(**ocr_settings)
+    configure_pdf_backend(pdf_backend)
+    if not ocr_settings.get("workers"):
+        configure_ocr(workers=max(1, default_jobs() // jobs))
+    if preload:
+        from app.file_handlers import image_handler, pdf_handler, pptx_handler
+
+
+def _report_step():
+    """Per-page callback used inside workers."""
+    _progress_queue.put(("step", 1))
+
+
+def _report_growth(extra_steps):
+    """Total-steps callback used inside workers."""
+    _progress_queue.put(("grow", extra_steps))
+
+
+def _process_in_worker(file_path, ocr_flags, output_path=None, task=None):
+    """
+    Entry point executed in a worker process for a single file.
+    Returns the text (or, with output_path, what extract_to_file returns)
+    together with the counters and timings collected while processing it.
+    """
+    # Without a progress queue (see create_pool), nobody is listening for progress
+    callback, total_callback = (_report_step, _report_growth) if _progress_queue else (None, None)
+    if task is not None and _progress_queue:
+        _progress_queue.put(("start", (task, os.getpid())))
+    if output_path:
+        result = extract_to_file(file_path, output_path, *ocr_flags, callback=callback, total_callback=total_callback)
+    else:
+        result = process_file(file_path, *ocr_flags, callback=callback, total_callback=total_callback)
+    return result, stats.collect()
+
+
+def _unpack_result(future, keep_file_timings=True):
+    """Returns a worker's result and merges its counters and timings into this process."""
+    result, collected = future.result()
+    stats.merge(collected, files=keep_file_timings)
+    return result
+
+
+def _new_pool(jobs, progress_queue, preload=False):
+    return ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(progress_queue, get_ocr_settings(), get_pdf_backend(), jobs, preload)
+    )
+
+
+def create_pool(jobs=None, preload=True):
+    """
+    Creates a long-lived pool of worker processes, set up like the ones used by
+    process_files, for callers that submit files one at a time (e.g. the server).
+    Use extract_in_pool to run files on it. No progress is reported.
+    """
+    return _new_pool(jobs or default_jobs(), None, preload=preload)
+
+
+def extract_in_pool(pool, file_path, trigger_ocr=False, ocr_mix=False, ocr_smart=False):
+    """
+    Runs process_file for one file on a pool from create_pool and returns its
+    text (None if it could not be processed). Blocks until the file is done.
+    Raises BrokenProcessPool if a worker crashed; the pool must then be replaced.
+    """
+    future = pool.submit(_process_in_worker, file_path, (trigger_ocr, ocr_mix, ocr_smart))
+    # Long-lived callers would otherwise keep timings for every file they ever sent
+    return _unpack_result(future, keep_file_timings=False)
+
+
+class LimitExceeded(Exception):
+    """A file ran longer or used more memory than allowed, so its worker was stopped."""
+
+
+def _drain_progress(progress_queue, callback, total_callback, started=None):
+    """
+    Forwards every progress message received from the workers to the callbacks.
+    "start" messages are noted in started as task -> (worker pid, start time).
+    """
+    while True:
+        try:
+            kind, value = progress_queue.get_nowait()
+        except queue.Empty:
+            return
+        if kind == "step" and callback:
+            callback()
+        elif kind == "grow" and total_callback:
+            total_callback(value)
+        elif kind == "start" and started is not None:
+            task, pid = value
+            started[task] = (pid, time.monotonic())
+
+
+_has_proc = os.path.isdir("/proc/self/task")
+_has_psutil = None
+
+
+def _process_tree(pid):
+    """
+    Returns psutil processes (or, on Linux, pids) for a worker and everything
+    it started, such as Tesseract or pdftoppm. None if they can't be listed here.
+    """
+    global _has_psutil
+    if _has_proc:
+        pids = [pid]
+        for current in pids:
+            # Children are listed per thread, and OCR runs tools from several threads
+            with contextlib.suppress(OSError, ValueError):
+                for thread in os.listdir(f"/proc/{current}/task"):
+                    with open(f"/proc/{current}/task/{thread}/children", "r") as f:
+                        pids.extend(int(child) for child in f.read().split())
+        return pids
+    if _has_psutil is None:
+        _has_psutil = importlib.util.find_spec("psutil") is not None
+    if not _has_psutil:
+        return None
+    import psutil
+    try:
+        process = psutil.Process(pid)
+        return [process] + process.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+def _memory_mb(pid):
+    """Resident memory of a worker and the tools it runs, in MiB, or None if it can't be measured here."""
+    processes = _process_tree(pid)
+    if processes is None:
+        return None
+    total = 0
+    for process in processes:
+        with contextlib.suppress(Exception):  # The process may have just exited
+            if _has_proc:
+                with open(f"/proc/{process}/statm", "r") as f:
+                    total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+            else:
+                total += process.memory_info().rss
+    return total / 2**20
+
+
+def _kill_tree(pid):
+    """Kills a worker and the tools it runs, so a hung pdftoppm doesn't outlive it."""
+    for process in reversed(_process_tree(pid) or [pid]):
+        with contextlib.suppress(Exception):
+            if isinstance(process, int):
+                os.kill(process, getattr(signal, "SIGKILL", signal.SIGTERM))
+            else:
+                process.kill()
+
+
+def _enforce_limits(started, active, timeout, max_memory):
+    """
+    Kills the workers whose current file has run longer than timeout seconds,
+    or uses more than max_memory MiB. started is updated by _drain_progress;
+    tasks not in active have finished and are forgotten.
+    Returns {task: reason} for the files that were stopped.
+    """
+    stopped = {}
+    now = time.monotonic()
+    for task in list(started):
+        if task not in active:
+            del started[task]
+            continue
+        pid, start = started[task]
+        if timeout and now - start > timeout:
+            stopped[task] = f"took longer than {timeout:g} s"
+        elif max_memory:
+            used = _memory_mb(pid)
+            if used is not None and used > max_memory:
+                stopped[task] = f"used {used:.0f} MiB, over the {max_memory:g} MiB limit"
+    for task, reason in stopped.items():
+        logging.warning(f"Stopping worker {started[task][0]}: its file {reason}.")
+        _kill_tree(started.pop(task)[0])
+    return stopped
+
+
+def _remove_partial(output_path, pid):
+    """Deletes what a killed or crashed worker (pid) had written of output_path."""
+    if output_path and output_path != "-" and pid:
+        with contextlib.suppress(OSError):
+            os.remove(partial_path(output_path, pid))
+
+
+def _report_failure(file_path, error, callback):
+    """Records a file whose worker failed (or was stopped) so the rest of the batch can go on."""
+    if isinstance(error, LimitExceeded):
+        stats.increment("files_stopped")
+        print(f"\n❌ Stopped {os.path.basename(file_path)}: it {error}.", file=sys.stderr)
+    else:
+        print(f"\n❌ Worker failed while processing {os.path.basename(file_path)}.", file=sys.stderr)
+    logging.error(f"Worker failed while processing {file_path}: {error}")
+    # The file's remaining pages will never be reported, so at least mark it done.
+    if callback:
+        callback()
+    return None
+
+
+def _run_isolated(file_path, ocr_flags, output_path, progress_queue, callback, total_callback, task=None, timeout=None, max_memory=None):
+    """
+    Re-runs a single file in its own one-worker pool, held to the same limits.
+    Used after a worker crash to find out which file was responsible without
+    sacrificing its neighbours.
+    """
+    started, stopped = {}, {}
+    pid = None
+    with _new_pool(1, progress_queue) as solo:
+        future = solo.submit(_process_in_worker, file_path, ocr_flags, output_path, task)
+        while not future.done():
+            wait([future], timeout=0.1)
+            _drain_progress(progress_queue, callback, total_callback, started)
+            pid = started[task][0] if task in started else pid
+            if (timeout or max_memory) and not future.done():
+                stopped.update(_enforce_limits(started, {task}, timeout, max_memory))
+        _drain_progress(progress_queue, callback, total_callback, started)
+        pid = started[task][0] if task in started else pid
+        try:
+            return _unpack_result(future)
+        except Exception as e:
+            _remove_partial(output_path, pid)
+            return _report_failure(file_path, LimitExceeded(stopped[task]) if task in stopped else e, callback)
+
+
+def process_files(file_list, trigger_ocr=False, ocr_mix=False, ocr_smart=False, jobs=None, callback=None, total_callback=None, output_for=None,
+                  timeout=None, max_memory=None):
+    """
+    Runs process_file over many files using a pool of worker processes.
+    file_list can be any iterable; it is consumed as workers become free.
+
+    Yields (file_path, text) pairs in the same order as file_list, as soon as
+    each file and all files before it are finished. If output_for is given,
+    each file's text is instead streamed by its worker to output_for(file_path)
+    with extract_to_file, and its return value is yielded in place of the
+    text, so whole documents never travel between processes. The callback is invoked in
+    the calling thread once per page/slide processed by any worker, and
+    total_callback (see process_file) whenever a file's page count differs
+    from its count_steps estimate.
+    A file whose worker raises or crashes yields None instead of stopping the batch.
+
+    timeout (seconds) and max_memory (MiB) limit each file, defaulting to
+    FILE_TIMEOUT and FILE_MAX_MEMORY_MB. The worker of a file over a limit is
+    killed and the file yields None. With a limit, files always run in worker
+    processes, even with jobs=1.
+    """
+    jobs = jobs or default_jobs()
+    timeout = FILE_TIMEOUT if timeout is None else timeout
+    max_memory = FILE_MAX_MEMORY_MB if max_memory is None else max_memory
+    limited = bool(timeout or max_memory)
+    # file_list may be a lazy iterator (see scanner.scan_directory); look at
+    # its start to tell whether a pool is worth starting
+    file_iter = iter(file_list)
+    head = list(itertools.islice(file_iter, 2))
+    if not limited and (jobs <= 1 or len(head) <= 1):
+        for file_path in itertools.chain(head, file_iter):
+            if output_for:
+                result = extract_to_file(
+                    file_path, output_for(file_path), trigger_ocr, ocr_mix, ocr_smart,
+                    callback=callback, total_callback=total_callback,
+                )
+            else:
+                result = process_file(
+                    file_path, trigger_ocr, ocr_mix, ocr_smart, callback=callback, total_callback=total_callback
+                )
+            yield file_path, result
+        return
+
+    ocr_flags = (trigger_ocr, ocr_mix, ocr_smart)
+
+    progress_queue = multiprocessing.Queue()
+    # Only keep a small window of files submitted at a time so a crashed
+    # worker can only take a handful of queued files down with it.
+    window = jobs * 2
+    pending = enumerate(itertools.chain(head, file_iter))
+    retry = deque()  # Files to submit again because a stopped worker took the pool down
+    # Every submission gets its own task id, so a late "start" message from
+    # a worker of an earlier pool can't be mistaken for a new one
+    tasks = itertools.count()
+    paths = {}  # index -> file path, for files not yielded yet
+    in_flight = {}  # future -> (index, task)
+    started = {}  # task -> (worker pid, start time)
+    worker_pids = {}  # task -> worker pid, for files in flight
+    stopped = {}  # index -> why the file was stopped
+    output_paths = {}
+    results = {}  # index -> result, for files that finished ahead of their turn
+    next_index = 0
+
+    def drain():
+        _drain_progress(progress_queue, callback, total_callback, started)
+        worker_pids.update((task, pid) for task, (pid, _) in started.items())
+
+    def discard_partial(index, task):
+        """A file's worker was killed or crashed: remove what it wrote, since a retry or rerun starts afresh."""
+        _remove_partial(output_paths[index], worker_pids.pop(task, None))
+
+    def check_limits(done=()):
+        if not limited:
+            return
+        active = {task: index for future, (index, task) in in_flight.items() if future not in done}
+        stopped_now = _enforce_limits(started, active, timeout, max_memory)
+        for task, reason in stopped_now.items():
+            stopped[active[task]] = reason
+        if stopped_now:
+            # The pool breaks with the stopped worker, and the executor ends the
+            # other workers too, but not the tools they started
+            for pid, _ in started.values():
+                _kill_tree(pid)
+
+    pool = _new_pool(jobs, progress_queue)
+    try:
+        while True:
+            while len(in_flight) < window:
+                if retry:
+                    index = retry.popleft()
+                else:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    index, file_path = item
+                    paths[index] = file_path
+                    output_paths[index] = output_for(file_path) if output_for else None
+                task = next(tasks)
+                future = pool.submit(_process_in_worker, paths[index], ocr_flags, output_paths[index], task)
+                in_flight[future] = (index, task)
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, timeout=0.1, return_when=FIRST_COMPLETED)
+            drain()
+            check_limits(done)
+
+            lost = []
+            for future in done:
+                index, task = in_flight.pop(future)
+                try:
+                    results[index] = _unpack_result(future)
+                    worker_pids.pop(task, None)
+                except BrokenProcessPool:
+                    discard_partial(index, task)
+                    lost.append(index)
+                except Exception as e:
+                    discard_partial(index, task)
+                    results[index] = _report_failure(paths[index], e, callback)
+
+            if lost or stopped:
+                # A worker died: stopped over a limit, or crashed (segfault, OOM
+                # kill...). The pool goes with it, and every in-flight file with the pool.
+                while not all(future.done() for future in in_flight):
+                    wait(in_flight, timeout=0.1)
+                    drain()
+                    check_limits()
+                drain()
+                for future, (index, task) in in_flight.items():
+                    try:
+                        results[index] = _unpack_result(future)  # Finished just in time
+                    except BrokenProcessPool:
+                        discard_partial(index, task)
+                        lost.append(index)
+                    except Exception as e:
+                        discard_partial(index, task)
+                        results[index] = _report_failure(paths[index], e, callback)
+                in_flight.clear()
+                started.clear()
+                worker_pids.clear()
+                pool.shutdown(wait=True)
+                for index, reason in stopped.items():
+                    if index in lost:
+                        lost.remove(index)
+                        results[index] = _report_failure(paths[index], LimitExceeded(reason), callback)
+                if stopped:
+                    # The stopped files explain the broken pool; the others just go again
+                    retry.extend(sorted(lost))
+                else:
+                    # Nobody knows which file crashed the worker, so retry each one on its own.
+                    logging.warning("A worker process crashed; retrying affected files individually.")
+                    for index in sorted(lost):
+                        results[index] = _run_isolated(
+                            paths[index], ocr_flags, output_paths[index], progress_queue, callback, total_callback,
+                            task=next(tasks), timeout=timeout, max_memory=max_memory,
+                        )
+                stopped.clear()
+                pool = _new_pool(jobs, progress_queue)
+
+            while next_index in results:
+                output_paths.pop(next_index, None)
+                yield paths.pop(next_index), results.pop(next_index)
+                next_index += 1
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        _drain_progress(progress_queue, callback, total_callback)
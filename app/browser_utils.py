@@ -16,6 +16,18 @@ from app.config_manager import (
     FIREFOX_BASED_BROWSER_PATH,
 )
 
+# --- Safely import the page load timeout from config ---
+try:
+    from app.config_manager import SCRAPE_PAGE_TIMEOUT
+except ImportError:
+    SCRAPE_PAGE_TIMEOUT = 30
+
+def _with_timeout(driver):
+    """Stops page loads that hang, so one slow page can't block a reused driver."""
+    if SCRAPE_PAGE_TIMEOUT:
+        driver.set_page_load_timeout(SCRAPE_PAGE_TIMEOUT)
+    return driver
+
 def get_driver():
     """
     Initializes and returns a web driver, providing specific, actionable errors.
@@ -38,7 +50,7 @@ def get_driver():
             chrome_options.add_argument("--headless")
             chrome_service = ChromeService(executable_path=CHROME_DRIVER_PATH)
             print("-> Initializing Chrome driver...")
-            return webdriver.Chrome(service=chrome_service, options=chrome_options), "chrome"
+            return _with_timeout(webdriver.Chrome(service=chrome_service, options=chrome_options)), "chrome"
         except Exception as e:
             # If it fails to start for another reason, we'll just let it fall through to try Firefox.
             logging.warning(f"Chrome found but failed to start: {e}")
@@ -61,7 +73,7 @@ def get_driver():
             firefox_options.add_argument("--headless")
             firefox_service = FirefoxService(executable_path=GECKO_DRIVER_PATH)
             print("-> Initializing Firefox driver...")
-            return webdriver.Firefox(service=firefox_service, options=firefox_options), "firefox"
+            return _with_timeout(webdriver.Firefox(service=firefox_service, options=firefox_options)), "firefox"
         except Exception as e:
             logging.warning(f"Firefox found but failed to start: {e}")
 
@@ -22,7 +22,160 @@ LOG_DIRECTORY = "logs"
 # The --debug flag will override this and log to both file and console.
 LOGS = False
 
+# --- Optional ---
+# Directory scans only pick up files TextNomNom can read (PDFs and decks, plus
+# images when OCR is on) and never enter 'extracted_texts' output folders.
+# SCAN_EXCLUDE: glob patterns of files and folders to always skip, e.g. ["node_modules", "*.bak.pdf"].
+# SCAN_MAX_DEPTH: how many folder levels to go into (None = no limit). --max-depth overrides it.
+SCAN_EXCLUDE = []
+SCAN_MAX_DEPTH = None
+
 # --- Optional ---
 # Define where scraped web content will be saved.
 # If this is set to None or is not defined, it will default to your system's Downloads folder.
 SCRAPED_FILES_DIR = None
+
+# --- Optional ---
+# Batch scraping (--urls) loads pages in SCRAPE_DRIVERS browsers at once (-j
+# overrides it). Each browser is reused for many pages and restarted if it crashes.
+# Pages that take longer than SCRAPE_PAGE_TIMEOUT seconds to load are skipped.
+SCRAPE_DRIVERS = 2
+SCRAPE_PAGE_TIMEOUT = 30
+
+# --- Optional ---
+# URLs are first fetched with a plain HTTP request, which is much faster than a
+# browser. PDFs and other documents are downloaded as they are, and the browser
+# is only used for pages that need JavaScript. Set SCRAPE_HTTP_FIRST = False to
+# always use the browser. HTTP_TIMEOUT is in seconds.
+SCRAPE_HTTP_FIRST = True
+HTTP_TIMEOUT = 20
+
+# --- Optional ---
+# How scraped pages are turned into Markdown. "full" keeps the whole page;
+# "article" (or --content article) keeps only its main content, without menus,
+# headers, footers, sidebars, forms or embedded media. Scripts and styles are dropped either way.
+SCRAPE_CONTENT = "full"
+
+# --- Optional ---
+# Crawl mode (--crawl DEPTH) fetches up to CRAWL_WORKERS pages at once (-j
+# overrides it) and waits at least CRAWL_DELAY seconds between requests to the
+# same host. Pages are saved under SCRAPED_FILES_DIR, in a folder named after the host.
+CRAWL_WORKERS = 4
+CRAWL_DELAY = 0.5
+
+# --- Optional ---
+# How PDF pages are rendered for OCR (--ocr / --ocr-mix).
+# OCR_DPI: resolution of the rendered pages. Lower is faster, higher is more accurate.
+# OCR_GRAYSCALE: render pages without colour, which is smaller and faster to OCR.
+# OCR_RASTER_THREADS: number of pdftoppm processes used to render each batch.
+# OCR_RASTER_BATCH_SIZE: number of pages rendered per pdftoppm call.
+OCR_DPI = 200
+OCR_GRAYSCALE = True
+OCR_RASTER_THREADS = 1
+OCR_RASTER_BATCH_SIZE = 16
+
+# --- Optional ---
+# Tesseract settings used for all OCR (--lang, --psm, --oem and --osd override them).
+# OCR_LANG: language(s) to recognise, e.g. "eng" or "eng+deu". Their traineddata must be installed.
+# OCR_PSM: page segmentation mode (1-13). None uses Tesseract's default, 3 (automatic, no orientation detection).
+# OCR_OEM: OCR engine mode (0-3). None uses Tesseract's default.
+# OCR_OSD: detect the orientation and script of each image first (page mode 1). Slower, and
+# needs osd.traineddata; only used when OCR_PSM is None.
+OCR_LANG = "eng"
+OCR_PSM = None
+OCR_OEM = None
+OCR_OSD = False
+
+# --- Optional ---
+# Images are prepared before OCR (--no-ocr-preprocess turns this off): they are made
+# grayscale, scaled down to OCR_TARGET_DPI when their resolution is known and higher,
+# and to at most OCR_MAX_IMAGE_SIDE pixels on their longer side. Images smaller than
+# OCR_MIN_IMAGE_SIDE pixels on either side, and blank ones, are skipped.
+# OCR_BINARIZE: also make them black and white (--ocr-binarize), which can help with
+# shaded or coloured backgrounds.
+OCR_PREPROCESS = True
+OCR_TARGET_DPI = 300
+OCR_MAX_IMAGE_SIDE = 4000
+OCR_MIN_IMAGE_SIDE = 16
+OCR_BINARIZE = False
+
+# --- Optional ---
+# Which library reads the text layer of PDFs: "pdfium" (the pypdfium2 package),
+# "pdftotext" (Poppler), "pypdf2", or "auto" to use the fastest one installed.
+# PyPDF2 is always available; install pypdfium2 in the venv for much faster digital PDFs.
+PDF_BACKEND = "auto"
+
+# --- Optional ---
+# Number of pages/slides OCRed in parallel inside a single document.
+# If set to None, it defaults to the number of CPU cores, shared between the
+# --jobs worker processes when a directory is processed.
+OCR_WORKERS = None
+
+# --- Optional ---
+# Smart OCR (--ocr-smart) only OCRs PDF pages that contain images and either
+# have fewer than OCR_SMART_MIN_CHARS characters in their text layer or are
+# covered by images for at least OCR_SMART_MIN_IMAGE_COVERAGE (0.0 - 1.0) of their area.
+OCR_SMART_MIN_CHARS = 100
+OCR_SMART_MIN_IMAGE_COVERAGE = 0.5
+
+# --- Optional ---
+# OCR results are cached on disk, keyed by a hash of the image (or rendered page)
+# and the Tesseract settings, so unchanged scans are never OCRed twice.
+# If OCR_CACHE_DIR is None, it defaults to ~/.cache/textnomnom/ocr.
+# OCR_CACHE_MAX_MB caps the cache size; least recently used entries are evicted. Use None for no limit.
+OCR_CACHE_ENABLED = True
+OCR_CACHE_DIR = None
+OCR_CACHE_MAX_MB = 512
+
+# --- Optional ---
+# Directory runs keep a manifest of what was extracted so that re-runs only
+# process new or changed files (use --force to re-extract everything).
+# Outputs a re-run no longer produces (e.g. the per-file texts after switching to
+# --save-all, or the other way round) are deleted.
+# If MANIFEST_DIR is None, it is kept in 'extracted_texts/.textnomnom' inside the processed directory.
+MANIFEST_DIR = None
+
+# --- Optional ---
+# Limits for a single file in a directory run. A file still being extracted
+# after FILE_TIMEOUT seconds, or whose worker (with the tools it runs) uses
+# more than FILE_MAX_MEMORY_MB of RAM, is stopped and recorded as failed; the
+# rest of the batch goes on. None = no limit. --file-timeout and --max-memory override them.
+# Memory is checked on Linux, or anywhere with the 'psutil' package installed.
+FILE_TIMEOUT = None
+FILE_MAX_MEMORY_MB = None
+
+# --- Optional ---
+# Settings for the extraction server (--serve). SERVE_ADDRESS is 'HOST:PORT',
+# 'PORT' or 'unix:/path/to.sock'. SERVE_WORKERS worker processes extract
+# documents (None = CPU count); up to SERVE_MAX_QUEUE more requests wait for a
+# free worker before new ones are refused with HTTP 503.
+SERVE_ADDRESS = "127.0.0.1:8765"
+SERVE_WORKERS = None
+SERVE_MAX_QUEUE = 32
+SERVE_MAX_UPLOAD_MB = 200
+# /extract requests with {"path": ...} can only read files under SERVE_PATH_ROOT
+# (--serve-root). If it is None, they are only accepted while the server listens
+# on 127.0.0.1/localhost or a Unix socket, never from other machines.
+SERVE_PATH_ROOT = None
+# /scrape makes the server fetch any URL and save it under SCRAPED_FILES_DIR, so it
+# is also only accepted on 127.0.0.1/localhost or a Unix socket, unless
+# SERVE_REMOTE_SCRAPE = True (--serve-remote-scrape).
+SERVE_REMOTE_SCRAPE = False
+
+# --- Optional ---
+# --convert runs LibreOffice on batches of up to CONVERT_BATCH_SIZE files, with
+# CONVERT_INSTANCES soffice processes in parallel (None = up to 4, one per CPU
+# core; -j overrides it). A single soffice run is stopped after CONVERT_TIMEOUT seconds.
+CONVERT_INSTANCES = None
+CONVERT_BATCH_SIZE = 25
+CONVERT_TIMEOUT = 600
+
+# --- Optional ---
+# Legacy .ppt files are converted to .pptx before extraction. The converted
+# files are cached, keyed by the source's content, so unchanged files are never
+# converted twice and nothing is written next to the sources.
+# If CONVERSION_CACHE_DIR is None, it defaults to ~/.cache/textnomnom/conversions.
+# CONVERSION_CACHE_MAX_MB caps the cache size; least recently used files are evicted. Use None for no limit.
+CONVERSION_CACHE_ENABLED = True
+CONVERSION_CACHE_DIR = None
+CONVERSION_CACHE_MAX_MB = 1024
@@ -0,0 +1,273 @@
+# app/crawler.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import parse_qsl, unquote, urlencode, urljoin, urlsplit, urlunsplit
+
+from app import stats
+from app.html_content import html_to_markdown
+from app.http_fetch import fetch_page, page_title
+
+# --- Safely import the crawl settings from config ---
+try:
+    from app.config_manager import CRAWL_WORKERS, CRAWL_DELAY
+except ImportError:
+    CRAWL_WORKERS, CRAWL_DELAY = 4, 0.5
+
+STATE_FILE = ".crawl_state.json"
+INDEX_FILE = "crawl_index.md"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+SAVE_STATE_EVERY = 20  # pages
+
+
+def normalize_url(url):
+    """
+    Normalizes a URL so the same page is only crawled once: lower-case scheme
+    and host, no default port, no fragment, sorted query parameters and a
+    path of at least '/'.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def compile_pattern(pattern):
+    """
+    Compiles a robots.txt-style path pattern: it matches paths that start with
+    it, '*' matches anything and a trailing '$' anchors it to the end.
+    """
+    anchored = pattern.endswith("$")
+    body = pattern[:-1] if anchored else pattern
+    regex = ".*".join(re.escape(piece) for piece in body.split("*"))
+    return re.compile(regex + ("$" if anchored else ""))
+
+
+def _path_allowed(path, includes, excludes):
+    """A path is crawled if it matches an include pattern (if any are given) and no exclude pattern."""
+    if includes and not any(pattern.match(path) for pattern in includes):
+        return False
+    return not any(pattern.match(path) for pattern in excludes)
+
+
+def page_file_name(url, extension=".md"):
+    """
+    Maps a URL to a relative file path that mirrors the site's structure:
+    '/' -> 'index.md', '/docs/' -> 'docs/index.md', '/docs/a.html' -> 'docs/a.md'.
+    Query strings get a short hash so '?page=2' doesn't overwrite '?page=1'.
+    """
+    parts = urlsplit(url)
+    segments = [re.sub(r'[<>:"\\|?*]', "_", unquote(segment)) for segment in parts.path.split("/") if segment not in ("", ".", "..")]
+    if not segments or parts.path.endswith("/"):
+        segments.append("index")
+    stem, ext = os.path.splitext(segments[-1])
+    if ext.lower() in (".html", ".htm", ".php", ".asp", ".aspx"):
+        ext = ""
+    if parts.query:
+        stem += "_" + hashlib.sha256(parts.query.encode("utf-8")).hexdigest()[:8]
+    segments[-1] = stem + (extension if extension else ext)
+    return os.path.join(*segments)
+
+
+def _unique_name(name, url, taken):
+    """
+    Returns name, or a variant of it with a short hash of the URL if another
+    page already has it ('/docs/a.html' and '/docs/a' both map to 'docs/a.md').
+    """
+    stem, ext = os.path.splitext(name)
+    candidate, suffix = name, hashlib.sha256(url.encode("utf-8")).hexdigest()[:8]
+    n = 1
+    while os.path.normcase(candidate) in taken:
+        candidate = f"{stem}_{suffix}{ext}" if n == 1 else f"{stem}_{suffix}_{n}{ext}"
+        n += 1
+    return candidate
+
+
+class _HostThrottle:
+    """Spaces out requests to the same host by at least `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _load_state(state_path, start_url, depth):
+    """Returns the saved crawl state if it belongs to an unfinished crawl of the same start URL and depth."""
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("start") != start_url or state.get("depth") != depth or state.get("complete"):
+        return None
+    return state
+
+
+def _save_state(state_path, state):
+    """Writes the crawl state atomically, so an interrupted crawl can pick up from its frontier."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(state_path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(temp_path, state_path)
+
+
+def _write_index(output_dir, state):
+    """Writes a Markdown index of every saved page, in crawl order."""
+    lines = [f"# Crawl of {state['start']}", ""]
+    for url, page in state["done"].items():
+        if page.get("file"):
+            link = page["file"].replace(os.sep, "/").replace(" ", "%20")
+            lines.append(f"- [{page.get('title') or url}]({link}) — {url}")
+    with open(os.path.join(output_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def crawl(start_url, depth, output_dir, workers=None, delay=None, include=(), exclude=(), restart=False, callback=None):
+    """
+    Crawls a site from start_url, following links to the same host up to
+    `depth` links away, and saves every page as Markdown under output_dir
+    (documents such as PDFs are downloaded as they are). An index of the saved
+    pages is written to crawl_index.md.
+
+    Up to `workers` pages are fetched at once, with at least `delay` seconds
+    between requests to the same host. include/exclude are robots.txt-style
+    path patterns (see compile_pattern). URLs are normalized before being
+    deduplicated.
+
+    The frontier (pages still to visit), the pages done and the file name
+    given to each page are saved in .crawl_state.json as the crawl goes, so an
+    interrupted crawl resumes from there unless restart is set. callback(url, saved_path) is called after
+    each page. Returns the crawl state.
+    """
+    start_url = normalize_url(start_url)
+    host = urlsplit(start_url).netloc
+    workers = workers or CRAWL_WORKERS
+    throttle = _HostThrottle(CRAWL_DELAY if delay is None else delay)
+    includes = [compile_pattern(pattern) for pattern in include]
+    excludes = [compile_pattern(pattern) for pattern in exclude]
+
+    os.makedirs(output_dir, exist_ok=True)
+    state_path = os.path.join(output_dir, STATE_FILE)
+    state = None if restart else _load_state(state_path, start_url, depth)
+    if state:
+        print(f"-> Resuming crawl: {len(state['done'])} page(s) done, {len(state['frontier'])} queued.")
+    else:
+        state = {"start": start_url, "depth": depth, "done": {}, "frontier": [[start_url, 0]], "complete": False}
+    # url -> file name relative to output_dir. Names are given out under a lock
+    # so two pages never get the same file, and kept for a resumed crawl.
+    files = state.setdefault("files", {})
+    taken = {os.path.normcase(name) for name in files.values()}
+    names_lock = threading.Lock()
+    # Pages that were in flight when the crawl stopped are still in the frontier
+    seen = set(state["done"]) | {url for url, _ in state["frontier"]}
+    frontier = deque(state["frontier"])
+
+    def reserve(url, name):
+        """The path to save url's page at: its name from an earlier run, or name if no other page has it yet."""
+        with names_lock:
+            if url not in files:
+                files[url] = _unique_name(name, url, taken)
+                taken.add(os.path.normcase(files[url]))
+            path = os.path.join(output_dir, files[url])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def document_path(url, name):
+        relative = page_file_name(url, extension=None)
+        if not os.path.splitext(relative)[1]:
+            relative += os.path.splitext(name)[1]
+        return reserve(url, relative)
+
+    def visit(url):
+        """Runs in a crawl thread: fetches and saves one page. Returns (saved path, title, links)."""
+        throttle.wait(urlsplit(url).netloc)
+        # Named after the URL crawled, not the one it redirected to
+        fetched = fetch_page(url, output_dir, save_as=lambda final_url, name: document_path(url, name))
+        if fetched is None:
+            return None, None, []
+        kind, final_url, result = fetched
+        if kind == "document":
+            return result, os.path.basename(result), []
+
+        # Links first: the conversion drops the navigation they are often in
+        links = [urljoin(final_url, anchor["href"]) for anchor in result.find_all("a", href=True)]
+        title = page_title(result)
+        path = reserve(url, page_file_name(url))
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html_to_markdown(result))
+        return path, title, links
+
+    def add_links(links, link_depth):
+        for link in links:
+            parts = urlsplit(link)
+            if parts.scheme not in ("http", "https"):
+                continue
+            link = normalize_url(link)
+            if link in seen or urlsplit(link).netloc != host:
+                continue
+            if not _path_allowed(urlsplit(link).path, includes, excludes):
+                continue
+            seen.add(link)
+            frontier.append([link, link_depth])
+
+    in_flight = {}
+    since_save = 0
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crawl")
+    try:
+        while frontier or in_flight:
+            while frontier and len(in_flight) < workers:
+                url, url_depth = frontier.popleft()
+                in_flight[pool.submit(visit, url)] = (url, url_depth)
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, url_depth = in_flight.pop(future)
+                try:
+                    path, title, links = future.result()
+                except Exception as e:
+                    logging.error(f"Crawl: failed to save {url}: {e}")
+                    path, title, links = None, None, []
+                state["done"][url] = {
+                    "file": os.path.relpath(path, output_dir) if path else None,
+                    "title": title,
+                    "depth": url_depth,
+                }
+                stats.increment("crawl_pages" if path else "crawl_failures")
+                if url_depth < depth:
+                    add_links(links, url_depth + 1)
+                if callback:
+                    callback(url, path)
+
+            since_save += len(done)
+            if since_save >= SAVE_STATE_EVERY:
+                state["frontier"] = list(frontier) + [list(item) for item in in_flight.values()]
+                with names_lock:  # crawl threads add to state["files"]
+                    _save_state(state_path, state)
+                since_save = 0
+        state["complete"] = True
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        state["frontier"] = list(frontier) + [list(item) for item in in_flight.values()]
+        _save_state(state_path, state)
+        _write_index(output_dir, state)
+    return state
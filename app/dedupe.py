@@ -0,0 +1,45 @@
+# app/dedupe.py
+
+import os
+
+from app.hashing import file_digest
+
+
+class DuplicateFinder:
+    """
+    Spots byte-identical input files as a directory is scanned. A file is only
+    hashed once another file of the same size has turned up, so a tree without
+    same-sized files is never hashed at all.
+    """
+
+    def __init__(self):
+        self.first_of_size = {}  # size -> first file seen with that size
+        self.originals = {}  # content hash -> first file seen with that content
+        self.digests = {}  # file -> content hash, for the files hashed so far
+
+    def _hash(self, file_path):
+        if file_path not in self.digests:
+            digest = self.digests[file_path] = file_digest(file_path)
+            self.originals.setdefault(digest, file_path)
+        return self.digests[file_path]
+
+    def original_of(self, file_path, size=None, digest=None):
+        """
+        Returns the first file seen with the same content as file_path, or None
+        if it is the first one. digest can be passed when it is already known
+        (e.g. from the manifest), so the file isn't read again.
+        """
+        size = os.path.getsize(file_path) if size is None else size
+        if digest is not None and file_path not in self.digests:
+            self.digests[file_path] = digest
+            self.originals.setdefault(digest, file_path)
+        first = self.first_of_size.setdefault(size, file_path)
+        if first == file_path:
+            return None
+        self._hash(first)
+        original = self.originals.get(self._hash(file_path))
+        return None if original == file_path else original
+
+    def digest(self, file_path):
+        """The content hash of file_path if it was computed, else None."""
+        return self.digests.get(file_path)
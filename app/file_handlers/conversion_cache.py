@@ -0,0 +1,174 @@
+# app/file_handlers/conversion_cache.py
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from app.hashing import file_digest
+
+# --- Safely import the cache settings from config ---
+try:
+    from app.config_manager import CONVERSION_CACHE_DIR
+except ImportError:
+    CONVERSION_CACHE_DIR = None
+
+try:
+    from app.config_manager import CONVERSION_CACHE_MAX_MB
+except ImportError:
+    CONVERSION_CACHE_MAX_MB = 1024
+
+_lock = threading.Lock()
+
+
+def get_cache_directory():
+    """
+    Determines where converted intermediates (e.g. .ppt -> .pptx) are cached.
+
+    Uses the path from config if it's set, otherwise defaults to
+    ~/.cache/textnomnom/conversions.
+    """
+    if CONVERSION_CACHE_DIR:
+        return CONVERSION_CACHE_DIR
+    return os.path.join(Path.home(), ".cache", "textnomnom", "conversions")
+
+
+def _index_path(source_path):
+    name = hashlib.sha256(os.path.abspath(source_path).encode("utf-8")).hexdigest()
+    return os.path.join(get_cache_directory(), "index", name[:2], f"{name}.json")
+
+
+def source_digest(source_path):
+    """
+    Returns the content hash of a source file. The hash is remembered per path
+    along with the file's size and mtime, so unchanged sources aren't re-read.
+    """
+    stat = os.stat(source_path)
+    index_path = _index_path(source_path)
+    with contextlib.suppress(OSError, ValueError):
+        with open(index_path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry["sha256"]
+
+    digest = file_digest(source_path)
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(index_path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest}, f)
+        os.replace(temp_path, index_path)
+    except OSError as e:
+        logging.warning(f"Could not update conversion cache index {index_path}: {e}")
+    return digest
+
+
+def _entry_path(digest, extension):
+    return os.path.join(get_cache_directory(), "files", digest[:2], f"{digest}{extension}")
+
+
+def get(digest, extension):
+    """Returns the cached converted file for a source's content hash, or None."""
+    path = _entry_path(digest, extension)
+    if not os.path.exists(path):
+        return None
+    # The modification time doubles as the "last used" time for eviction
+    with contextlib.suppress(OSError):
+        os.utime(path)
+    return path
+
+
+@contextlib.contextmanager
+def temporary_directory():
+    """A scratch directory inside the cache, so finished conversions can be moved in with a rename."""
+    parent = os.path.join(get_cache_directory(), "tmp")
+    os.makedirs(parent, exist_ok=True)
+    path = tempfile.mkdtemp(dir=parent)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def put(digest, converted_path):
+    """
+    Moves a freshly converted file into the cache and returns its new path,
+    evicting the least recently used entries if the cache grew past its limit,
+    along with the index entries that no longer lead to a cached file.
+    """
+    path = _entry_path(digest, os.path.splitext(converted_path)[1])
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.move(converted_path, path)
+    except OSError as e:
+        logging.warning(f"Could not store {converted_path} in the conversion cache: {e}")
+        return None
+    _evict_if_needed(keep=path)
+    _prune_index()
+    return path
+
+
+def _iter_entries():
+    """Yields (path, size, mtime) for every cached file."""
+    root = os.path.join(get_cache_directory(), "files")
+    if not os.path.isdir(root):
+        return
+    for bucket in os.scandir(root):
+        if not bucket.is_dir():
+            continue
+        for entry in os.scandir(bucket.path):
+            with contextlib.suppress(OSError):
+                stat = entry.stat()
+                yield entry.path, stat.st_size, stat.st_mtime
+
+
+def _evict_if_needed(keep=None):
+    """Deletes least recently used files until the cache is back under 90% of its limit."""
+    limit = (CONVERSION_CACHE_MAX_MB or 0) * 1024 * 1024
+    if not limit:
+        return
+    with _lock:
+        entries = sorted(_iter_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        if total <= limit:
+            return
+        removed = 0
+        for path, size, _ in entries:
+            if total <= limit * 0.9:
+                break
+            if path == keep:
+                continue
+            with contextlib.suppress(OSError):
+                os.remove(path)
+                total -= size
+                removed += 1
+        logging.info(f"Conversion cache: evicted {removed} least recently used files.")
+
+
+def _prune_index():
+    """Deletes source index entries whose converted file is gone (evicted, or never made because the conversion failed)."""
+    root = os.path.join(get_cache_directory(), "index")
+    if not os.path.isdir(root):
+        return
+    with _lock:
+        cached = {os.path.basename(path).split(".")[0] for path, _, _ in _iter_entries()}
+        removed = 0
+        for bucket in os.scandir(root):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if not entry.name.endswith(".json"):
+                    continue  # Still being written
+                with contextlib.suppress(OSError, ValueError, KeyError, TypeError):
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        digest = json.load(f)["sha256"]
+                    if digest not in cached:
+                        os.remove(entry.path)
+                        removed += 1
+        if removed:
+            logging.info(f"Conversion cache: removed {removed} index entries without a cached file.")
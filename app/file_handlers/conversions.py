@@ -2,15 +2,117 @@
 
 import logging
 import os
+import signal
 import subprocess
 import sys
 import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from multiprocessing.util import Finalize
+from pathlib import Path
+from queue import Queue
 
+from app import stats
+from app.file_handlers import conversion_cache
 
-def convert_ppt_to_pptx(ppt_path):
-    """Converts a .ppt file to .pptx using available tools."""
-    pptx_path = os.path.splitext(ppt_path)[0] + ".pptx"
-    temp_dir = os.path.dirname(ppt_path)
+# --- Safely import the conversion settings from config ---
+try:
+    from app.config_manager import CONVERT_INSTANCES, CONVERT_BATCH_SIZE, CONVERT_TIMEOUT
+except ImportError:
+    CONVERT_INSTANCES, CONVERT_BATCH_SIZE, CONVERT_TIMEOUT = None, 25, 600
+
+try:
+    from app.config_manager import CONVERSION_CACHE_ENABLED
+except ImportError:
+    CONVERSION_CACHE_ENABLED = True
+
+
+# LibreOffice profiles owned by this process, reused by its single-file conversions
+_profiles = {"pid": None}
+_profiles_lock = threading.Lock()
+
+
+@contextmanager
+def _process_profile():
+    """
+    Checks out a LibreOffice user profile that belongs to this process, so the
+    --jobs workers never share one (soffice locks its profile). Profiles are
+    reused by later runs and deleted when the process exits.
+    """
+    with _profiles_lock:
+        if _profiles["pid"] != os.getpid():  # First use, or inherited through fork
+            root = tempfile.mkdtemp(prefix="textnomnom_soffice_")
+            # Unlike atexit, also runs when a pool worker process exits
+            Finalize(None, shutil.rmtree, args=(root,), kwargs={"ignore_errors": True}, exitpriority=0)
+            _profiles.update(pid=os.getpid(), root=root, free=[], created=0)
+        if _profiles["free"]:
+            profile_dir = _profiles["free"].pop()
+        else:
+            profile_dir = os.path.join(_profiles["root"], f"profile-{_profiles['created']}")
+            _profiles["created"] += 1
+    try:
+        yield profile_dir
+    finally:
+        with _profiles_lock:
+            _profiles["free"].append(profile_dir)
+
+
+def _kill_process_group(process):
+    """Kills a process started with start_new_session, along with everything it started."""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except OSError:
+            pass
+    process.kill()
+
+
+def _run_soffice(paths, target_format, outdir, profile_dir=None):
+    """
+    Converts files with a single LibreOffice run. With profile_dir, the run uses
+    its own user profile so it can work alongside other soffice instances.
+    Returns {input_path: output_path or None}.
+    """
+    cmd = ["soffice"]
+    if profile_dir:
+        cmd.append(f"-env:UserInstallation={Path(profile_dir).as_uri()}")
+    cmd += ["--headless", "--norestore", "--convert-to", target_format, "--outdir", outdir] + list(paths)
+
+    started = time.time()
+    try:
+        with stats.timed("convert"):
+            # In its own session, so a timeout also stops the soffice.bin it starts
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                       start_new_session=True)
+            try:
+                stdout, stderr = process.communicate(timeout=CONVERT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                _kill_process_group(process)
+                process.communicate()
+                raise
+            if process.returncode:
+                raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+        # Some files may still have been converted before the failure
+        logging.error(f"LibreOffice conversion of {len(paths)} file(s) failed: {e}")
+
+    results = {}
+    for path in paths:
+        output = os.path.join(outdir, os.path.splitext(os.path.basename(path))[0] + "." + target_format)
+        # An output older than this run is left over from a previous conversion
+        fresh = os.path.exists(output) and os.path.getmtime(output) >= started - 1
+        results[path] = output if fresh else None
+    return results
+
+
+def convert_ppt_to_pptx(ppt_path, output_dir=None):
+    """Converts a .ppt file to .pptx using available tools, next to it unless output_dir is given."""
+    temp_dir = output_dir or os.path.dirname(ppt_path)
+    pptx_path = os.path.join(temp_dir, os.path.splitext(os.path.basename(ppt_path))[0] + ".pptx")
 
     # --- Logic for Windows ---
     if sys.platform == "win32":
@@ -18,9 +120,9 @@ def convert_ppt_to_pptx(ppt_path):
             # Import is placed here to avoid errors on non-Windows systems
             import win32com.client
             powerpoint = win32com.client.Dispatch("PowerPoint.Application")
-            deck = powerpoint.Presentations.Open(ppt_path)
+            deck = powerpoint.Presentations.Open(os.path.abspath(ppt_path))
             # Format 24 corresponds to .pptx
-            deck.SaveAs(pptx_path, 24)
+            deck.SaveAs(os.path.abspath(pptx_path), 24)
             deck.Close()
             powerpoint.Quit()
             logging.info("Successfully converted .ppt to .pptx using PowerPoint.")
@@ -33,22 +135,43 @@ def convert_ppt_to_pptx(ppt_path):
     if not shutil.which("soffice"):
         raise FileNotFoundError("LibreOffice is not installed or 'soffice' is not in your system's PATH. Cannot convert .ppt files.")
 
-    try:
-        cmd = ["soffice", "--headless", "--convert-to", "pptx", "--outdir", temp_dir, ppt_path]
-        subprocess.run(cmd, check=True, capture_output=True, text=True)
-        if os.path.exists(pptx_path):
-            logging.info(f"Converted {ppt_path} to {pptx_path} using LibreOffice.")
-            return pptx_path
-        else:
-            raise RuntimeError("LibreOffice conversion finished without creating an output file.")
-    except (subprocess.CalledProcessError, FileNotFoundError, RuntimeError) as e:
-        logging.error(f"LibreOffice conversion failed: {e}")
+    with _process_profile() as profile_dir:
+        converted = _run_soffice([ppt_path], "pptx", temp_dir, profile_dir)[ppt_path]
+    if converted:
+        logging.info(f"Converted {ppt_path} to {pptx_path} using LibreOffice.")
+        return pptx_path
 
     # If all methods fail
     logging.error(f"No suitable tool could convert .ppt file: {ppt_path}")
     return None
 
 
+def get_pptx_for_ppt(ppt_path):
+    """
+    Returns a .pptx version of a .ppt file for extraction, or None on failure.
+
+    Conversions are kept in the conversion cache, keyed by the source's content
+    hash (looked up through its path, size and mtime), so an unchanged .ppt is
+    only ever converted once. Nothing is written next to the source.
+    """
+    if not CONVERSION_CACHE_ENABLED:
+        return convert_ppt_to_pptx(ppt_path)
+
+    digest = conversion_cache.source_digest(ppt_path)
+    cached = conversion_cache.get(digest, ".pptx")
+    if cached:
+        stats.increment("conversion_cache_hits")
+        logging.info(f"Using cached .pptx for {ppt_path}: {cached}")
+        return cached
+
+    stats.increment("conversion_cache_misses")
+    with conversion_cache.temporary_directory() as temp_dir:
+        pptx_path = convert_ppt_to_pptx(ppt_path, output_dir=temp_dir)
+        if not pptx_path:
+            return None
+        return conversion_cache.put(digest, pptx_path)
+
+
 def convert_pptx_to_pdf(pptx_path):
     """Converts a .pptx file to .pdf using available tools."""
     pdf_path = os.path.splitext(pptx_path)[0] + ".pdf"
@@ -75,16 +198,104 @@ def convert_pptx_to_pdf(pptx_path):
     if not shutil.which("soffice"):
         raise FileNotFoundError("LibreOffice is not installed or 'soffice' is not in your system's PATH. Cannot convert .pptx files.")
 
-    try:
-        cmd = ["soffice", "--headless", "--convert-to", "pdf", "--outdir", temp_dir, pptx_path]
-        subprocess.run(cmd, check=True, capture_output=True, text=True)
-        if os.path.exists(pdf_path):
-            logging.info(f"Converted {pptx_path} to {pdf_path} using LibreOffice.")
-            return pdf_path
-        else:
-            raise RuntimeError("LibreOffice conversion finished without creating an output file.")
-    except (subprocess.CalledProcessError, FileNotFoundError, RuntimeError) as e:
-        logging.error(f"LibreOffice conversion failed: {e}")
+    with _process_profile() as profile_dir:
+        converted = _run_soffice([pptx_path], "pdf", temp_dir, profile_dir)[pptx_path]
+    if converted:
+        logging.info(f"Converted {pptx_path} to {pdf_path} using LibreOffice.")
+        return pdf_path
 
     logging.error(f"No suitable tool could convert .pptx file: {pptx_path}")
     return None
+
+
+def _conversion_batches(paths, batch_size):
+    """
+    Groups files into soffice runs: one output directory per run (it is shared
+    by every file in a run), at most batch_size files, and never two files that
+    would produce the same output name (e.g. 'deck.ppt' and 'deck.pptx').
+    """
+    by_dir = {}
+    for path in paths:
+        by_dir.setdefault(os.path.dirname(os.path.abspath(path)), []).append(path)
+    for outdir, dir_paths in by_dir.items():
+        batches = []
+        for path in dir_paths:
+            stem = os.path.splitext(os.path.basename(path))[0].lower()
+            batch = next((b for b in batches if len(b[1]) < batch_size and stem not in b[0]), None)
+            if batch is None:
+                batch = (set(), [])
+                batches.append(batch)
+            batch[0].add(stem)
+            batch[1].append(path)
+        for _, batch_paths in batches:
+            yield outdir, batch_paths
+
+
+def convert_files(paths, target_format="pdf", instances=None, batch_size=None, callback=None):
+    """
+    Converts many files at once, e.g. a directory of .ppt/.pptx decks to PDF.
+    Outputs are written next to their inputs.
+
+    On Linux/macOS, files are handed to LibreOffice in batches, with several
+    soffice instances running in parallel. Each instance gets its own
+    temporary user profile so they don't lock each other out. Legacy .ppt
+    files are converted straight to the target format. If a batch fails, its
+    unconverted files are retried one at a time. On Windows, each file is
+    converted with PowerPoint in turn.
+
+    callback is called once per file. Returns {input_path: output_path or None}.
+    """
+    if target_format != "pdf" and sys.platform == "win32":
+        raise ValueError("Only PDF conversion is supported on Windows.")
+
+    if sys.platform == "win32":
+        results = {}
+        for path in paths:
+            try:
+                results[path] = convert_pptx_to_pdf(path)  # PowerPoint opens .ppt files too
+            except FileNotFoundError as e:
+                logging.error(str(e))
+                results[path] = None
+            if callback:
+                callback()
+        return results
+
+    if not shutil.which("soffice"):
+        raise FileNotFoundError("LibreOffice is not installed or 'soffice' is not in your system's PATH. Cannot convert files.")
+
+    batches = list(_conversion_batches(paths, batch_size or CONVERT_BATCH_SIZE))
+    instances = max(1, min(instances or CONVERT_INSTANCES or min(4, os.cpu_count() or 1), len(batches) or 1))
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="textnomnom_soffice_") as temp_dir:
+        # Each running soffice instance checks out a profile and returns it when done
+        profiles = Queue()
+        for i in range(instances):
+            profiles.put(os.path.join(temp_dir, f"profile-{i}"))
+
+        def convert_batch(batch):
+            outdir, batch_paths = batch
+            profile_dir = profiles.get()
+            try:
+                batch_results = _run_soffice(batch_paths, target_format, outdir, profile_dir)
+                failed = [path for path, output in batch_results.items() if output is None]
+                if len(batch_paths) > 1 and failed:
+                    # One bad file can abort the whole run; give the others another go
+                    logging.warning(f"Retrying {len(failed)} file(s) of a failed batch one at a time.")
+                    for path in failed:
+                        batch_results.update(_run_soffice([path], target_format, outdir, profile_dir))
+                return batch_results
+            finally:
+                profiles.put(profile_dir)
+
+        with ThreadPoolExecutor(max_workers=instances, thread_name_prefix="soffice") as pool:
+            for future in as_completed([pool.submit(convert_batch, batch) for batch in batches]):
+                batch_results = future.result()
+                results.update(batch_results)
+                if callback:
+                    for _ in batch_results:
+                        callback()
+
+    converted = sum(1 for output in results.values() if output)
+    logging.info(f"Converted {converted} of {len(results)} file(s) to {target_format} using LibreOffice.")
+    return results
@@ -1,8 +1,8 @@
 # app/file_handlers/image_handler.py
 import logging
 import shutil
-from PIL import Image
-import pytesseract
+
+from app.file_handlers.ocr_utils import ocr_image
 
 def extract_text_from_image(file_path):
     """Extracts text from an image file using Tesseract OCR."""
@@ -11,7 +11,8 @@ def extract_text_from_image(file_path):
         raise FileNotFoundError("Tesseract is not installed or is not in your system's PATH. Cannot perform OCR on images.")
 
     try:
-        text = pytesseract.image_to_string(Image.open(file_path))
+        # Passed as a path: Tesseract reads the file itself unless it needs scaling down first
+        text = ocr_image(file_path)
         logging.info(f"Successfully extracted text from image: {file_path}")
         return text.strip()
     except Exception as e:
@@ -0,0 +1,134 @@
+# app/file_handlers/ocr_cache.py
+
+import contextlib
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+# --- Safely import the cache settings from config ---
+try:
+    from app.config_manager import OCR_CACHE_DIR
+except ImportError:
+    OCR_CACHE_DIR = None
+
+try:
+    from app.config_manager import OCR_CACHE_MAX_MB
+except ImportError:
+    OCR_CACHE_MAX_MB = 512
+
+# Other processes (e.g. the --jobs workers) write to the same cache, so each
+# one scans its real size again whenever it has itself written this fraction
+# of the limit since the last scan, or thinks the limit is reached. Together
+# they can only overshoot it by that fraction per process.
+RESCAN_FRACTION = 0.05
+
+_lock = threading.Lock()
+_cache_size = None  # Bytes used by the cache at the last scan, plus what this process wrote since
+_written_since_scan = 0
+
+
+def get_cache_directory():
+    """
+    Determines where OCR results are cached.
+
+    Uses the path from config if it's set, otherwise defaults to
+    ~/.cache/textnomnom/ocr.
+    """
+    if OCR_CACHE_DIR:
+        return OCR_CACHE_DIR
+    return os.path.join(Path.home(), ".cache", "textnomnom", "ocr")
+
+
+def make_key(*parts):
+    """Builds a cache key from the parts that determine an OCR result."""
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    return os.path.join(get_cache_directory(), key[:2], f"{key}.txt")
+
+
+def get(key):
+    """Returns the cached OCR text for a key, or None if it is not cached."""
+    path = _entry_path(key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    except OSError:
+        return None
+    # The modification time doubles as the "last used" time for eviction
+    with contextlib.suppress(OSError):
+        os.utime(path)
+    return text
+
+
+def put(key, text):
+    """Stores OCR text under a key, evicting the least recently used entries if needed."""
+    path = _entry_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        # Write to a temporary file first so other processes never read half an entry
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+        size = os.path.getsize(path)
+    except OSError as e:
+        logging.warning(f"Could not write OCR cache entry {path}: {e}")
+        return
+    _account(size - replaced)
+
+
+def _iter_entries():
+    """Yields (path, size, mtime) for every cache entry."""
+    root = get_cache_directory()
+    if not os.path.isdir(root):
+        return
+    for bucket in os.scandir(root):
+        if not bucket.is_dir():
+            continue
+        for entry in os.scandir(bucket.path):
+            if entry.name.endswith(".txt"):
+                with contextlib.suppress(OSError):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+
+def _account(added):
+    """Tracks the cache size and trims it back under the limit when it grows past it."""
+    global _cache_size, _written_since_scan
+    limit = (OCR_CACHE_MAX_MB or 0) * 1024 * 1024
+    with _lock:
+        _written_since_scan += max(added, 0)
+        if _cache_size is None or (limit and (_written_since_scan >= limit * RESCAN_FRACTION or _cache_size + added > limit)):
+            # Whether to evict is decided on the real size, which includes other processes' entries
+            _cache_size = sum(entry_size for _, entry_size, _ in _iter_entries())
+            _written_since_scan = 0
+        else:
+            _cache_size += added
+        if limit and _cache_size > limit:
+            # Evict down to 90% of the limit so we don't rescan on every write
+            _cache_size = _evict(limit * 0.9)
+
+
+def _evict(target_size):
+    """Deletes least recently used entries until the cache is at most target_size bytes."""
+    entries = sorted(_iter_entries(), key=lambda entry: entry[2])
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for path, size, _ in entries:
+        if total <= target_size:
+            break
+        with contextlib.suppress(OSError):
+            os.remove(path)
+            total -= size
+            removed += 1
+    logging.info(f"OCR cache: evicted {removed} least recently used entries.")
+    return total
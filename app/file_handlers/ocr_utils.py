@@ -0,0 +1,378 @@
+# app/file_handlers/ocr_utils.py
+
+import io
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app import stats
+from app.hashing import bytes_digest, file_digest
+from app.file_handlers import ocr_cache
+
+# --- Safely import the OCR settings from config ---
+try:
+    from app.config_manager import OCR_DPI, OCR_GRAYSCALE, OCR_RASTER_THREADS, OCR_RASTER_BATCH_SIZE
+except ImportError:
+    OCR_DPI, OCR_GRAYSCALE, OCR_RASTER_THREADS, OCR_RASTER_BATCH_SIZE = 200, True, 1, 16
+
+try:
+    from app.config_manager import OCR_WORKERS
+except ImportError:
+    OCR_WORKERS = None
+
+try:
+    from app.config_manager import OCR_CACHE_ENABLED
+except ImportError:
+    OCR_CACHE_ENABLED = True
+
+try:
+    from app.config_manager import OCR_LANG, OCR_PSM, OCR_OEM, OCR_OSD
+except ImportError:
+    OCR_LANG, OCR_PSM, OCR_OEM, OCR_OSD = "eng", None, None, False
+
+try:
+    from app.config_manager import OCR_PREPROCESS, OCR_TARGET_DPI, OCR_MAX_IMAGE_SIDE, OCR_MIN_IMAGE_SIDE, OCR_BINARIZE
+except ImportError:
+    OCR_PREPROCESS, OCR_TARGET_DPI, OCR_MAX_IMAGE_SIDE, OCR_MIN_IMAGE_SIDE, OCR_BINARIZE = True, 300, 4000, 16, False
+
+# Images whose gray levels vary less than this (standard deviation, 0-255) are
+# taken to be blank; a single line of text on a page is well above it
+BLANK_STDDEV = 2.0
+
+# Runtime OCR settings. They start from the config file and can be overridden
+# from the command line through configure_ocr.
+_settings = {
+    "workers": OCR_WORKERS, "cache": OCR_CACHE_ENABLED,
+    "lang": OCR_LANG, "psm": OCR_PSM, "oem": OCR_OEM, "osd": OCR_OSD,
+    "preprocess": OCR_PREPROCESS, "binarize": OCR_BINARIZE,
+}
+
+
+def configure_ocr(**settings):
+    """Overrides OCR settings for this process. Settings given as None are ignored."""
+    _settings.update({key: value for key, value in settings.items() if value is not None})
+
+
+def get_ocr_settings():
+    """Returns a copy of the current OCR settings, e.g. to hand to worker processes."""
+    return dict(_settings)
+
+
+def ocr_worker_count():
+    """Number of pages/slides to OCR in parallel within one document."""
+    return _settings["workers"] or os.cpu_count() or 1
+
+
+def _image_digest(image):
+    """Hashes an image given as a file path, raw bytes or PIL image."""
+    if isinstance(image, str):
+        return file_digest(image)
+    if isinstance(image, bytes):
+        return bytes_digest(image)
+    return bytes_digest(f"{image.mode}:{image.size}".encode() + image.tobytes())
+
+
+def _tesseract_config(dpi=None):
+    """The command line options passed to Tesseract."""
+    psm = _settings["psm"]
+    if psm is None and _settings["osd"]:
+        psm = 1
+    options = []
+    if psm is not None:
+        options.append(f"--psm {psm}")
+    if _settings["oem"] is not None:
+        options.append(f"--oem {_settings['oem']}")
+    if dpi:
+        options.append(f"--dpi {round(dpi)}")
+    return " ".join(options)
+
+
+def _tesseract_signature():
+    """Everything about the OCR engine, and how images are prepared for it, that can change its output, for cache keys."""
+    import pytesseract
+    signature = f"tesseract={pytesseract.get_tesseract_version()}:lang={_settings['lang']}:{_tesseract_config()}"
+    if _settings["preprocess"]:
+        signature += f":prepare={OCR_TARGET_DPI},{OCR_MAX_IMAGE_SIDE},{OCR_MIN_IMAGE_SIDE},{bool(_settings['binarize'])}"
+    return signature
+
+
+def page_cache_key(document_digest, page_num):
+    """Cache key for a rendered PDF page, so cached pages don't even need rendering."""
+    return ocr_cache.make_key(
+        "pdf-page", document_digest, page_num, OCR_DPI, OCR_GRAYSCALE, _tesseract_signature()
+    )
+
+
+def get_cached_ocr(cache_key):
+    """Returns cached OCR text for a key (None on a miss), counting hits and misses."""
+    text = ocr_cache.get(cache_key)
+    stats.increment("ocr_cache_hits" if text is not None else "ocr_cache_misses")
+    return text
+
+
+def cache_enabled():
+    """Whether OCR results should go through the on-disk cache."""
+    return bool(_settings["cache"])
+
+
+def _image_dpi(image):
+    """The resolution recorded in an image file, or None if there is none."""
+    dpi = image.info.get("dpi")
+    try:
+        dpi = float(dpi[0]) if isinstance(dpi, tuple) else float(dpi or 0)
+    except (TypeError, ValueError):
+        return None
+    # Some files record a resolution of 1 to mean "unknown"
+    return dpi if dpi >= 10 else None
+
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def _to_grayscale(image):
+    """Converts an image to 8-bit grayscale, flattening transparency onto white first."""
+    from PIL import Image
+
+    if _has_alpha(image):
+        rgba = image.convert("RGBA")
+        # Transparent pixels are usually black underneath, which would hide dark text
+        image = Image.new("RGBA", rgba.size, "white")
+        image.alpha_composite(rgba)
+    return image if image.mode == "L" else image.convert("L")
+
+
+def _binarize(image):
+    """Makes a grayscale image black and white, at the threshold Otsu's method picks from its histogram."""
+    histogram = image.histogram()
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    best_threshold, best_variance = 128, -1.0
+    background = weighted_background = 0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return image.point([0 if level <= best_threshold else 255 for level in range(256)])
+
+
+def prepare_image(image, dpi=None):
+    """
+    Gets an image, given as a file path, raw bytes or PIL image, ready for
+    Tesseract: grayscale, no larger than OCR_TARGET_DPI (when its resolution is
+    given or recorded in the file) or OCR_MAX_IMAGE_SIDE, and optionally black
+    and white. Returns (image, dpi) to hand to Tesseract; a file path is passed
+    through untouched when it needs no scaling, so Tesseract reads it directly.
+    Returns (None, None) for images too small or too blank to hold any text.
+    """
+    from PIL import Image
+
+    if isinstance(image, str):
+        # Closed afterwards, so a rendered page can be deleted as soon as it is OCRed
+        with Image.open(image) as opened:
+            prepared, dpi = _prepare_opened(opened, image, dpi)
+            return (prepared.copy() if prepared is opened else prepared), dpi
+    if isinstance(image, bytes):
+        return _prepare_opened(Image.open(io.BytesIO(image)), image, dpi)
+    return _prepare_opened(image, image, dpi)
+
+
+def _prepare_opened(image, source, dpi):
+    from PIL import Image, ImageStat
+
+    if min(image.size) < OCR_MIN_IMAGE_SIDE:
+        return None, None
+
+    dpi = dpi or _image_dpi(image)
+    scale = min(1.0, OCR_TARGET_DPI / dpi if dpi else 1.0, OCR_MAX_IMAGE_SIDE / max(image.size))
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    if scale < 1:
+        # JPEGs can be decoded straight to grayscale at a fraction of their size, which is much faster
+        image.draft("L", size)
+    flattened = _has_alpha(image)
+    gray = _to_grayscale(image)
+    if gray.size != size:
+        gray = gray.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    if ImageStat.Stat(gray).stddev[0] < BLANK_STDDEV:
+        return None, None
+    dpi = dpi * scale if dpi else None
+    if _settings["binarize"]:
+        return _binarize(gray), dpi
+    if scale == 1 and not flattened:
+        # Nothing Tesseract can't do itself; spare re-encoding the image
+        return (source if isinstance(source, str) else image), dpi
+    return gray, dpi
+
+
+def ocr_image(image, cache_key=None, check_cache=True, dpi=None):
+    """
+    Runs Tesseract on an image given as a file path, raw bytes or PIL image.
+    dpi is the image's resolution, when known (e.g. for rendered PDF pages).
+
+    Unless turned off, images go through prepare_image first; those it finds
+    too small or blank give an empty string without running Tesseract.
+    Results go through the on-disk OCR cache, keyed by cache_key or, if none
+    is given, by a hash of the image itself. Pass check_cache=False when the
+    caller has already looked the key up with get_cached_ocr.
+    """
+    if cache_enabled():
+        cache_key = cache_key or ocr_cache.make_key("image", _image_digest(image), _tesseract_signature())
+        if check_cache:
+            text = get_cached_ocr(cache_key)
+            if text is not None:
+                return text
+
+    # Imported here so that runs without OCR never load them
+    import pytesseract
+    from PIL import Image
+
+    if _settings["preprocess"]:
+        with stats.timed("ocr_prepare"):
+            image, dpi = prepare_image(image, dpi)
+    elif isinstance(image, bytes):
+        image = Image.open(io.BytesIO(image))
+
+    if image is None:
+        stats.increment("ocr_images_skipped")
+        text = ""
+    else:
+        with stats.timed("ocr"):
+            text = pytesseract.image_to_string(image, lang=_settings["lang"], config=_tesseract_config(dpi))
+
+    if cache_enabled():
+        ocr_cache.put(cache_key, text)
+    return text
+
+
+def check_pdf_ocr_dependencies():
+    """Proactive checks for Tesseract and Poppler, done once per document."""
+    if not shutil.which("tesseract"):
+        raise FileNotFoundError("Tesseract is not installed or not in PATH. OCR on PDFs is disabled.")
+    if not shutil.which("pdftoppm"):
+        raise FileNotFoundError("Poppler (pdftoppm) is not installed or not in PATH. OCR on PDFs is disabled.")
+
+
+def _page_batches(page_numbers, batch_size):
+    """Splits page numbers into runs of consecutive pages, at most batch_size long."""
+    batch = []
+    for page_num in page_numbers:
+        if batch and (page_num != batch[-1] + 1 or len(batch) >= batch_size):
+            yield batch
+            batch = []
+        batch.append(page_num)
+    if batch:
+        yield batch
+
+
+def iter_rasterized_pages(file_path, page_numbers, dpi=None, grayscale=None, thread_count=None, batch_size=None):
+    """
+    Renders the given PDF pages for OCR and yields (page_num, image_path) in order.
+
+    Pages are rendered in batches with a single pdftoppm run each, straight to
+    a temporary directory, and are never loaded into memory here. The caller
+    owns each yielded image file and should delete it once it has been OCRed;
+    the directory itself is removed when the generator finishes or is closed.
+    If a batch fails to render, its pages are yielded with image_path set to None.
+    """
+    from pdf2image import convert_from_path
+
+    dpi = dpi or OCR_DPI
+    grayscale = OCR_GRAYSCALE if grayscale is None else grayscale
+    thread_count = thread_count or OCR_RASTER_THREADS
+    batch_size = batch_size or OCR_RASTER_BATCH_SIZE
+
+    with tempfile.TemporaryDirectory(prefix="textnomnom_ocr_") as temp_dir:
+        for batch in _page_batches(page_numbers, batch_size):
+            # Each batch gets its own folder so pdf2image only picks up its own files
+            batch_dir = tempfile.mkdtemp(dir=temp_dir)
+            try:
+                with stats.timed("pdf_render"):
+                    image_paths = convert_from_path(
+                        file_path,
+                        dpi=dpi,
+                        grayscale=grayscale,
+                        first_page=batch[0],
+                        last_page=batch[-1],
+                        thread_count=thread_count,
+                        output_folder=batch_dir,
+                        paths_only=True,
+                    )
+            except Exception as e:
+                logging.warning(f"Rendering pages {batch[0]}-{batch[-1]} for OCR failed: {e}")
+                image_paths = []
+
+            if len(image_paths) != len(batch):
+                if image_paths:
+                    logging.warning(f"Expected {len(batch)} rendered pages but got {len(image_paths)}.")
+                image_paths = [None] * len(batch)
+
+            for page_num, image_path in zip(batch, image_paths):
+                yield page_num, image_path
+
+
+def map_in_order(func, items, on_done=None, max_workers=None):
+    """
+    Runs func over items on a pool of OCR threads and yields the results in input order.
+
+    Tesseract and Poppler do their work in separate processes, so threads are
+    enough to keep every core busy. Items are pulled from the iterable only as
+    room frees up, so lazily produced items (such as rendered pages) are not
+    all created up front, and at most 2 * max_workers of them are held at once.
+    on_done is called in the calling thread as soon as each item finishes,
+    which may be before earlier items are yielded.
+    """
+    max_workers = max_workers or ocr_worker_count()
+    if max_workers <= 1:
+        for item in items:
+            result = func(item)
+            if on_done:
+                on_done()
+            yield result
+        return
+
+    window = max_workers * 2
+    items = iter(items)
+    exhausted = False
+    in_flight = {}
+    results = {}  # index -> result, for items that finished ahead of their turn
+    submitted = next_index = 0
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ocr")
+    try:
+        while True:
+            # Counts finished items waiting for a slow earlier one, so they can't pile up
+            while not exhausted and submitted - next_index < window:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                in_flight[pool.submit(func, item)] = submitted
+                submitted += 1
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[in_flight.pop(future)] = future.result()
+                if on_done:
+                    on_done()
+
+            while next_index in results:
+                yield results.pop(next_index)
+                next_index += 1
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,156 @@
+# app/file_handlers/pdf_backends.py
+
+import codecs
+import contextlib
+import importlib.util
+import logging
+import shutil
+import subprocess
+
+from app import stats
+
+# --- Safely import the backend choice from config ---
+try:
+    from app.config_manager import PDF_BACKEND
+except ImportError:
+    PDF_BACKEND = "auto"
+
+# Runtime choice. Starts from the config file and can be overridden from the
+# command line through configure_pdf_backend.
+_settings = {"backend": PDF_BACKEND or "auto"}
+
+
+def _normalize(text):
+    """Gives every backend the same line endings."""
+    return text.replace("\r\n", "\n").replace("\r", "\n") if text else ""
+
+
+@contextlib.contextmanager
+def _open_pypdf2(file_path):
+    """Pure-Python fallback; always available."""
+    from PyPDF2 import PdfReader
+
+    with open(file_path, "rb") as f:
+        reader = PdfReader(f)
+        yield len(reader.pages), (_normalize(page.extract_text()) for page in reader.pages)
+
+
+@contextlib.contextmanager
+def _open_pdfium(file_path):
+    """pypdfium2 (PDFium's C++ text extraction), when the package is installed."""
+    import pypdfium2 as pdfium
+
+    document = pdfium.PdfDocument(file_path)
+
+    def texts():
+        # PDFium isn't thread-safe, so pages are read one at a time here and closed right away
+        for index in range(len(document)):
+            page = document[index]
+            text_page = page.get_textpage()
+            try:
+                yield _normalize(text_page.get_text_range())
+            finally:
+                text_page.close()
+                page.close()
+
+    try:
+        yield len(document), texts()
+    finally:
+        document.close()
+
+
+@contextlib.contextmanager
+def _open_pdftotext(file_path):
+    """Poppler's pdftotext, streamed page by page (pages are separated by form feeds)."""
+    from PyPDF2 import PdfReader
+
+    # pdftotext doesn't report the page count up front; PyPDF2 only parses the page tree for it
+    with open(file_path, "rb") as f:
+        page_count = len(PdfReader(f).pages)
+
+    process = subprocess.Popen(
+        ["pdftotext", "-q", "-enc", "UTF-8", file_path, "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+
+    def texts():
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending, emitted = "", 0
+        for chunk in iter(lambda: process.stdout.read(64 * 1024), b""):
+            pending += decoder.decode(chunk)
+            *pages, pending = pending.split("\f")
+            for text in pages:
+                emitted += 1
+                yield _normalize(text).rstrip("\n")
+        if process.wait() != 0:
+            raise RuntimeError(f"pdftotext exited with status {process.returncode}")
+        # Keep page numbers aligned even if trailing pages produced no output at all
+        for _ in range(emitted, page_count):
+            yield ""
+
+    try:
+        yield page_count, texts()
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+
+
+# Backends in order of preference for "auto": fastest first, PyPDF2 last
+BACKENDS = {
+    "pdfium": (_open_pdfium, lambda: importlib.util.find_spec("pypdfium2") is not None),
+    "pdftotext": (_open_pdftotext, lambda: shutil.which("pdftotext") is not None),
+    "pypdf2": (_open_pypdf2, lambda: True),
+}
+BACKEND_CHOICES = ["auto"] + list(BACKENDS)
+
+
+def configure_pdf_backend(name):
+    """Overrides the PDF text backend for this process. None is ignored."""
+    if name is None:
+        return
+    if name not in BACKEND_CHOICES:
+        raise ValueError(f"Unknown PDF backend '{name}'. Choose from: {', '.join(BACKEND_CHOICES)}")
+    _settings["backend"] = name
+
+
+def get_pdf_backend():
+    """Returns the configured backend name, e.g. to hand to worker processes."""
+    return _settings["backend"]
+
+
+def resolve_pdf_backend():
+    """
+    Returns the backend that will actually be used: the configured one, or for
+    "auto" the fastest one available. Raises EnvironmentError if an explicitly
+    chosen backend isn't installed.
+    """
+    name = _settings["backend"]
+    if name != "auto":
+        if not BACKENDS[name][1]():
+            raise EnvironmentError(f"The '{name}' PDF backend was requested but is not installed.")
+        return name
+    return next(backend for backend, (_, available) in BACKENDS.items() if available())
+
+
+@contextlib.contextmanager
+def open_pdf_text(file_path):
+    """
+    Opens a PDF with the selected backend and yields (page_count, texts), where
+    texts yields each page's text layer in page order ("" for pages without one).
+    With "auto", a document the fast backend can't open is retried with PyPDF2.
+    """
+    name = resolve_pdf_backend()
+    with contextlib.ExitStack() as stack:
+        with stats.timed("pdf_open"):
+            try:
+                page_count, texts = stack.enter_context(BACKENDS[name][0](file_path))
+            except Exception as e:
+                if name == "pypdf2" or _settings["backend"] != "auto":
+                    raise
+                logging.warning(f"The {name} backend could not open {file_path} ({e}); falling back to PyPDF2.")
+                name = "pypdf2"
+                page_count, texts = stack.enter_context(_open_pypdf2(file_path))
+        logging.info(f"Reading {file_path} with the {name} PDF backend.")
+        yield page_count, stats.timed_iter("pdf_text", texts)
@@ -1,46 +1,291 @@
 # app/file_handlers/pdf_handler.py
 
+import contextlib
 import logging
+import os
+from collections import deque
 from PyPDF2 import PdfReader
-from pdf2image import convert_from_path
-import pytesseract
-import shutil
+from PyPDF2.generic import ContentStream
 
+from app import stats
+from app.hashing import file_digest
+from app.file_handlers.pdf_backends import open_pdf_text
+from app.file_handlers.records import PageRecord
+from app.file_handlers.ocr_utils import (
+    OCR_DPI,
+    OCR_RASTER_BATCH_SIZE,
+    cache_enabled,
+    check_pdf_ocr_dependencies,
+    get_cached_ocr,
+    iter_rasterized_pages,
+    map_in_order,
+    ocr_image,
+    page_cache_key,
+)
 
-def extract_text_from_pdf(file_path, trigger_ocr=False, ocr_mix=False, callback=None):
-    """Extracts text from a PDF, with an option for OCR."""
-    text_content = []
+# --- Safely import the smart OCR thresholds from config ---
+try:
+    from app.config_manager import OCR_SMART_MIN_CHARS, OCR_SMART_MIN_IMAGE_COVERAGE
+except ImportError:
+    OCR_SMART_MIN_CHARS, OCR_SMART_MIN_IMAGE_COVERAGE = 100, 0.5
+
+
+def _image_xobjects(page):
+    """
+    Returns the resource names of the image XObjects drawn directly by a page,
+    and whether any of its form XObjects contain images of their own.
+    """
+    names, form_images = set(), False
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    if not xobjects:
+        return names, form_images
+    for name, ref in xobjects.get_object().items():
+        xobject = ref.get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            names.add(name)
+        elif subtype == "/Form" and not form_images:
+            form_resources = xobject.get("/Resources")
+            form_xobjects = form_resources.get_object().get("/XObject") if form_resources else None
+            if form_xobjects:
+                form_images = any(
+                    child.get_object().get("/Subtype") == "/Image"
+                    for child in form_xobjects.get_object().values()
+                )
+    return names, form_images
+
+
+def _multiply(m, n):
+    """Multiplies two PDF transformation matrices given as (a, b, c, d, e, f)."""
+    return (
+        m[0] * n[0] + m[1] * n[2],
+        m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2],
+        m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4],
+        m[4] * n[1] + m[5] * n[3] + n[5],
+    )
+
+
+def _image_coverage(page, image_names):
+    """Estimates the fraction of the page area covered by the given images."""
+    contents = page.get_contents()
+    if contents is None:
+        return 0.0
+    if not isinstance(contents, ContentStream):
+        contents = ContentStream(contents, page.pdf)
+
+    # Images are drawn into the unit square, so their area is the CTM's determinant
+    ctm, saved, covered = (1, 0, 0, 1, 0, 0), [], 0.0
+    for operands, operator in contents.operations:
+        if operator == b"q":
+            saved.append(ctm)
+        elif operator == b"Q" and saved:
+            ctm = saved.pop()
+        elif operator == b"cm":
+            ctm = _multiply(tuple(float(x) for x in operands), ctm)
+        elif operator == b"Do" and operands and operands[0] in image_names:
+            covered += abs(ctm[0] * ctm[3] - ctm[1] * ctm[2])
+
+    page_area = float(page.mediabox.width) * float(page.mediabox.height)
+    return min(1.0, covered / page_area) if page_area else 0.0
+
+
+def page_needs_ocr(page, text):
+    """
+    Decides whether a PDF page is worth OCRing for --ocr-smart. Pages without
+    images are never OCRed. Pages with images are OCRed when their text layer
+    is sparse or when images cover a large part of the page.
+    """
+    try:
+        image_names, form_images = _image_xobjects(page)
+        if not image_names and not form_images:
+            return False
+        if len((text or "").strip()) < OCR_SMART_MIN_CHARS:
+            return True
+        return bool(image_names) and _image_coverage(page, image_names) >= OCR_SMART_MIN_IMAGE_COVERAGE
+    except Exception as e:
+        # When in doubt, OCR the page rather than risk losing its text
+        logging.warning(f"Could not inspect page for smart OCR: {e}")
+        return True
+
+
+def _ocr_rendered_page(page):
+    """Runs in an OCR thread: OCRs one rendered page and deletes its image."""
+    page_num, text, image_path, cache_key = page
+    ocr_text = None
+    if image_path:
+        try:
+            ocr_text = ocr_image(image_path, cache_key=cache_key, check_cache=False, dpi=OCR_DPI)
+        except Exception as e:
+            logging.warning(f"OCR failed for page {page_num}: {e}")
+        finally:
+            with contextlib.suppress(OSError):
+                os.remove(image_path)
+    return page_num, text, ocr_text
+
+
+def _read_ahead(pages, batch_size):
+    """
+    Groups (page_num, text, needs_ocr) into chunks that are read ahead of the
+    OCR: each ends once batch_size of its pages need OCR, so they can be
+    rendered together, and holds at most 4 * batch_size pages in all.
+    """
+    chunk, to_ocr = [], 0
+    for page in pages:
+        chunk.append(page)
+        to_ocr += page[2]
+        if to_ocr >= batch_size or len(chunk) >= 4 * batch_size:
+            yield chunk
+            chunk, to_ocr = [], 0
+    if chunk:
+        yield chunk
+
+
+def _ocr_in_page_order(file_path, pages, callback):
+    """
+    Yields (page_num, text, ocr_text) for each (page_num, text, needs_ocr) in pages, in order.
+
+    Pages that need OCR are taken from the OCR cache when possible; the rest
+    are rendered in batches and OCRed in parallel. Pages are pulled from the
+    pages iterable lazily, a chunk at a time (see _read_ahead), and callback
+    fires as each one finishes.
+    """
+    document_digest = file_digest(file_path) if cache_enabled() else None
+    cached = {}
+    renderers = deque()  # (last page of a chunk, the generator rendering its pages)
+
+    def ocr_jobs():
+        for chunk in _read_ahead(pages, OCR_RASTER_BATCH_SIZE):
+            cache_keys = {}
+            if document_digest:
+                for page_num, _, needs_ocr in chunk:
+                    if needs_ocr:
+                        cache_keys[page_num] = page_cache_key(document_digest, page_num)
+                        ocr_text = get_cached_ocr(cache_keys[page_num])
+                        if ocr_text is not None:
+                            cached[page_num] = ocr_text
+
+            to_render = [page_num for page_num, _, needs_ocr in chunk if needs_ocr and page_num not in cached]
+            # Pages are rendered lazily, one batch per pdftoppm run
+            rendered_pages = iter_rasterized_pages(file_path, to_render)
+            renderers.append((chunk[-1][0], rendered_pages))
+            render_set = set(to_render)
+            for page_num, text, _ in chunk:
+                image_path = next(rendered_pages)[1] if page_num in render_set else None
+                yield page_num, text, image_path, cache_keys.get(page_num)
+
+    results = map_in_order(_ocr_rendered_page, ocr_jobs(), on_done=callback)
+    try:
+        for page_num, text, ocr_text in results:
+            yield page_num, text, cached.pop(page_num, ocr_text)
+            # Every image of a chunk has been OCRed once its last page is out
+            while renderers and renderers[0][0] <= page_num:
+                renderers.popleft()[1].close()
+    finally:
+        # Stop the OCR threads before their images' directories are removed
+        results.close()
+        for _, rendered_pages in renderers:
+            rendered_pages.close()
+
+
+def _smart_ocr_pages(file_path, reader, page_count, texts):
+    """Yields (page_num, text, needs_ocr) for each page of the text layer, as chosen by page_needs_ocr."""
+    reader_pages = reader.pages
+    if len(reader_pages) != page_count:
+        # Pages PyPDF2 can't see are OCRed rather than guessed at
+        logging.warning(f"PyPDF2 found {len(reader_pages)} page(s) but the text layer has {page_count} in {file_path}")
+    needed = 0
+    for page_num, text in enumerate(texts, 1):
+        needs_ocr = page_num > len(reader_pages) or page_needs_ocr(reader_pages[page_num - 1], text)
+        needed += needs_ocr
+        yield page_num, text, needs_ocr
+
+    stats.increment("smart_ocr_pages", page_count)
+    stats.increment("smart_ocr_skipped", page_count - needed)
+    logging.info(f"Smart OCR: {needed} of {page_count} page(s) needed OCR in {file_path}")
+
+
+def _page_records(page_num, text, ocr_text):
+    """Yields a page's text layer, plus its OCR text if that brings anything new."""
+    if text:
+        yield PageRecord(page_num, text, "text")
+    if ocr_text and ocr_text.strip() and ocr_text.strip() != (text or "").strip():
+        yield PageRecord(page_num, ocr_text.strip(), "ocr")
+
+
+def format_pdf_record(record):
+    """Formats a page record the way it appears in the extracted text."""
+    if record.source == "ocr":
+        return f"[OCR from page {record.page_num}]\n{record.text}"
+    return record.text
+
+
+def iter_pdf_pages(file_path, trigger_ocr=False, ocr_mix=False, ocr_smart=False, callback=None, total_callback=None):
+    """
+    Streams a PDF as PageRecords, in page order: one for each page's text
+    layer and one for each useful OCR result. Only a window of pages is held
+    in memory at a time, so very large documents can be written out as they
+    are read. The OCR dependencies are checked right away; errors while
+    reading the document are raised during iteration.
+    """
+    use_ocr = trigger_ocr or ocr_mix or ocr_smart
+    if use_ocr:
+        check_pdf_ocr_dependencies()
+    return _iter_pdf_pages(file_path, use_ocr, trigger_ocr or ocr_mix, callback, total_callback)
+
+
+def _iter_pdf_pages(file_path, use_ocr, ocr_all, callback, total_callback):
+    pages = None
     try:
-        with open(file_path, "rb") as f:
-            reader = PdfReader(f)
-            for page_num, page in enumerate(reader.pages, 1):
-                text = page.extract_text()
-                if text:
-                    text_content.append(text)
-
-                if trigger_ocr or ocr_mix:
-                    # Proactive checks for Tesseract and Poppler
-                    if not shutil.which("tesseract"):
-                        raise FileNotFoundError("Tesseract is not installed or not in PATH. OCR on PDFs is disabled.")
-                    if not shutil.which("pdftoppm"):
-                        raise FileNotFoundError("Poppler (pdftoppm) is not installed or not in PATH. OCR on PDFs is disabled.")
+        with open_pdf_text(file_path) as (page_count, texts):
+            if total_callback:
+                total_callback(page_count)
+
+            if not use_ocr:
+                for page_num, text in enumerate(texts, 1):
+                    if callback:
+                        callback()
+                    if text:
+                        yield PageRecord(page_num, text, "text")
+
+            elif not ocr_all:
+                # Smart OCR decides page by page as the text layer is read, with
+                # PyPDF2 looking at each page's images
+                with open(file_path, "rb") as f:
+                    reader = PdfReader(f)
+                    pages = _ocr_in_page_order(file_path, _smart_ocr_pages(file_path, reader, page_count, texts), callback)
                     try:
-                        images = convert_from_path(
-                            file_path, first_page=page_num, last_page=page_num
-                        )
-                        if images:
-                            ocr_text = pytesseract.image_to_string(images[0])
-                            if ocr_text and ocr_text.strip() not in text_content:
-                                text_content.append(
-                                    f"[OCR from page {page_num}]\n{ocr_text.strip()}"
-                                )
-                    except Exception as e:
-                        logging.warning(f"OCR failed for page {page_num}: {e}")
-
-                if callback:
-                    callback()
+                        for page_num, text, ocr_text in pages:
+                            yield from _page_records(page_num, text, ocr_text)
+                    finally:
+                        # Before the file is closed under PyPDF2
+                        pages.close()
+
+            else:
+                pages = _ocr_in_page_order(file_path, ((page_num, text, True) for page_num, text in enumerate(texts, 1)),
+                                           callback)
+                for page_num, text, ocr_text in pages:
+                    yield from _page_records(page_num, text, ocr_text)
         logging.info(f"Extracted text from PDF: {file_path}")
-        return "\n".join(text_content)
+    finally:
+        if pages:
+            pages.close()
+
+
+def extract_text_from_pdf(file_path, trigger_ocr=False, ocr_mix=False, ocr_smart=False, callback=None, total_callback=None):
+    """
+    Extracts text from a PDF, with an option for OCR.
+    total_callback, if given, receives the page count as soon as the PDF is open.
+    With OCR, pages are OCRed in parallel but still appear in page order.
+    With ocr_smart, only pages selected by page_needs_ocr are rendered and OCRed.
+    The text layer is read by the backend chosen in pdf_backends.
+    Use iter_pdf_pages instead to avoid holding the whole text in memory.
+    """
+    records = iter_pdf_pages(file_path, trigger_ocr, ocr_mix, ocr_smart, callback, total_callback)
+    try:
+        return "\n".join(format_pdf_record(record) for record in records)
     except Exception as e:
         logging.error(f"Could not read PDF file {file_path}: {e}")
         return None
@@ -1,40 +1,206 @@
 # app/file_handlers/pptx_handler.py
 
-import io
 import logging
-from pptx import Presentation
-from PIL import Image
-import pytesseract
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
 
+from app import stats
+from app.file_handlers.ocr_utils import map_in_order, ocr_image
+from app.file_handlers.records import PageRecord
 
-def extract_text_from_pptx(file_path, trigger_ocr=False, ocr_mix=False, callback=None):
-    """Extracts text from a .pptx file, with an option for OCR."""
-    text_content = []
+# XML names read by the fast text-only path
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_P_SP_TREE, _P_SP, _P_TX_BODY = f"{_P}spTree", f"{_P}sp", f"{_P}txBody"
+_A_P, _A_R, _A_BR, _A_FLD, _A_T = f"{_A}p", f"{_A}r", f"{_A}br", f"{_A}fld", f"{_A}t"
+
+
+def _collect_slide(slide, use_ocr):
+    """
+    Reads a slide's shapes in order: text as str and, when OCR is enabled,
+    pictures as their raw image bytes so they can be OCRed off the main thread.
+    """
+    parts = []
+    for shape in slide.shapes:
+        if hasattr(shape, "text") and shape.text.strip():
+            parts.append(shape.text.strip())
+        elif use_ocr and hasattr(shape, "image"):
+            try:
+                parts.append(shape.image.blob)
+            except Exception as e:
+                logging.warning(f"Could not read picture for OCR: {e}")
+    return parts
+
+
+def _build_slide_record(slide):
+    """Turns a collected slide into a PageRecord, OCRing its pictures."""
+    slide_num, parts = slide
+    slide_text = []
+    source = "text"
+    for part in parts:
+        if isinstance(part, bytes):
+            try:
+                ocr_text = ocr_image(part)
+                if ocr_text:
+                    slide_text.append(
+                        f"[OCR from Slide {slide_num}]\n{ocr_text.strip()}"
+                    )
+                    source = "ocr"
+            except Exception as e:
+                logging.warning(f"OCR on slide {slide_num} failed: {e}")
+        else:
+            slide_text.append(part)
+    if slide_text:
+        return PageRecord(slide_num, "\n".join(slide_text), source)
+    return None
+
+
+def format_pptx_record(record):
+    """Formats a slide record the way it appears in the extracted text."""
+    return f"[Slide {record.page_num}]\n{record.text}"
+
+
+def _slide_paths(zf):
+    """Returns the slides' zip entry names in presentation order, from presentation.xml and its relationships."""
+    rels = ET.fromstring(zf.read("ppt/_rels/presentation.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+    presentation = ET.fromstring(zf.read("ppt/presentation.xml"))
+    paths = []
+    for slide_id in presentation.iter(f"{_P}sldId"):
+        target = targets[slide_id.get(f"{_R}id")]
+        paths.append(target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("ppt", target)))
+    return paths
+
+
+def _paragraph_text(paragraph):
+    """A paragraph's text the way python-pptx builds it: runs and fields, with '\\v' for line breaks."""
+    parts = []
+    for child in paragraph:
+        if child.tag in (_A_R, _A_FLD):
+            t = child.find(_A_T)
+            parts.append(t.text or "" if t is not None else "")
+        elif child.tag == _A_BR:
+            parts.append("\v")
+    return "".join(parts)
+
+
+def _read_slide_texts(zf, slide_path):
+    """
+    Streams one slide's XML and returns the text of its top-level text shapes
+    in order, matching python-pptx's stripped shape.text. Like slide.shapes,
+    only direct children of the shape tree count, so text in groups and tables is skipped.
+    """
+    parts, tags = [], []
+    with zf.open(slide_path) as f:
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                tags.append(elem.tag)
+                continue
+            tags.pop()
+            if not tags or tags[-1] != _P_SP_TREE:
+                continue
+            # A top-level shape is complete; read it if it's a text shape, then free it
+            if elem.tag == _P_SP:
+                tx_body = elem.find(_P_TX_BODY)
+                if tx_body is not None:
+                    text = "\n".join(_paragraph_text(p) for p in tx_body.iterfind(_A_P)).strip()
+                    if text:
+                        parts.append(text)
+            elem.clear()
+    return parts
+
+
+def _iter_fast_text_slides(zf, slide_paths, callback=None, total_callback=None):
+    """
+    Text-only path: yields (slide_num, parts) straight from the .pptx zip,
+    without building python-pptx's object model or loading any media.
+    """
+    if total_callback:
+        total_callback(len(slide_paths))
+    for slide_num, slide_path in enumerate(slide_paths, 1):
+        parts = _read_slide_texts(zf, slide_path)
+        if callback:
+            callback()
+        yield slide_num, parts
+
+
+def _iter_python_pptx_slides(file_path, use_ocr, total_callback=None):
+    """Yields (slide_num, parts) using python-pptx; needed to get at pictures for OCR."""
+    from pptx import Presentation
+
+    prs = Presentation(file_path)
+    if total_callback:
+        total_callback(len(prs.slides))
+    for i, slide in enumerate(prs.slides, 1):
+        yield i, _collect_slide(slide, use_ocr)
+
+
+def _open_fast_text(file_path):
+    """Opens a deck for the fast text path. Returns (zip, slide paths), or None if its layout isn't understood."""
+    try:
+        zf = zipfile.ZipFile(file_path)
+    except (zipfile.BadZipFile, OSError) as e:
+        logging.warning(f"Fast text path can't read {file_path}, using python-pptx instead: {e}")
+        return None
     try:
-        prs = Presentation(file_path)
-        for i, slide in enumerate(prs.slides, 1):
-            slide_text = []
-            for shape in slide.shapes:
-                if hasattr(shape, "text") and shape.text.strip():
-                    slide_text.append(shape.text.strip())
-                elif (trigger_ocr or ocr_mix) and hasattr(shape, "image"):
-                    try:
-                        image_bytes = shape.image.blob
-                        ocr_text = pytesseract.image_to_string(
-                            Image.open(io.BytesIO(image_bytes))
-                        )
-                        if ocr_text:
-                            slide_text.append(
-                                f"[OCR from Slide {i}]\n{ocr_text.strip()}"
-                            )
-                    except Exception as e:
-                        logging.warning(f"OCR on slide {i} failed: {e}")
-            if slide_text:
-                text_content.append(f"[Slide {i}]\n" + "\n".join(slide_text))
-            if callback:
-                callback()
+        return zf, _slide_paths(zf)
+    except (KeyError, ET.ParseError) as e:
+        zf.close()
+        logging.warning(f"Fast text path can't read {file_path}, using python-pptx instead: {e}")
+        return None
+
+
+def iter_pptx_slides(file_path, trigger_ocr=False, ocr_mix=False, ocr_smart=False, callback=None, total_callback=None):
+    """
+    Streams a .pptx file as PageRecords, one per slide with text, in slide
+    order. Slides are read and OCRed a window at a time rather than all up
+    front. Errors while reading the deck are raised during iteration.
+
+    Without OCR, slide text is read straight from the slide XML, which is
+    much faster than python-pptx and gives the same output. python-pptx is
+    used for OCR and for decks the fast path can't open.
+    """
+    use_ocr = trigger_ocr or ocr_mix or ocr_smart
+    fast = None if use_ocr else _open_fast_text(file_path)
+
+    if fast:
+        zf, slide_paths = fast
+        with zf:
+            for slide in stats.timed_iter("pptx_text", _iter_fast_text_slides(zf, slide_paths, callback, total_callback)):
+                record = _build_slide_record(slide)
+                if record:
+                    yield record
         logging.info(f"Extracted text from PowerPoint: {file_path}")
-        return "\n\n".join(text_content)
+        return
+
+    slides = stats.timed_iter("pptx_text", _iter_python_pptx_slides(file_path, use_ocr, total_callback))
+    if use_ocr:
+        records = map_in_order(_build_slide_record, slides, on_done=callback)
+    else:
+        records = map_in_order(_build_slide_record, slides, on_done=callback, max_workers=1)
+
+    try:
+        for record in records:
+            if record:
+                yield record
+    finally:
+        records.close()
+    logging.info(f"Extracted text from PowerPoint: {file_path}")
+
+
+def extract_text_from_pptx(file_path, trigger_ocr=False, ocr_mix=False, ocr_smart=False, callback=None, total_callback=None):
+    """
+    Extracts text from a .pptx file, with an option for OCR.
+    total_callback, if given, receives the slide count as soon as the deck is open.
+    With OCR, slides are OCRed in parallel but still appear in slide order.
+    Pictures have no text layer, so ocr_smart OCRs them just like ocr_mix.
+    Use iter_pptx_slides instead to avoid holding the whole text in memory.
+    """
+    try:
+        records = iter_pptx_slides(file_path, trigger_ocr, ocr_mix, ocr_smart, callback, total_callback)
+        return "\n\n".join(format_pptx_record(record) for record in records)
     except Exception as e:
         logging.error(f"Could not read PowerPoint file {file_path}: {e}")
         return None
@@ -0,0 +1,7 @@
+# app/file_handlers/records.py
+
+from collections import namedtuple
+
+# One unit of streamed output: a page's (or slide's) text and where it came
+# from, either "text" for the document's own text or "ocr" when it includes OCR.
+PageRecord = namedtuple("PageRecord", ["page_num", "text", "source"])
@@ -1,67 +1,315 @@
 # app/file_processor.py
+import contextlib
+import glob
+import gzip
+import io
+import lzma
 import os
+import re
+import shutil
 import sys
 import logging
-from PIL import Image
+import zipfile
 
-from app.file_handlers.pdf_handler import extract_text_from_pdf
-from app.file_handlers.pptx_handler import extract_text_from_pptx
-from app.file_handlers.image_handler import extract_text_from_image
-from app.file_handlers.conversions import convert_ppt_to_pptx
+from app import stats
 
-def save_text_to_file(output_path, text):
-    """Saves the extracted text to a .txt file."""
-    try:
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(text)
-        print(f"✔ Successfully saved output to: {output_path}")
-        logging.info(f"Text successfully saved to {output_path}")
-    except Exception as e:
-        print(f"❌ Error saving text to {output_path}: {e}")
-        logging.error(f"Failed to save text to {output_path}: {e}")
+# Handlers are imported when a file of their type is dispatched, so that
+# e.g. a PDF-only run never loads python-pptx or PIL.
+
+COMPRESSION_SUFFIXES = {"gz": ".gz", "xz": ".xz"}
+
+
+def _guess_compression(output_path):
+    """Infers 'gz' or 'xz' from an output file's extension."""
+    ext = os.path.splitext(output_path)[1].lower()
+    return next((name for name, suffix in COMPRESSION_SUFFIXES.items() if suffix == ext), None)
 
-def process_file(file_path, trigger_ocr=False, ocr_mix=False, callback=None):
+
+@contextlib.contextmanager
+def open_text_output(output_path, compression=None):
     """
-    Selects the correct handler to extract text from a file, with error handling.
+    Opens a UTF-8 text stream for writing output, optionally compressed.
+
+    output_path '-' writes to the process's real stdout. compression is 'gz',
+    'xz' or None; for files it is inferred from the extension when not given.
     """
-    try:
-        # --- This is the main dispatch logic ---
-        ext = os.path.splitext(file_path)[1].lower()
-        logging.info(f"Dispatching file for processing: {file_path}")
+    if output_path == "-":
+        binary = sys.__stdout__.buffer
+        if compression == "gz":
+            binary = gzip.GzipFile(fileobj=binary, mode="wb")
+        elif compression == "xz":
+            binary = lzma.LZMAFile(binary, "wb")
+        stream = io.TextIOWrapper(binary, encoding="utf-8")
+        try:
+            yield stream
+        finally:
+            stream.flush()
+            # Finish the compressed stream without closing stdout itself
+            detached = stream.detach()
+            if detached is not sys.__stdout__.buffer:
+                detached.close()
+            sys.__stdout__.buffer.flush()
+        return
+
+    compression = compression or _guess_compression(output_path)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    if compression == "gz":
+        stream = gzip.open(output_path, "wt", encoding="utf-8")
+    elif compression == "xz":
+        stream = lzma.open(output_path, "wt", encoding="utf-8")
+    else:
+        stream = open(output_path, "w", encoding="utf-8")
+    with stream:
+        yield stream
+
+
+@contextlib.contextmanager
+def open_combined_output(output_path, compression=None):
+    """
+    Streams the --save-all output one document at a time instead of building
+    it in memory. Yields a write(file_path, text) function, where text is a
+    str or a text file object to copy from, and whose 'count'
+    attribute tells how many documents were written. The output is only
+    created once the first document is written.
+    """
+    with contextlib.ExitStack() as stack:
+        stream = None
+
+        def write(file_path, text):
+            nonlocal stream
+            with stats.timed("write"):
+                if stream is None:
+                    stream = stack.enter_context(open_text_output(output_path, compression))
+                else:
+                    stream.write("\n")
+                stream.write(f"### {file_path} ###\n")
+                if isinstance(text, str):
+                    stream.write(text)
+                else:
+                    shutil.copyfileobj(text, stream)
+                stream.write("\n\n")
+            write.count += 1
+
+        write.count = 0
+        yield write
+
+def _count_pdf_pages_hint(file_path):
+    """
+    Reads the page count from a linearized PDF's header without parsing the file.
+    Returns None when the PDF is not linearized.
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(1024)
+    match = re.search(rb"/Linearized.*?/N\s+(\d+)", head, re.DOTALL)
+    return int(match.group(1)) if match else None
 
+
+def _count_pptx_slides(file_path):
+    """Counts the slides of a .pptx from its zip entries, without loading the deck."""
+    with zipfile.ZipFile(file_path) as zf:
+        try:
+            presentation_xml = zf.read("ppt/presentation.xml")
+            return len(re.findall(rb"<p:sldId\b", presentation_xml))
+        except KeyError:
+            return sum(1 for name in zf.namelist() if re.fullmatch(r"ppt/slides/slide\d+\.xml", name))
+
+
+def count_steps(file_path):
+    """
+    Cheaply estimates the number of progress steps (pages/slides) for a file.
+
+    Nothing is fully parsed here. Handlers report the real page count once the
+    document is open, and process_file passes the difference to total_callback.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    try:
         if ext == ".pdf":
-            return extract_text_from_pdf(file_path, trigger_ocr, ocr_mix, callback=callback)
-        elif ext == ".pptx":
-            return extract_text_from_pptx(file_path, trigger_ocr, ocr_mix, callback=callback)
-        elif ext == ".ppt":
-            pptx_path = convert_ppt_to_pptx(file_path)
-            if pptx_path:
-                return extract_text_from_pptx(pptx_path, trigger_ocr, ocr_mix, callback=callback)
-            return None
-        elif ext in Image.registered_extensions() and (trigger_ocr or ocr_mix):
-            text = extract_text_from_image(file_path)
-            if callback: callback()
-            return text
-        else:
-            logging.warning(f"Unsupported file type for processing: {ext}, skipping.")
-            if callback: callback()
-            return None
+            return _count_pdf_pages_hint(file_path) or 1
+        if ext == ".pptx":
+            return _count_pptx_slides(file_path) or 1
+    except Exception:
+        pass  # If a file is unreadable, still count it as one step
+    return 1
+
+
+DOCUMENT_EXTENSIONS = (".pdf", ".pptx", ".ppt")
+_image_extensions = None
+
+
+def _get_image_extensions():
+    """The extensions PIL can open. Asking PIL loads all its plugins, so it is only done once."""
+    global _image_extensions
+    if _image_extensions is None:
+        from PIL import Image
+        _image_extensions = frozenset(Image.registered_extensions())
+    return _image_extensions
+
+
+def _is_image(ext):
+    """Whether PIL can open files with this extension."""
+    return ext in _get_image_extensions()
+
+
+def supported_extensions(ocr=False):
+    """The extensions process_file can extract text from; images are only read with OCR on."""
+    if ocr:
+        return frozenset(DOCUMENT_EXTENSIONS) | _get_image_extensions()
+    return frozenset(DOCUMENT_EXTENSIONS)
+
 
-    except FileNotFoundError as e:
-        # --- Catch the specific error for missing dependencies ---
-        print(f"\n❌ Dependency Error: {e}", file=sys.stderr)
-        # We need to tell the progress bar this file is "done" so it doesn't stall.
-        if callback:
-            # For a file-by-file progress bar, a single update is fine. For a
-            # page-by-page bar, this prevents a stall but won't be perfectly accurate.
-            callback()
+def _join_chunks(chunks, separator):
+    """Yields chunks with separator between them, like a lazy separator.join()."""
+    for i, chunk in enumerate(chunks):
+        yield chunk if i == 0 else separator + chunk
+
+
+def iter_file_text(file_path, trigger_ocr=False, ocr_mix=False, ocr_smart=False, callback=None, total_callback=None):
+    """
+    Selects the correct handler for a file and streams its text a page or
+    slide at a time, so it can be written out without holding the whole
+    document in memory. "".join() of the chunks is the file's full text.
+
+    Returns None for unsupported files or failed conversions. Missing
+    dependencies raise FileNotFoundError right away; errors while reading the
+    document are raised during iteration. The callbacks work as in process_file.
+    """
+    pages_callback = None
+    if total_callback:
+        estimate = count_steps(file_path)
+
+        def pages_callback(pages):
+            if pages != estimate:
+                total_callback(pages - estimate)
+
+    # --- This is the main dispatch logic ---
+    ext = os.path.splitext(file_path)[1].lower()
+    logging.info(f"Dispatching file for processing: {file_path}")
+
+    if ext == ".pdf":
+        from app.file_handlers.pdf_handler import format_pdf_record, iter_pdf_pages
+        records = iter_pdf_pages(file_path, trigger_ocr, ocr_mix, ocr_smart, callback=callback, total_callback=pages_callback)
+        return _join_chunks(map(format_pdf_record, records), "\n")
+    elif ext in (".pptx", ".ppt"):
+        from app.file_handlers.pptx_handler import format_pptx_record, iter_pptx_slides
+        if ext == ".ppt":
+            from app.file_handlers.conversions import get_pptx_for_ppt
+            file_path = get_pptx_for_ppt(file_path)
+            if not file_path:
+                return None
+        records = iter_pptx_slides(file_path, trigger_ocr, ocr_mix, ocr_smart, callback=callback, total_callback=pages_callback)
+        return _join_chunks(map(format_pptx_record, records), "\n\n")
+    elif (trigger_ocr or ocr_mix or ocr_smart) and _is_image(ext):
+        from app.file_handlers.image_handler import extract_text_from_image
+        text = extract_text_from_image(file_path)
+        if callback: callback()
+        return iter([text]) if text is not None else None
+    else:
+        logging.warning(f"Unsupported file type for processing: {ext}, skipping.")
+        if callback: callback()
         return None
 
-    except Exception as e:
-        # ---Catch any other unexpected errors during processing ---
+
+def _report_processing_error(file_path, error, callback):
+    """Tells the user a file failed, and keeps the progress bar from stalling."""
+    if isinstance(error, FileNotFoundError):
+        # --- The specific error for missing dependencies ---
+        print(f"\n❌ Dependency Error: {error}", file=sys.stderr)
+    else:
         print(f"\n❌ An unexpected error occurred while processing {os.path.basename(file_path)}.", file=sys.stderr)
-        logging.error(f"Error processing {file_path}: {e}")
-        if callback:
-            callback()
+        logging.error(f"Error processing {file_path}: {error}")
+    # We need to tell the progress bar this file is "done" so it doesn't stall.
+    if callback:
+        # For a file-by-file progress bar, a single update is fine. For a
+        # page-by-page bar, this prevents a stall but won't be perfectly accurate.
+        callback()
+
+
+def process_file(file_path, trigger_ocr=False, ocr_mix=False, ocr_smart=False, callback=None, total_callback=None):
+    """
+    Selects the correct handler to extract text from a file, with error handling.
+
+    ocr_smart enables OCR like ocr_mix, but PDF pages that already have a
+    usable text layer are not OCRed.
+
+    callback is called once per page/slide. If total_callback is given, it is
+    called with the number of steps to add to (or remove from) the count_steps
+    estimate once the real page count is known.
+    """
+    with stats.timed_file(file_path):
+        try:
+            chunks = iter_file_text(file_path, trigger_ocr, ocr_mix, ocr_smart, callback, total_callback)
+            return "".join(chunks) if chunks is not None else None
+        except Exception as e:
+            _report_processing_error(file_path, e, callback)
+            return None
+
+
+def partial_path(output_path, pid=None):
+    """Where extract_to_file, in the process with this pid (default: this one), writes output_path until the file is done."""
+    return f"{output_path}.{pid or os.getpid()}.partial"
+
+
+def remove_partials(output_path):
+    """
+    Deletes the partial outputs earlier runs left for output_path, e.g. when
+    their worker was killed or crashed. Returns how many were removed.
+    """
+    removed = 0
+    for path in glob.glob(glob.escape(output_path) + ".*.partial"):
+        with contextlib.suppress(OSError):
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def extract_to_file(file_path, output_path, trigger_ocr=False, ocr_mix=False, ocr_smart=False,
+                    callback=None, total_callback=None, compression=None):
+    """
+    Like process_file, but writes the text to output_path as each page or
+    slide is extracted instead of returning it.
+
+    The text goes to '<output_path>.<pid>.partial' and is flushed page by page, then
+    renamed once the file is done, so a crash mid-document leaves the pages
+    extracted so far behind. output_path '-' streams to stdout; compression
+    works as in open_text_output.
+
+    Returns the number of characters written (0 means there was no text and no
+    file was created), or None if the file could not be processed.
+    """
+    with stats.timed_file(file_path):
+        return _extract_to_file(file_path, output_path, trigger_ocr, ocr_mix, ocr_smart, callback, total_callback, compression)
+
+
+def _extract_to_file(file_path, output_path, trigger_ocr, ocr_mix, ocr_smart, callback, total_callback, compression):
+    to_stdout = output_path == "-"
+    if not to_stdout:
+        compression = compression or _guess_compression(output_path)
+    # The pid keeps workers that share an output name (a.pdf and a.pptx) apart
+    target = output_path if to_stdout else partial_path(output_path)
+    written = 0
+    try:
+        chunks = iter_file_text(file_path, trigger_ocr, ocr_mix, ocr_smart, callback, total_callback)
+        if chunks is None:
+            return None
+        with open_text_output(target, compression) as stream:
+            for chunk in chunks:
+                with stats.timed("write"):
+                    stream.write(chunk)
+                    stream.flush()
+                written += len(chunk)
+    except Exception as e:
+        _report_processing_error(file_path, e, callback)
+        if written:
+            logging.warning(f"Partial output for {file_path} kept at {target}")
+        elif not to_stdout:
+            with contextlib.suppress(OSError):
+                os.remove(target)
         return None
+
+    if not to_stdout:
+        if written:
+            os.replace(target, output_path)
+            logging.info(f"Text successfully saved to {output_path}")
+        else:
+            os.remove(target)
+    return written
@@ -0,0 +1,177 @@
+# app/html_content.py
+
+import logging
+import re
+
+from app import stats
+
+# --- Safely import the content mode from config ---
+try:
+    from app.config_manager import SCRAPE_CONTENT
+except ImportError:
+    SCRAPE_CONTENT = "full"
+
+CONTENT_CHOICES = ("article", "full")
+
+# Elements that never hold readable text, dropped in article mode. Full mode only
+# drops scripts and styles, which markdownify leaves out anyway, so whole pages
+# are saved as they always were. Both are removed already in the browser so they
+# aren't sent over the WebDriver connection.
+NON_CONTENT_TAGS = (
+    "script", "style", "noscript", "template", "svg", "math", "canvas", "iframe",
+    "object", "embed", "video", "audio", "picture", "source", "link", "meta",
+    "button", "input", "select", "textarea",
+)
+FULL_MODE_DROPPED_TAGS = ("script", "style")
+
+# Page furniture removed in article mode, before looking for the main content
+BOILERPLATE_TAGS = ("nav", "header", "footer", "aside", "dialog")
+BOILERPLATE_ROLES = ["navigation", "banner", "contentinfo", "complementary", "search", "dialog", "menu"]
+UNLIKELY = re.compile(
+    r"\bads?\b|\bad-|advert|banner|breadcrumb|comment|cookie|consent|footer|header|menu|modal|"
+    r"nav|newsletter|popup|promo|related|share|sidebar|social|sponsor|subscribe|toolbar|widget",
+    re.IGNORECASE,
+)
+LIKELY = re.compile(r"article|body|content|entry|main|page|post|story|text", re.IGNORECASE)
+
+# Tags whose text counts towards the score of the block around it
+PARAGRAPH_TAGS = ("p", "pre", "td", "blockquote", "li", "dd")
+TAG_BONUS = {"article": 10, "main": 10, "div": 5, "section": 3, "pre": 3, "td": 3, "blockquote": 3,
+             "form": -3, "ul": -3, "ol": -3, "dl": -3, "li": -3, "th": -5}
+MIN_PARAGRAPH_CHARS = 25
+# If the best block has less text than this, the page is probably not an
+# article (a listing, a search page...) and is converted whole
+MIN_ARTICLE_CHARS = 250
+
+# Runtime choice. Starts from the config file and can be overridden from the
+# command line through configure_content.
+_settings = {"content": SCRAPE_CONTENT or "full"}
+
+
+def configure_content(mode):
+    """Sets whether pages are saved whole ('full') or as their main content only ('article'). None is ignored."""
+    if mode is None:
+        return
+    if mode not in CONTENT_CHOICES:
+        raise ValueError(f"Unknown content mode '{mode}'. Choose from: {', '.join(CONTENT_CHOICES)}")
+    _settings["content"] = mode
+
+
+def get_content_mode():
+    return _settings["content"]
+
+
+def dropped_tags(mode=None):
+    """Returns the tags removed before conversion in a content mode (default: the configured one)."""
+    return NON_CONTENT_TAGS if (mode or _settings["content"]) == "article" else FULL_MODE_DROPPED_TAGS
+
+
+def _class_and_id(tag):
+    return " ".join(tag.get("class") or ()) + " " + (tag.get("id") or "")
+
+
+def _remove_boilerplate(root):
+    """Removes navigation, headers, footers, sidebars and banners, keeping anything that looks like content."""
+    for tag in root.find_all(BOILERPLATE_TAGS):
+        # A <header> inside the article is usually its title
+        if tag.name == "header" and tag.find_parent(("article", "main")):
+            continue
+        tag.decompose()
+    for tag in root.find_all(attrs={"role": BOILERPLATE_ROLES}):
+        tag.decompose()
+    for tag in root.find_all(("div", "section", "ul", "ol", "table", "span", "p")):
+        if tag.decomposed:
+            continue
+        names = _class_and_id(tag)
+        if UNLIKELY.search(names) and not LIKELY.search(names):
+            tag.decompose()
+
+
+def _link_density(tag, text_length):
+    link_length = sum(len(link.get_text(strip=True)) for link in tag.find_all("a"))
+    return link_length / text_length if text_length else 1.0
+
+
+def _score(tag):
+    score = TAG_BONUS.get(tag.name, 0)
+    names = _class_and_id(tag)
+    if LIKELY.search(names):
+        score += 25
+    if UNLIKELY.search(names):
+        score -= 25
+    return score
+
+
+def find_main_content(root):
+    """
+    Finds the block of a page that holds its main text, the way Readability
+    does: every paragraph scores points for its length and commas, passed on
+    in full to its parent and half to its grandparent; blocks made mostly of
+    links lose their points. Returns None if no block has enough text.
+    """
+    # Keyed by id(): a Tag's hash serializes the whole tag
+    scores, blocks = {}, {}
+    for paragraph in root.find_all(PARAGRAPH_TAGS):
+        text = paragraph.get_text(" ", strip=True)
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        points = 1 + text.count(",") + min(len(text) // 100, 3)
+        ancestor = paragraph.parent
+        for share in (1, 0.5):
+            if ancestor is None or ancestor.name in ("[document]", "html"):
+                break
+            if id(ancestor) not in scores:
+                scores[id(ancestor)], blocks[id(ancestor)] = _score(ancestor), ancestor
+            scores[id(ancestor)] += points * share
+            ancestor = ancestor.parent
+
+    best, best_score = None, 0
+    for key, block in blocks.items():
+        score = scores[key] * (1 - _link_density(block, len(block.get_text(strip=True))))
+        scores[key] = score
+        if score > best_score:
+            best, best_score = block, score
+    if best is None or len(best.get_text(strip=True)) < MIN_ARTICLE_CHARS:
+        return None
+
+    # The article is often split over sibling blocks, with its title next to them
+    parent = best.parent
+    if parent is None or parent.name in ("[document]", "html"):
+        return best
+    children = parent.find_all(recursive=False)
+    keep = {
+        id(child) for child in children
+        if child is best or child.name in ("h1", "h2", "h3") or scores.get(id(child), 0) >= best_score * 0.2
+    }
+    if len(keep) == 1:
+        return best
+    for child in children:
+        if id(child) not in keep:
+            child.decompose()
+    return parent
+
+
+def html_to_markdown(soup, mode=None):
+    """
+    Converts a parsed page to Markdown. Scripts and styles are always dropped;
+    in 'article' mode (see configure_content) so are other non-content elements
+    (inline SVG, forms, embeds...), navigation, headers, footers and sidebars,
+    and only the page's main content is kept if one can be found. The tree is edited in place and
+    converted directly, without serializing it again.
+    """
+    from markdownify import MarkdownConverter
+
+    mode = mode or _settings["content"]
+    with stats.timed("html_convert"):
+        root = soup.body or soup
+        for tag in root.find_all(dropped_tags(mode)):
+            tag.decompose()
+        if mode == "article":
+            _remove_boilerplate(root)
+            main_content = find_main_content(root)
+            if main_content is None:
+                logging.info("No main content block found; converting the whole page.")
+            else:
+                root = main_content
+        # Trimmed the way markdownify trims a whole document
+        return MarkdownConverter().convert_soup(root).strip("\n")
@@ -0,0 +1,181 @@
+# app/http_fetch.py
+
+import logging
+import mimetypes
+import os
+import re
+import threading
+from urllib.parse import unquote, urljoin, urlparse
+
+from app import stats
+from app.html_content import html_to_markdown
+
+# --- Safely import the HTTP settings from config ---
+try:
+    from app.config_manager import HTTP_TIMEOUT
+except ImportError:
+    HTTP_TIMEOUT = 20
+
+# Pages with less visible text than this, but with scripts, are assumed to be
+# rendered by JavaScript and are loaded in the browser instead
+MIN_STATIC_TEXT_CHARS = 200
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+USER_AGENT = "Mozilla/5.0 (compatible; TextNomNom)"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """One connection pool for the whole process, so repeated requests to a host reuse its connections."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            import urllib3
+            _pool = urllib3.PoolManager(
+                maxsize=8,
+                headers={"User-Agent": USER_AGENT},
+                timeout=urllib3.Timeout(connect=HTTP_TIMEOUT, read=HTTP_TIMEOUT),
+                retries=urllib3.Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+            )
+        return _pool
+
+
+def _sniff_type(head, content_type, url):
+    """Works out a response's real type when the server doesn't say or says something generic."""
+    if content_type and content_type not in ("application/octet-stream", "binary/octet-stream", "text/plain"):
+        return content_type
+    start = head.lstrip()[:64].lower()
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    if start.startswith((b"<!doctype html", b"<html")):
+        return "text/html"
+    guessed, _ = mimetypes.guess_type(urlparse(url).path)
+    return guessed or content_type or "application/octet-stream"
+
+
+def _document_filename(response, url, content_type):
+    """Picks a name for a downloaded document: Content-Disposition, then the URL, then the type."""
+    disposition = response.headers.get("Content-Disposition", "")
+    match = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", disposition, re.IGNORECASE)
+    name = unquote(match.group(1)) if match else unquote(os.path.basename(urlparse(url).path))
+    name = os.path.basename(name) or "download"
+    if not os.path.splitext(name)[1]:
+        name += mimetypes.guess_extension(content_type) or ""
+    return name
+
+
+def _save_document(response, head, url, content_type, save_dir, save_as=None):
+    """Streams a binary response to a new file in save_dir (or at save_as(url, name)) and returns its path."""
+    from app.web_scraper import reserve_path
+
+    name = _document_filename(response, url, content_type)
+    path = save_as(url, name) if save_as else reserve_path(save_dir, name)
+    try:
+        with open(path, "wb") as f:
+            f.write(head)
+            for chunk in response.stream(64 * 1024):
+                f.write(chunk)
+    except Exception:
+        os.remove(path)  # Don't leave a truncated document behind
+        raise
+    logging.info(f"Downloaded {url} ({content_type}) to {path}")
+    return path
+
+
+def needs_javascript(soup):
+    """
+    Guesses whether a page only shows its content once JavaScript has run:
+    it asks for JavaScript in a <noscript>, or it has scripts but hardly any text.
+    """
+    if soup.body is None:
+        return True
+    noscript = " ".join(tag.get_text(" ", strip=True) for tag in soup.find_all("noscript")).lower()
+    if "javascript" in noscript:
+        return True
+    text_length = sum(
+        len(text.strip()) for text in soup.body.find_all(string=True)
+        if text.parent.name not in ("script", "style", "noscript", "template")
+    )
+    return text_length < MIN_STATIC_TEXT_CHARS and soup.find("script") is not None
+
+
+def page_title(soup):
+    return soup.title.get_text(strip=True) if soup.title else ""
+
+
+def fetch_page(url, save_dir, cookies=None, save_as=None):
+    """
+    Fetches a URL with a plain HTTP request. Returns one of:
+
+      ("html", final_url, soup)      for HTML pages, parsed with BeautifulSoup
+      ("document", final_url, path)  for anything else, streamed to save_dir
+                                     (or to the path save_as(final_url, name) returns)
+      None                           if the request failed
+    """
+    import urllib3
+    from bs4 import BeautifulSoup
+
+    headers = {"Cookie": cookies} if cookies else None
+    try:
+        response = _get_pool().request("GET", url, headers=headers, preload_content=False)
+    except urllib3.exceptions.HTTPError as e:
+        logging.info(f"HTTP fetch of {url} failed: {e}")
+        return None
+
+    try:
+        if response.status >= 400:
+            logging.info(f"HTTP fetch of {url} returned {response.status}")
+            return None
+        # After redirects, response.url may only be the path of the final request
+        final_url = urljoin(url, response.url) if response.url else url
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        head = response.read(2048)
+        content_type = _sniff_type(head, content_type, final_url)
+
+        if content_type in HTML_TYPES:
+            charset = re.search(r"charset=([\w-]+)", response.headers.get("Content-Type", ""))
+            body = head + response.read()
+            return "html", final_url, BeautifulSoup(body, "html.parser", from_encoding=charset.group(1) if charset else None)
+        return "document", final_url, _save_document(response, head, final_url, content_type, save_dir, save_as)
+    except (urllib3.exceptions.HTTPError, OSError) as e:
+        logging.warning(f"HTTP fetch of {url} failed while reading: {e}")
+        return None
+    finally:
+        # Unread leftovers (e.g. an error page) must go before the connection can be reused
+        response.drain_conn()
+        response.release_conn()
+
+
+def fetch_url(url, save_dir, cookies=None, documents_only=False):
+    """
+    Fetches a URL with a plain HTTP request, without a browser.
+
+    Documents (PDFs, decks, images...) are streamed to save_dir as they are;
+    static HTML pages are converted to Markdown like the browser path does
+    (see html_content.html_to_markdown).
+    Returns the saved path, or None if the page needs the browser after all:
+    it failed to load, or is HTML that relies on JavaScript (or any HTML when
+    documents_only is set).
+    """
+    from app.web_scraper import reserve_path
+
+    fetched = fetch_page(url, save_dir, cookies)
+    if fetched is None:
+        logging.info(f"Using the browser for {url}.")
+        return None
+    kind, final_url, result = fetched
+    if kind == "html":
+        if documents_only:
+            return None
+        if needs_javascript(result):
+            logging.info(f"{final_url} looks like it needs JavaScript; using the browser.")
+            return None
+        output_path = reserve_path(save_dir, f"{page_title(result) or urlparse(final_url).netloc}.md")
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(html_to_markdown(result))
+        logging.info(f"Content of {final_url} saved to {output_path} over HTTP.")
+        result = output_path
+
+    stats.increment("http_fetches")
+    return result
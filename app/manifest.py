@@ -0,0 +1,298 @@
+# app/manifest.py
+
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from app.hashing import file_digest
+
+# --- Safely import the manifest location from config ---
+try:
+    from app.config_manager import MANIFEST_DIR
+except ImportError:
+    MANIFEST_DIR = None
+
+MANIFEST_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+JOURNAL_FILENAME = "journal.jsonl"
+
+
+def get_manifest_directory(root):
+    """
+    Determines where the manifest for a directory run is kept.
+
+    Uses a per-directory folder inside MANIFEST_DIR if it's set, otherwise
+    a hidden '.textnomnom' folder inside the directory's 'extracted_texts/'.
+    """
+    root = os.path.abspath(root)
+    if MANIFEST_DIR:
+        root_id = hashlib.sha256(root.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(MANIFEST_DIR, f"{os.path.basename(root) or 'root'}-{root_id}")
+    return os.path.join(root, "extracted_texts", ".textnomnom")
+
+
+def load_manifest(root):
+    """Loads the manifest for a directory, or returns an empty one if there is none yet."""
+    manifest_dir = get_manifest_directory(root)
+    manifest = {"root": os.path.abspath(root), "dir": manifest_dir, "files": {}}
+    path = os.path.join(manifest_dir, MANIFEST_FILENAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION:
+            manifest["files"] = data.get("files", {})
+        else:
+            logging.info(f"Ignoring manifest with unknown version at {path}")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not read manifest {path}, starting from scratch: {e}")
+    return manifest
+
+
+def _default_file_mode():
+    """The permissions a newly created file gets under the current umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def save_manifest(manifest):
+    """
+    Writes the manifest atomically, so an interrupted run never leaves it
+    half-written. Returns whether it was saved.
+    """
+    path = os.path.join(manifest["dir"], MANIFEST_FILENAME)
+    try:
+        os.makedirs(manifest["dir"], exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=manifest["dir"], suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": manifest["files"]}, f, indent=1)
+        # mkstemp makes the file private; give it the mode any other output gets
+        os.chmod(temp_path, _default_file_mode())
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        logging.error(f"Could not save manifest {path}: {e}")
+        return False
+
+
+def _replay_journal(manifest, path):
+    """
+    Reads the journal of an interrupted run into the manifest. Returns the
+    keys of the files it completed, and of those that failed and haven't
+    changed since, or None if there is no journal.
+    """
+    done, failed = set(), set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return None
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # The last line may have been cut short when the run died
+        key = record["file"]
+        if "entry" in record:
+            manifest["files"][key] = record["entry"]
+            done.add(key)
+            failed.discard(key)
+            continue
+        with contextlib.suppress(OSError):
+            stat = os.stat(os.path.join(manifest["root"], key))
+            if (stat.st_size, stat.st_mtime) == (record["size"], record["mtime"]):
+                failed.add(key)
+    return done, failed
+
+
+def open_journal(manifest, resume=False):
+    """
+    Starts the journal of a directory run: an append-only log of every file
+    recorded (or failed) during the run, flushed as it goes, so the work is
+    not lost if the run is killed before the manifest is saved.
+
+    With resume, the journal of an interrupted run is read back into the
+    manifest first and added to; see journal_status. Otherwise it is
+    started afresh. Returns the number of files the interrupted run completed,
+    or None if there was no interrupted run to resume.
+    """
+    path = os.path.join(manifest["dir"], JOURNAL_FILENAME)
+    replayed = _replay_journal(manifest, path) if resume else None
+    done, failed = replayed or (set(), set())
+    manifest["journal_done"], manifest["journal_failed"] = done, failed
+    os.makedirs(manifest["dir"], exist_ok=True)
+    manifest["journal"] = open(path, "a" if resume else "w", encoding="utf-8")
+    return len(done) if replayed is not None else None
+
+
+def close_journal(manifest, completed=False):
+    """Closes the run's journal. A completed run's journal is deleted; an interrupted one's is kept for --resume."""
+    journal = manifest.pop("journal", None)
+    if journal is None:
+        return
+    journal.close()
+    if completed:
+        with contextlib.suppress(OSError):
+            os.remove(journal.name)
+
+
+def journal_status(manifest, file_path):
+    """'done' or 'failed' if the interrupted run being resumed got to this file, else None."""
+    key = _key(manifest, file_path)
+    if key in manifest.get("journal_done", ()):
+        return "done"
+    if key in manifest.get("journal_failed", ()):
+        return "failed"
+    return None
+
+
+def _append_to_journal(manifest, record):
+    journal = manifest.get("journal")
+    if journal is not None:
+        journal.write(json.dumps(record) + "\n")
+        journal.flush()
+
+
+def _key(manifest, file_path):
+    return os.path.relpath(os.path.abspath(file_path), manifest["root"])
+
+
+def cached_text_path(manifest, digest):
+    """Where the extracted text of an input with the given content hash is kept for --save-all."""
+    return os.path.join(manifest["dir"], "texts", f"{digest}.txt")
+
+
+def is_unchanged(manifest, file_path, options):
+    """
+    Checks whether a file was already extracted with the same options and has
+    not changed since. Size and mtime are compared first; the content hash is
+    only computed when the mtime moved but the size did not.
+    """
+    entry = manifest["files"].get(_key(manifest, file_path))
+    if not entry or entry["options"] != options:
+        return False
+    # The previous output must still be there to be reused
+    output = entry.get("output")
+    if output and not os.path.exists(output):
+        return False
+    if entry.get("text") and not os.path.exists(cached_text_path(manifest, entry["sha256"])):
+        return False
+
+    stat = os.stat(file_path)
+    if stat.st_size != entry["size"]:
+        return False
+    if stat.st_mtime == entry["mtime"]:
+        return True
+    if file_digest(file_path) == entry["sha256"]:
+        entry["mtime"] = stat.st_mtime  # Touched but not modified
+        return True
+    return False
+
+
+def get_entry(manifest, file_path):
+    """Returns the manifest entry for a file, or None."""
+    return manifest["files"].get(_key(manifest, file_path))
+
+
+def spool_path(manifest, file_path):
+    """Where a --save-all run has a file's text written before record_file keeps it."""
+    name = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return os.path.join(manifest["dir"], "spool", f"{name}.txt")
+
+
+def record_file(manifest, file_path, options, output_path=None, text_file=None, digest=None, shared_text=False):
+    """
+    Records a successfully extracted file. For --save-all runs, pass the file
+    its text was written to (see spool_path); it is moved into the manifest's
+    folder so it can be reused for the combined output when the file is unchanged.
+    For a duplicate of a file recorded with its text, set shared_text instead:
+    the text is kept per content hash, so they share it. digest skips hashing
+    the file again when its hash is already known.
+    """
+    stat = os.stat(file_path)
+    digest = digest or file_digest(file_path)
+    entry = {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": digest,
+        "options": options,
+        "output": output_path,
+        "text": text_file is not None or shared_text,
+    }
+    if text_file is not None:
+        path = cached_text_path(manifest, digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(text_file, path)
+    key = _key(manifest, file_path)
+    previous = manifest["files"].get(key)
+    if previous and (previous.get("output") != output_path or previous.get("text") and not entry["text"]):
+        # e.g. the folder was switched between per-file outputs and --save-all;
+        # remove_deleted deletes what the old entry had unless another file still uses it
+        manifest.setdefault("replaced", []).append(previous)
+    manifest["files"][key] = entry
+    _append_to_journal(manifest, {"file": key, "entry": entry})
+
+
+def record_failure(manifest, file_path):
+    """
+    Notes in the journal that a file could not be extracted, so --resume doesn't
+    try it again. Files that are gone or can't be read are left out.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError as e:
+        logging.warning(f"Not recording the failure of {file_path} in the journal: {e}")
+        return
+    _append_to_journal(manifest, {"file": _key(manifest, file_path), "size": stat.st_size, "mtime": stat.st_mtime})
+
+
+def cached_text_file(manifest, file_path):
+    """Returns the path of the text kept for a file in a --save-all run, or None."""
+    entry = get_entry(manifest, file_path)
+    if not entry or not entry.get("text"):
+        return None
+    path = cached_text_path(manifest, entry["sha256"])
+    return path if os.path.exists(path) else None
+
+
+def remove_deleted(manifest, existing_paths):
+    """
+    Drops entries for inputs that no longer exist and deletes their outputs.
+    existing_paths are the inputs found by the scan; an entry not among them
+    is only dropped if its input is really gone, not just filtered out.
+    Outputs that re-extracted files no longer use (see record_file) are
+    deleted too. Returns the number of entries removed.
+    """
+    existing = {_key(manifest, path) for path in existing_paths}
+    removed = {
+        key for key in manifest["files"]
+        if key not in existing and not os.path.exists(os.path.join(manifest["root"], key))
+    }
+    kept = [entry for key, entry in manifest["files"].items() if key not in removed]
+    kept_digests = {entry["sha256"] for entry in kept}
+    kept_outputs = {entry.get("output") for entry in kept}
+    kept_texts = {entry["sha256"] for entry in kept if entry.get("text")}
+    for entry in manifest.pop("replaced", []):
+        if entry.get("output") and entry["output"] not in kept_outputs:
+            with contextlib.suppress(OSError):
+                os.remove(entry["output"])
+                logging.info(f"Removed output no longer used: {entry['output']}")
+        if entry.get("text") and entry["sha256"] not in kept_texts:
+            with contextlib.suppress(OSError):
+                os.remove(cached_text_path(manifest, entry["sha256"]))
+    for key in removed:
+        entry = manifest["files"].pop(key)
+        # e.g. 'a.pdf' and 'a.pptx' share 'a.txt'; keep it if the other one is still there
+        if entry.get("output") and entry["output"] not in kept_outputs:
+            with contextlib.suppress(OSError):
+                os.remove(entry["output"])
+                logging.info(f"Removed output of deleted input {key}: {entry['output']}")
+        if entry.get("text") and entry["sha256"] not in kept_digests:
+            with contextlib.suppress(OSError):
+                os.remove(cached_text_path(manifest, entry["sha256"]))
+    return len(removed)
@@ -0,0 +1,83 @@
+# app/scanner.py
+
+import fnmatch
+import logging
+import os
+import re
+
+# --- Safely import the scan settings from config ---
+try:
+    from app.config_manager import SCAN_EXCLUDE, SCAN_MAX_DEPTH
+except ImportError:
+    SCAN_EXCLUDE, SCAN_MAX_DEPTH = [], None
+
+# Folders TextNomNom writes its own output to; never scanned, so a re-run
+# doesn't pick up the text files of the previous one
+OUTPUT_DIR_NAME = "extracted_texts"
+
+
+def _compile_globs(patterns):
+    """One regex for a list of globs, so each name is matched once instead of once per pattern."""
+    patterns = [pattern.replace("\\", "/").strip("/") for pattern in patterns if pattern]
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(os.path.normcase(pattern)) for pattern in patterns))
+
+
+def _matches(regex, relative_path, name):
+    """Globs with a '/' are matched against the path relative to the scanned folder, others against the name."""
+    return bool(regex.match(os.path.normcase(name)) or regex.match(os.path.normcase(relative_path)))
+
+
+def scan_directory(root, extensions=None, include=(), exclude=(), max_depth=None, skip_paths=()):
+    """
+    Yields the files under root, lazily, in the same order as os.walk: a
+    folder's files first, then its subfolders one by one.
+
+    extensions: only files with one of these (lower-case) extensions are yielded.
+    include/exclude: glob patterns like 'reports/*.pdf' or '*.tmp'. If any
+      include pattern is given, only files matching one are yielded; files and
+      folders matching an exclude pattern (or SCAN_EXCLUDE) are skipped.
+    max_depth: how many folder levels below root to go into (0 = only root's
+      own files). Defaults to SCAN_MAX_DEPTH, and to no limit.
+    skip_paths: folders to leave out, e.g. a manifest directory inside root.
+
+    'extracted_texts' output folders and symlinked folders are never entered.
+    Folders that can't be read are logged and skipped.
+    """
+    extensions = frozenset(extensions) if extensions is not None else None
+    includes = _compile_globs(include)
+    excludes = _compile_globs(list(SCAN_EXCLUDE or ()) + list(exclude))
+    max_depth = SCAN_MAX_DEPTH if max_depth is None else max_depth
+    skip_paths = {os.path.normcase(os.path.abspath(path)) for path in skip_paths}
+
+    # (folder, path relative to root, depth); popped from the end, so subfolders are pushed in reverse
+    stack = [(root, "", 0)]
+    while stack:
+        folder, relative, depth = stack.pop()
+        subfolders = []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    relative_path = f"{relative}/{entry.name}" if relative else entry.name
+                    if excludes and _matches(excludes, relative_path, entry.name):
+                        continue
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        if entry.name != OUTPUT_DIR_NAME and not entry.is_symlink() and (max_depth is None or depth < max_depth):
+                            subfolders.append((entry.path, relative_path, depth + 1))
+                        continue
+                    if extensions is not None and os.path.splitext(entry.name)[1].lower() not in extensions:
+                        continue
+                    if includes and not _matches(includes, relative_path, entry.name):
+                        continue
+                    yield entry.path
+        except OSError as e:
+            logging.warning(f"Could not scan {folder}: {e}")
+            continue
+        if skip_paths:
+            subfolders = [item for item in subfolders if os.path.normcase(os.path.abspath(item[0])) not in skip_paths]
+        stack.extend(reversed(subfolders))
@@ -0,0 +1,370 @@
+# app/server.py
+
+import ipaddress
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app import stats
+from app.batch_processor import create_pool, default_jobs, extract_in_pool
+
+# --- Safely import the server settings from config ---
+try:
+    from app.config_manager import SERVE_ADDRESS, SERVE_WORKERS, SERVE_MAX_QUEUE, SERVE_MAX_UPLOAD_MB
+except ImportError:
+    SERVE_ADDRESS, SERVE_WORKERS, SERVE_MAX_QUEUE, SERVE_MAX_UPLOAD_MB = "127.0.0.1:8765", None, 32, 200
+
+try:
+    from app.config_manager import SERVE_PATH_ROOT
+except ImportError:
+    SERVE_PATH_ROOT = None
+
+try:
+    from app.config_manager import SERVE_REMOTE_SCRAPE
+except ImportError:
+    SERVE_REMOTE_SCRAPE = False
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    # Request threads are joined on shutdown so in-flight jobs can finish
+    daemon_threads = False
+    block_on_close = True
+
+
+if hasattr(socketserver, "UnixStreamServer"):  # Not available on Windows
+    class _ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = False
+        block_on_close = True
+
+
+def parse_address(address):
+    """
+    Parses a --serve address: 'unix:/path/to.sock', 'HOST:PORT' or just 'PORT'.
+    Returns ('unix', path) or ('tcp', (host, port)).
+    """
+    address = address or SERVE_ADDRESS
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+def _is_loopback(host):
+    """Whether a host name or address only accepts connections from this machine."""
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+def _allowed_path(server, path):
+    """
+    Returns the file a {"path": ...} request may read, or None if the server
+    doesn't expose it: with a path root, only files under it (relative paths
+    are taken from it, and symlinks can't lead out); without one, any file,
+    but only while the server can't be reached from other machines.
+    """
+    if not server.path_root:
+        return path if server.local_only else None
+    real = os.path.realpath(os.path.join(server.path_root, path))
+    try:
+        inside = os.path.commonpath([real, server.path_root]) == server.path_root
+    except ValueError:  # e.g. another drive on Windows
+        inside = False
+    return real if inside else None
+
+
+def _socket_in_use(path):
+    """Checks whether a live server is accepting connections on a Unix socket path."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+class ExtractionHandler(BaseHTTPRequestHandler):
+    """
+    Handles the server's HTTP API:
+
+      GET  /health   Server status and queue depth, as JSON.
+      POST /extract  Extracts a document. Send either JSON {"path": ...} for a
+                     file the server can read (see _allowed_path), or the
+                     document itself as the body with ?name=file.pdf so its
+                     type is known.
+      POST /scrape   Scrapes {"url": ...} with scrape_and_save.
+
+    OCR options (ocr, ocr_mix, ocr_smart) can be given as query parameters or
+    JSON fields. Responses are plain text unless format=json is requested.
+    """
+
+    server_version = "TextNomNom"
+
+    def log_message(self, format, *args):
+        logging.info(f"Server: {format % args}")
+
+    def _send(self, status, body, content_type="text/plain; charset=utf-8", headers=None):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload, ensure_ascii=False), "application/json; charset=utf-8", headers)
+
+    def _send_error_json(self, status, message):
+        self._send_json(status, {"error": message})
+
+    def _read_request(self):
+        """Returns (options, body) where options merges the query string and any JSON body."""
+        query = {key: values[-1] for key, values in parse_qs(urlparse(self.path).query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > SERVE_MAX_UPLOAD_MB * 1024 * 1024:
+            raise ValueError(f"Request body is larger than {SERVE_MAX_UPLOAD_MB} MB.")
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            options = json.loads(body or b"{}")
+            if not isinstance(options, dict):
+                raise ValueError("The JSON body must be an object, e.g. {\"path\": ...}.")
+            query.update(options)
+            body = b""
+        return query, body
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/health":
+            return self._send_error_json(404, "Not found.")
+        self._send_json(200, {
+            "status": "shutting down" if self.server.stopping.is_set() else "ok",
+            "active": self.server.active,
+            "workers": self.server.workers,
+            "max_queue": self.server.max_queue,
+        })
+
+    def do_POST(self):
+        route = urlparse(self.path).path
+        if route not in ("/extract", "/scrape"):
+            return self._send_error_json(404, "Not found.")
+        try:
+            options, body = self._read_request()
+        except ValueError as e:
+            return self._send_error_json(400, str(e))
+
+        if not self.server.admit():
+            return self._send_json(503, {"error": "Server is busy, try again later."}, {"Retry-After": "1"})
+        try:
+            if route == "/extract":
+                self._extract(options, body)
+            else:
+                self._scrape(options)
+        except Exception as e:
+            logging.error(f"Server: request to {route} failed: {e}")
+            self._send_error_json(500, "Internal error. Run the server with --debug for details.")
+        finally:
+            self.server.release()
+
+    def _respond_with_text(self, options, name, text):
+        if text is None:
+            return self._send_error_json(422, f"Could not extract text from {name}.")
+        if str(options.get("format", "text")).lower() == "json":
+            return self._send_json(200, {"name": name, "text": text})
+        self._send(200, text)
+
+    def _extract(self, options, body):
+        flags = tuple(str(options.get(flag, "")).lower() in TRUE_VALUES for flag in ("ocr", "ocr_mix", "ocr_smart"))
+        if body:
+            name = os.path.basename(options.get("name") or "")
+            if not os.path.splitext(name)[1]:
+                return self._send_error_json(400, "Uploads need a ?name= with a file extension.")
+            # Uploaded documents only live for the duration of the request
+            fd, path = tempfile.mkstemp(suffix=os.path.splitext(name)[1], prefix="textnomnom_upload_")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(body)
+                text = self.server.extract(path, flags)
+            finally:
+                os.remove(path)
+        else:
+            path = options.get("path")
+            if not path:
+                return self._send_error_json(400, "Send a document as the body or a JSON {\"path\": ...}.")
+            allowed = _allowed_path(self.server, path)
+            if allowed is None:
+                if self.server.path_root:
+                    return self._send_error_json(403, "Only files under the server's --serve-root folder can be read.")
+                return self._send_error_json(
+                    403, "Reading files by path is off because the server is reachable from other machines; "
+                         "start it with --serve-root DIR, or upload the document instead."
+                )
+            name, path = path, allowed
+            if not os.path.isfile(path):
+                return self._send_error_json(404, f"File not found: {name}")
+            text = self.server.extract(path, flags)
+        self._respond_with_text(options, name, text)
+
+    def _scrape(self, options):
+        if not self.server.scrape_allowed:
+            # Would let anyone on the network make this machine fetch URLs and fill its disk
+            return self._send_error_json(
+                403, "Scraping is off because the server is reachable from other machines; "
+                     "start it with --serve-remote-scrape to allow it."
+            )
+        url = options.get("url")
+        if not url or not url.startswith("http"):
+            return self._send_error_json(400, "Send a JSON {\"url\": \"http...\"}.")
+        saved_path = self.server.scrape(url)
+        if not saved_path:
+            return self._send_error_json(502, f"Could not scrape {url}.")
+        if not saved_path.lower().endswith(".md"):
+            # A downloaded document, e.g. a PDF
+            text = self.server.extract(saved_path, (False, False, False))
+        else:
+            with open(saved_path, "r", encoding="utf-8") as f:
+                text = f.read()
+        if str(options.get("format", "text")).lower() == "json":
+            return self._send_json(200, {"url": url, "path": saved_path, "text": text})
+        self._respond_with_text(options, url, text)
+
+
+def _attach_state(server, workers, max_queue, warm_browser):
+    """Adds the job pool, the admission counter and the optional warm browser to a server."""
+    server.workers = workers
+    server.max_queue = max_queue
+    server.active = 0
+    server.stopping = threading.Event()
+    server.pool = create_pool(workers)
+    server.pool_lock = threading.Lock()
+    server.driver = None
+    server.driver_lock = threading.Lock()
+    state_lock = threading.Lock()
+
+    if warm_browser:
+        from app.browser_utils import get_driver
+        try:
+            server.driver, browser = get_driver()
+            print(f"-> Keeping a warm {browser.capitalize()} driver for /scrape.")
+        except Exception as e:
+            print(f"❌ Could not start a browser, /scrape will start one per request: {e}", file=sys.stderr)
+
+    def admit():
+        """Counts a job in, unless the server is stopping or running + queued jobs hit the limit."""
+        with state_lock:
+            if server.stopping.is_set() or server.active >= workers + max_queue:
+                return False
+            server.active += 1
+            return True
+
+    def release():
+        with state_lock:
+            server.active -= 1
+
+    def extract(path, flags):
+        pool = server.pool
+        try:
+            return extract_in_pool(pool, path, *flags)
+        except BrokenProcessPool:
+            # A worker crashed on this document; replace the pool for the next ones
+            logging.error(f"Server: a worker crashed while processing {path}; restarting the pool.")
+            with server.pool_lock:
+                if server.pool is pool:
+                    server.pool = create_pool(workers)
+            pool.shutdown(wait=False)
+            return None
+
+    def scrape(url):
+        from app.web_scraper import scrape_and_save
+        if server.driver is None:
+            return scrape_and_save(url)
+        # One warm driver can only load one page at a time
+        with server.driver_lock:
+            return scrape_and_save(url, driver=server.driver)
+
+    server.admit, server.release = admit, release
+    server.extract, server.scrape = extract, scrape
+
+
+def serve(address=None, workers=None, max_queue=None, warm_browser=False, path_root=None, remote_scrape=None):
+    """
+    Runs the extraction server until SIGINT/SIGTERM. Documents are extracted by
+    a warm pool of worker processes (see create_pool), so handlers are already
+    loaded and OCR threads are shared between them. On shutdown, new jobs are
+    refused and running ones are allowed to finish.
+    path_root (default SERVE_PATH_ROOT) limits which files {"path": ...}
+    requests can read; see _allowed_path. /scrape is only accepted on a local
+    address unless remote_scrape (default SERVE_REMOTE_SCRAPE) is set.
+    """
+    kind, bind_to = parse_address(address)
+    workers = workers or SERVE_WORKERS or default_jobs()
+    max_queue = SERVE_MAX_QUEUE if max_queue is None else max_queue
+    path_root = path_root or SERVE_PATH_ROOT
+    if path_root:
+        path_root = os.path.realpath(path_root)
+        if not os.path.isdir(path_root):
+            raise ValueError(f"The --serve-root folder does not exist: {path_root}")
+    local_only = kind == "unix" or _is_loopback(bind_to[0])
+    remote_scrape = SERVE_REMOTE_SCRAPE if remote_scrape is None else remote_scrape
+
+    if kind == "unix":
+        if not hasattr(socketserver, "UnixStreamServer"):
+            raise EnvironmentError("Unix sockets are not supported on this platform; use HOST:PORT instead.")
+        if os.path.exists(bind_to):
+            if _socket_in_use(bind_to):
+                raise OSError(f"Another server is already listening on {bind_to}")
+            os.remove(bind_to)  # Left behind by a server that didn't shut down cleanly
+        server = _ThreadingUnixHTTPServer(bind_to, ExtractionHandler)
+        os.chmod(bind_to, 0o600)
+        where = f"unix:{bind_to}"
+    else:
+        server = _ThreadingHTTPServer(bind_to, ExtractionHandler)
+        where = f"http://{bind_to[0]}:{server.server_address[1]}"
+    _attach_state(server, workers, max_queue, warm_browser)
+    server.path_root, server.local_only = path_root, local_only
+    server.scrape_allowed = local_only or remote_scrape
+
+    stop = threading.Event()
+    previous_handlers = {sig: signal.signal(sig, lambda *_: stop.set()) for sig in (signal.SIGINT, signal.SIGTERM)}
+    thread = threading.Thread(target=server.serve_forever, name="textnomnom-server", daemon=True)
+    thread.start()
+    print(f"✔ Serving on {where} with {workers} worker(s) (max {max_queue} queued). Press Ctrl+C to stop.")
+    if path_root:
+        print(f"-> Files can be read by path under {path_root} only.")
+    elif not local_only:
+        print("-> Reachable from other machines: reading files by path is off (use --serve-root DIR to allow a folder).")
+    if not server.scrape_allowed:
+        print("-> Reachable from other machines: /scrape is off (use --serve-remote-scrape to allow it).")
+    logging.info(f"Server started on {where}")
+
+    try:
+        while not stop.wait(0.5):
+            pass
+    finally:
+        print("\n-> Shutting down: finishing running jobs...")
+        server.stopping.set()
+        server.shutdown()
+        server.server_close()  # Joins the request threads
+        server.pool.shutdown(wait=True)
+        if server.driver:
+            server.driver.quit()
+        if kind == "unix" and os.path.exists(bind_to):
+            os.remove(bind_to)
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+        stats.report()
+        logging.info("Server stopped.")
@@ -0,0 +1,189 @@
+# app/stats.py
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+# Counters collected during a run (e.g. pages skipped by smart OCR). Worker
+# processes send theirs back to the parent with collect(), which merges them.
+_counters = Counter()
+_lock = threading.Lock()  # Counters are also updated from OCR threads
+
+# Time spent per stage (PDF parsing, rendering, OCR, conversion, writing...),
+# as stage -> [count, seconds], and per file as file -> {stage: seconds}.
+# Stages timed from OCR threads add up, so they can exceed the wall time.
+_stages = {}
+_file_stages = {}
+_current_file = None  # The file being processed in this process, see timed_file
+
+
+def increment(name, amount=1):
+    """Adds amount to the named counter."""
+    with _lock:
+        _counters[name] += amount
+
+
+def get(name):
+    """Returns the current value of the named counter."""
+    return _counters[name]
+
+
+def record(stage, seconds, file_path=None, count=1):
+    """Adds a duration to a stage, and to the given (or current) file's stages."""
+    file_path = file_path or _current_file
+    with _lock:
+        entry = _stages.setdefault(stage, [0, 0.0])
+        entry[0] += count
+        entry[1] += seconds
+        if file_path:
+            per_file = _file_stages.setdefault(file_path, {})
+            per_file[stage] = per_file.get(stage, 0.0) + seconds
+
+
+@contextlib.contextmanager
+def timed(stage, file_path=None):
+    """Times the body of a with block as one occurrence of stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, file_path)
+
+
+def timed_iter(stage, iterable):
+    """
+    Yields from iterable, timing how long each item takes to produce (not how
+    long the caller spends on it). Useful for lazily read pages and slides.
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                record(stage, time.perf_counter() - start, count=0)
+                return
+            record(stage, time.perf_counter() - start)
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close:
+            close()
+
+
+@contextlib.contextmanager
+def timed_file(file_path):
+    """Times a whole file as the "file" stage; stages timed meanwhile are attributed to it."""
+    global _current_file
+    previous, _current_file = _current_file, file_path
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _current_file = previous
+        record("file", seconds, file_path)
+        logging.info(f"Finished {file_path} in {seconds:.2f}s")
+
+
+def collect():
+    """Returns the counters and timings as plain dicts and resets them."""
+    with _lock:
+        collected = {"counters": dict(_counters), "stages": _stages.copy(), "files": _file_stages.copy()}
+        _counters.clear()
+        _stages.clear()
+        _file_stages.clear()
+    return collected
+
+
+def merge(collected, files=True):
+    """
+    Adds counters and timings collected elsewhere (e.g. in a worker process) to
+    this process. With files=False, per-file timings are dropped.
+    """
+    if not collected:
+        return
+    with _lock:
+        _counters.update(collected["counters"])
+        for stage, (count, seconds) in collected["stages"].items():
+            entry = _stages.setdefault(stage, [0, 0.0])
+            entry[0] += count
+            entry[1] += seconds
+        for file_path, stages in (collected["files"] if files else {}).items():
+            per_file = _file_stages.setdefault(file_path, {})
+            for stage, seconds in stages.items():
+                per_file[stage] = per_file.get(stage, 0.0) + seconds
+
+
+def write_metrics(output_path, wall_seconds=None, slowest=20):
+    """
+    Writes the run's counters and per-stage timings as JSON, along with the
+    slowest files and where their time went.
+    """
+    with _lock:
+        files = sorted(_file_stages.items(), key=lambda item: item[1].get("file", 0.0), reverse=True)
+        metrics = {
+            "wall_seconds": round(wall_seconds, 4) if wall_seconds is not None else None,
+            "stages": {
+                stage: {"count": count, "seconds": round(seconds, 4)}
+                for stage, (count, seconds) in sorted(_stages.items(), key=lambda item: item[1][1], reverse=True)
+            },
+            "counters": dict(_counters),
+            "files": len(files),
+            "slowest_files": [
+                {
+                    "file": file_path,
+                    "seconds": round(stages.get("file", 0.0), 4),
+                    "stages": {stage: round(seconds, 4) for stage, seconds in stages.items() if stage != "file"},
+                }
+                for file_path, stages in files[:slowest]
+            ],
+        }
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+
+
+def report():
+    """Prints a short summary of the counters collected during the run, if any."""
+    ocr_pages = _counters["smart_ocr_pages"]
+    if ocr_pages:
+        skipped = _counters["smart_ocr_skipped"]
+        print(f"-> Smart OCR skipped {skipped} of {ocr_pages} page(s) that already had a usable text layer.")
+
+    hits, misses = _counters["ocr_cache_hits"], _counters["ocr_cache_misses"]
+    if hits or misses:
+        print(f"-> OCR cache: {hits} hit(s), {misses} miss(es).")
+
+    skipped_images = _counters["ocr_images_skipped"]
+    if skipped_images:
+        print(f"-> Skipped OCR on {skipped_images} blank or tiny image(s).")
+
+    hits, misses = _counters["conversion_cache_hits"], _counters["conversion_cache_misses"]
+    if hits or misses:
+        print(f"-> Conversion cache: {hits} hit(s), {misses} conversion(s).")
+
+    duplicates = _counters["duplicate_files"]
+    if duplicates:
+        size = _counters["duplicate_bytes"] / 2**20
+        print(f"-> Skipped extracting {duplicates} duplicate file(s) ({size:.1f} MiB); they reuse an identical file's text.")
+    stopped = _counters["files_stopped"]
+    if stopped:
+        print(f"-> Stopped {stopped} file(s) that went over the --file-timeout or --max-memory limit.")
+
+    restarts = _counters["scrape_driver_restarts"]
+    if restarts:
+        print(f"-> Restarted {restarts} crashed browser(s) while scraping.")
+
+    fetched, fallbacks = _counters["http_fetches"], _counters["browser_fallbacks"]
+    if fetched or fallbacks:
+        print(f"-> Scraping: {fetched} page(s) fetched over HTTP, {fallbacks} needed the browser.")
+
+    failures = _counters["crawl_failures"]
+    if failures:
+        print(f"-> Crawl: {failures} page(s) could not be fetched.")
@@ -1,14 +1,20 @@
 # app/web_scraper.py
 
+import itertools
 import logging
 import os
+import queue
 import re
 import sys
+import threading
 from pathlib import Path
+from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import WebDriverException
-from markdownify import markdownify as md
+from app import stats
 from app.browser_utils import get_driver
+from app.html_content import dropped_tags, html_to_markdown
+from app.http_fetch import fetch_url
 
 # --- Safely import the save directory from config ---
 try:
@@ -16,6 +22,16 @@ try:
 except ImportError:
     SCRAPED_FILES_DIR = None
 
+try:
+    from app.config_manager import SCRAPE_DRIVERS
+except ImportError:
+    SCRAPE_DRIVERS = 2
+
+try:
+    from app.config_manager import SCRAPE_HTTP_FIRST
+except ImportError:
+    SCRAPE_HTTP_FIRST = True
+
 
 def get_save_directory():
     """
@@ -38,52 +54,62 @@ def sanitize_filename(filename):
     return re.sub(r'[<>:"/\\|?*]', "_", filename)
 
 
-def scrape_and_save(url):
+def reserve_path(directory, filename):
     """
-    Scrapes a given URL, converts the HTML content to Markdown, and saves it.
-
-    Args:
-        url (str): The URL to scrape.
+    Creates an empty file named filename in directory and returns its path. If
+    the name is taken, ' (2)', ' (3)'... is added, so pages with the same title
+    never overwrite each other, even when scraped at the same time.
     """
-    print(f"-> Scraping content from: {url}")
-    logging.info(f"Scraping URL: {url}")
+    stem, ext = os.path.splitext(sanitize_filename(filename).strip() or "untitled")
+    stem = stem[:150].strip() or "untitled"
+    for n in itertools.count(1):
+        path = os.path.join(directory, f"{stem}{ext}" if n == 1 else f"{stem} ({n}){ext}")
+        try:
+            with open(path, "x"):
+                return path
+        except FileExistsError:
+            continue
 
-    save_dir = get_save_directory()
-    os.makedirs(save_dir, exist_ok=True)
 
-    driver = None
-    try:
-        driver, browser = get_driver()
-        print(f"-> Using {browser.capitalize()} to load the page...")
-        driver.get(url)
-
-        if "pdf" in driver.current_url:
-            print("-> PDF file detected. Downloading...")
-            logging.info("PDF file detected, saving...")
-            pdf_path = os.path.join(save_dir, "scraped_document.pdf")
-            with open(pdf_path, "wb") as f:
-                f.write(driver.page_source.encode("utf-8"))
-            print(f"✔ Successfully saved PDF to: {pdf_path}")
-            logging.info(f"PDF saved to {pdf_path}")
-            return
-
-        print("-> Page loaded. Extracting content...")
-        logging.info(f"Page Title: {driver.title}")
-        body_element = driver.find_element(By.TAG_NAME, "body")
-        html_content = body_element.get_attribute("outerHTML")
-
-        markdown_content = md(html_content)
-        sanitized_title = sanitize_filename(driver.title)
-        filename = f"{sanitized_title}.md"
-        output_path = os.path.join(save_dir, filename)
-
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(markdown_content)
+_BODY_WITHOUT_NON_CONTENT = """
+if (!document.body) { return null; }
+const body = document.body.cloneNode(true);
+body.querySelectorAll(arguments[0]).forEach(element => element.remove());
+return body.outerHTML;
+"""
 
-        print(f"✔ Successfully saved content to: {output_path}")
-        logging.info(f"Content saved to {output_path} using {browser.capitalize()}.")
 
-    except WebDriverException as e:
+def _scrape_page(driver, url, save_dir):
+    """Loads url in driver and saves it to save_dir. Returns the saved path; errors are raised."""
+    driver.get(url)
+
+    if "pdf" in driver.current_url.lower():
+        # The browser only shows its PDF viewer; download the file itself, with the browser's cookies
+        logging.info("PDF file detected, downloading...")
+        cookies = "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in driver.get_cookies())
+        pdf_path = fetch_url(driver.current_url, save_dir, cookies=cookies, documents_only=True)
+        if not pdf_path:
+            raise RuntimeError(f"Could not download the PDF at {driver.current_url}")
+        return pdf_path
+
+    logging.info(f"Page Title: {driver.title}")
+    # Scripts, styles and, in article mode, SVG and the like are removed in the
+    # browser (on a copy of the page), so they aren't sent over the WebDriver connection at all
+    html_content = driver.execute_script(_BODY_WITHOUT_NON_CONTENT, ", ".join(dropped_tags()))
+    if html_content is None:
+        html_content = driver.find_element(By.TAG_NAME, "body").get_attribute("outerHTML")
+
+    markdown_content = html_to_markdown(BeautifulSoup(html_content, "html.parser"))
+    output_path = reserve_path(save_dir, f"{driver.title}.md")
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(markdown_content)
+    logging.info(f"Content of {url} saved to {output_path}")
+    return output_path
+
+
+def _report_scrape_error(url, e):
+    """Explains a failed scrape to the user; network problems get their own message."""
+    if isinstance(e, WebDriverException):
         error_text = str(e).lower()
         # This list now includes the Firefox-specific network error
         network_errors = [
@@ -98,11 +124,173 @@ def scrape_and_save(url):
         else:
             print("❌ A browser error occurred. Run with --debug for details.", file=sys.stderr)
             logging.error(f"WebDriverException while scraping '{url}'. Full error: {e}")
-
-    except Exception as e:
+    else:
         # Catch any other unexpected errors
         print("❌ An unknown error occurred. Run with --debug to see technical details.", file=sys.stderr)
         logging.error(f"Failed to scrape '{url}'. Full error: {e}")
+
+
+def scrape_and_save(url, driver=None):
+    """
+    Scrapes a given URL, converts the HTML content to Markdown, and saves it.
+    Documents (e.g. PDFs) are downloaded as they are. A plain HTTP request is
+    tried first; the browser is only started for pages that need JavaScript.
+
+    Args:
+        url (str): The URL to scrape.
+        driver: An already running WebDriver to use (e.g. the server's warm one).
+            It is left open; otherwise a driver is started and quit here.
+
+    Returns:
+        str: The path of the saved file, or None if scraping failed.
+    """
+    print(f"-> Scraping content from: {url}")
+    logging.info(f"Scraping URL: {url}")
+
+    save_dir = get_save_directory()
+    os.makedirs(save_dir, exist_ok=True)
+
+    if SCRAPE_HTTP_FIRST:
+        output_path = fetch_url(url, save_dir)
+        if output_path:
+            print(f"✔ Successfully saved content to: {output_path}")
+            return output_path
+        stats.increment("browser_fallbacks")
+
+    owns_driver = driver is None
+    try:
+        if owns_driver:
+            driver, browser = get_driver()
+        else:
+            browser = driver.name
+        print(f"-> Using {browser.capitalize()} to load the page...")
+        output_path = _scrape_page(driver, url, save_dir)
+        print(f"✔ Successfully saved content to: {output_path}")
+        return output_path
+    except Exception as e:
+        _report_scrape_error(url, e)
     finally:
-        if driver:
+        if owns_driver and driver:
             driver.quit()
+    return None
+
+
+def read_url_list(source):
+    """
+    Reads URLs from a file, or from stdin when source is '-': one per line,
+    ignoring blank lines, '#' comments and repeats.
+    """
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    urls = (line.strip() for line in lines)
+    return list(dict.fromkeys(url for url in urls if url and not url.startswith("#")))
+
+
+def _new_driver():
+    driver, _ = get_driver()
+    return driver
+
+
+def _driver_alive(driver):
+    """Whether a driver's browser still answers; a page error leaves it alive, a crash doesn't."""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def _quit_quietly(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        logging.warning(f"Could not quit a crashed browser cleanly: {e}")
+
+
+def scrape_urls(urls, drivers=None, callback=None, driver_factory=None):
+    """
+    Scrapes many URLs with a pool of long-lived browsers instead of starting
+    one per page. Each of the `drivers` threads first tries a plain HTTP
+    request (see fetch_url) and only then uses its own browser, which is
+    started on first use and reused for page after page. A browser that crashes is replaced and
+    its page retried once; pages that fail or time out (see
+    SCRAPE_PAGE_TIMEOUT) are skipped.
+
+    driver_factory returns a new driver (get_driver's by default).
+    callback is called once per URL, when it is done; URLs left over because
+    no browser could be started are reported as failed.
+    Returns {url: saved path or None}, in the order of urls.
+    """
+    driver_factory = driver_factory or _new_driver
+    drivers = max(1, min(drivers or SCRAPE_DRIVERS, len(urls)))
+    save_dir = get_save_directory()
+    os.makedirs(save_dir, exist_ok=True)
+
+    pending = queue.Queue()
+    for url in urls:
+        pending.put(url)
+    results = {}
+
+    def worker():
+        driver = None
+        try:
+            while True:
+                try:
+                    url = pending.get_nowait()
+                except queue.Empty:
+                    return
+                if SCRAPE_HTTP_FIRST:
+                    results[url] = fetch_url(url, save_dir)
+                    if results[url]:
+                        if callback:
+                            callback()
+                        continue
+                    stats.increment("browser_fallbacks")
+                for attempt in (1, 2):
+                    if driver is None:
+                        try:
+                            driver = driver_factory()
+                        except Exception as e:
+                            # Without a browser this thread can't help; the others carry on
+                            logging.error(f"Could not start a browser for batch scraping: {e}")
+                            results[url] = None
+                            if callback:
+                                callback()
+                            return
+                    try:
+                        results[url] = _scrape_page(driver, url, save_dir)
+                        break
+                    except Exception as e:
+                        if _driver_alive(driver):
+                            logging.error(f"Failed to scrape '{url}': {e}")
+                            results[url] = None
+                            break
+                        logging.warning(f"The browser crashed while loading '{url}' (attempt {attempt}); restarting it.")
+                        stats.increment("scrape_driver_restarts")
+                        _quit_quietly(driver)
+                        driver = None
+                        results[url] = None
+                if callback:
+                    callback()
+        finally:
+            if driver:
+                _quit_quietly(driver)
+
+    threads = [threading.Thread(target=worker, name=f"scraper-{i}") for i in range(drivers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Left over if every browser failed to start; they still count as done (and failed)
+    left_over = [url for url in urls if url not in results]
+    if left_over:
+        logging.error(f"No browser could be started; {len(left_over)} URL(s) were not scraped.")
+        for url in left_over:
+            results[url] = None
+            if callback:
+                callback()
+    return {url: results[url] for url in urls}
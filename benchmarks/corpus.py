@@ -0,0 +1,308 @@
+# benchmarks/corpus.py
+"""
+Generates a synthetic document corpus for the benchmarks, entirely offline:
+text PDFs, scanned-image PDFs, decks with many slides and pictures, loose
+images with text on them, and saved web pages full of menus, scripts and SVG. The same settings and seed always produce the same
+documents. OCR fixtures (600-DPI colour scans, large screenshots, shaded,
+blank and tiny images) come with the text drawn on them in truth.json, so
+OCR accuracy can be measured as well as speed.
+
+    python benchmarks/corpus.py DEST [--text-pdfs N] [--pages N] [--scanned-pdfs N]
+                                     [--scanned-pages N] [--decks N] [--slides N] [--images N]
+                                     [--web-pages N] [--ocr-fixtures N]
+
+A corpus.json file records the settings and the files written, so an
+existing corpus is only regenerated when the settings change, and then only
+those files are deleted.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+DEFAULTS = {
+    "seed": 1,
+    "text_pdfs": 4,
+    "pages": 50,
+    "scanned_pdfs": 2,
+    "scanned_pages": 4,
+    "decks": 2,
+    "slides": 60,
+    "images": 6,
+    "web_pages": 6,
+    "ocr_fixtures": 12,
+}
+
+CORPUS_FOLDERS = ("text_pdfs", "scanned_pdfs", "decks", "images", "web_pages", "ocr_fixtures")
+
+# The kinds of OCR fixture, generated in turn: (name, extension)
+OCR_FIXTURE_KINDS = (
+    ("scan_600dpi", "jpg"), ("screenshot", "png"), ("shaded", "png"),
+    ("page_150dpi", "png"), ("blank_scan", "png"), ("icon", "png"),
+)
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute irure "
+    "in reprehenderit voluptate velit esse cillum fugiat nulla pariatur excepteur sint"
+).split()
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _pdf_string(text):
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def write_text_pdf(path, pages, rng, lines_per_page=45):
+    """Writes a digital PDF with a Helvetica text layer, without any PDF library."""
+    objects = []  # Object bodies; object n is objects[n - 1]
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    page_tree = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    page_ids = []
+    for page_num in range(1, pages + 1):
+        lines = [f"Page {page_num}"] + [_sentence(rng) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 14 TL 50 800 Td " + " ".join(f"{_pdf_string(line)} '" for line in lines) + " ET"
+        data = stream.encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(data), data))
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (page_tree, font, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[page_tree - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        f.writelines(b"%010d 00000 n \n" % offset for offset in offsets)
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+
+
+def _text_image(rng, size=(1240, 1754), lines=30):
+    """A white page with black text, like a scanned document."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=28)
+    for line in range(lines):
+        draw.text((80, 80 + line * 52), _sentence(rng, 8), fill=0, font=font)
+    return image
+
+
+def write_scanned_pdf(path, pages, rng):
+    """Writes an image-only PDF (no text layer), as produced by a scanner."""
+    images = [_text_image(rng) for _ in range(pages)]
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=150)
+
+
+def write_image(path, rng):
+    _text_image(rng, size=(1200, 800), lines=12).save(path)
+
+
+def write_ocr_fixture(path, kind, rng):
+    """
+    Writes one OCR fixture of the given kind (see OCR_FIXTURE_KINDS) and
+    returns the text drawn on it, which is empty for blank and tiny images.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    if kind == "blank_scan":
+        # A white page with faint scanner noise
+        image = Image.effect_noise((1654, 2339), 1.5).point(lambda level: min(255, level + 125))
+        image.save(path, dpi=(200, 200))
+        return ""
+    if kind == "icon":
+        image = Image.new("RGB", (12, 12), "white")
+        ImageDraw.Draw(image).rectangle((2, 2, 9, 9), fill="navy")
+        image.save(path)
+        return ""
+
+    # (size, mode, background, font size, dpi recorded in the file)
+    size, mode, background, font_size, dpi = {
+        "scan_600dpi": ((4960, 7016), "RGB", (246, 240, 222), 100, 600),
+        "screenshot": ((2880, 1800), "RGBA", (250, 250, 252, 255), 36, None),
+        "shaded": ((1600, 1200), "L", 200, 40, 150),
+        "page_150dpi": ((1240, 1754), "L", 255, 30, 150),
+    }[kind]
+    image = Image.new(mode, size, background)
+    if kind == "shaded":
+        # Darker towards the bottom, like a photocopy
+        image = Image.linear_gradient("L").resize(size).point(lambda level: 230 - level // 3)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=font_size)
+    lines = [_sentence(rng, 6) for _ in range(8)]
+    for line_num, line in enumerate(lines):
+        draw.text((font_size * 2, font_size * 2 + line_num * font_size * 2), line, fill=0 if mode == "L" else (20, 20, 20), font=font)
+    image.save(path, **({"dpi": (dpi, dpi)} if dpi else {}), **({"quality": 90} if path.endswith(".jpg") else {}))
+    return "\n".join(lines)
+
+
+def write_web_page(path, rng, paragraphs=40):
+    """
+    Writes a page shaped like a heavy news or docs page saved from a browser:
+    the article is a small part of it, next to menus, sidebars, a footer,
+    inline scripts and styles, and inline SVG icons.
+    """
+    icon = '<svg viewBox="0 0 24 24" width="16" height="16">' + "".join(
+        f'<path d="M{rng.randint(0, 24)} {rng.randint(0, 24)}L{rng.randint(0, 24)} {rng.randint(0, 24)}Z"/>' for _ in range(40)
+    ) + "</svg>"
+    script = "<script>window.__STATE__ = " + json.dumps({"items": [_sentence(rng) for _ in range(200)]}) + ";</script>"
+    style = "<style>" + "".join(f".c{i} {{ margin: {i}px; color: #{i:06x}; }}" for i in range(300)) + "</style>"
+
+    def menu(links):
+        return "<ul>" + "".join(f'<li><a href="/{rng.choice(WORDS)}/{i}">{icon}{_sentence(rng, 2)}</a></li>' for i in range(links)) + "</ul>"
+
+    article = "".join(
+        f"<h2>{_sentence(rng, 5)}</h2>" if i % 8 == 0 else f"<p>{_sentence(rng, 40).replace(' et ', ', et ')}</p>"
+        for i in range(paragraphs)
+    )
+    html = (
+        f"<!DOCTYPE html><html><head><title>{_sentence(rng, 5)}</title>{style}{script}</head><body>"
+        f'<header><a href="/">{icon}Home</a><nav>{menu(60)}</nav></header>'
+        f'<div class="cookie-banner">{_sentence(rng)}<button>Accept</button></div>'
+        f'<div class="layout"><aside class="sidebar">{menu(40)}</aside>'
+        f'<main><article><h1>{_sentence(rng, 6)}</h1>{article}</article>'
+        f'<section class="related-posts">{menu(20)}</section></main></div>'
+        f"<footer>{menu(50)}<p>{_sentence(rng)}</p></footer>"
+        + script * 3 + "</body></html>"
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+
+
+def write_deck(path, slides, rng):
+    """Writes a deck where every slide has a title, bullet points and a picture."""
+    import io
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    picture = io.BytesIO()
+    _text_image(rng, size=(800, 600), lines=8).save(picture, "PNG")
+
+    prs = Presentation()
+    for slide_num in range(1, slides + 1):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {slide_num}: {_sentence(rng, 4)}"
+        body = slide.placeholders[1].text_frame
+        body.text = _sentence(rng)
+        for _ in range(4):
+            body.add_paragraph().text = _sentence(rng)
+        picture.seek(0)
+        slide.shapes.add_picture(picture, Inches(6), Inches(4.5), Inches(3))
+    prs.save(path)
+
+
+def _remove_corpus(dest, files):
+    """Deletes the files a previous run generated in dest, and the corpus folders left empty; nothing else."""
+    root = os.path.realpath(dest)
+    for name in files:
+        path = os.path.realpath(os.path.join(root, name))
+        if os.path.commonpath([path, root]) != root:
+            continue  # corpus.json was edited by hand; never reach outside dest
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    for folder in CORPUS_FOLDERS:
+        try:
+            os.rmdir(os.path.join(root, folder))
+        except OSError:
+            pass  # Missing, or holds files that aren't ours
+
+
+def generate(dest, **settings):
+    """
+    Creates the corpus in dest (unless an identical one is already there) and
+    returns the settings it was generated with. corpus.json records them along
+    with the files written, so a corpus made with other settings is replaced
+    without touching anything else in dest.
+    """
+    settings = {**DEFAULTS, **{key: value for key, value in settings.items() if value is not None}}
+    spec_path = os.path.join(dest, "corpus.json")
+    if os.path.exists(spec_path):
+        with open(spec_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if {key: value for key, value in previous.items() if key != "files"} == settings:
+            return settings
+        if "files" not in previous:
+            raise ValueError(f"{dest} holds a corpus made with other settings by an older version of this "
+                             f"script; use a new directory, or delete it first.")
+        _remove_corpus(dest, previous["files"])
+
+    rng = random.Random(settings["seed"])
+    files = []
+
+    def corpus_path(folder, name):
+        files.append(f"{folder}/{name}")
+        return os.path.join(dest, folder, name)
+
+    for folder in CORPUS_FOLDERS:
+        os.makedirs(os.path.join(dest, folder), exist_ok=True)
+    for i in range(settings["text_pdfs"]):
+        write_text_pdf(corpus_path("text_pdfs", f"text_{i}.pdf"), settings["pages"], rng)
+    for i in range(settings["scanned_pdfs"]):
+        write_scanned_pdf(corpus_path("scanned_pdfs", f"scan_{i}.pdf"), settings["scanned_pages"], rng)
+    for i in range(settings["decks"]):
+        write_deck(corpus_path("decks", f"deck_{i}.pptx"), settings["slides"], rng)
+    for i in range(settings["images"]):
+        write_image(corpus_path("images", f"image_{i}.png"), rng)
+    for i in range(settings["web_pages"]):
+        write_web_page(corpus_path("web_pages", f"page_{i}.html"), rng)
+    truth = {}
+    for i in range(settings["ocr_fixtures"]):
+        kind, extension = OCR_FIXTURE_KINDS[i % len(OCR_FIXTURE_KINDS)]
+        name = f"{kind}_{i}.{extension}"
+        truth[name] = write_ocr_fixture(corpus_path("ocr_fixtures", name), kind, rng)
+    with open(corpus_path("ocr_fixtures", "truth.json"), "w", encoding="utf-8") as f:
+        json.dump(truth, f, indent=2)
+
+    with open(spec_path, "w", encoding="utf-8") as f:
+        json.dump({**settings, "files": files}, f, indent=2)
+    return settings
+
+
+def add_arguments(parser):
+    """Adds the corpus size options to an argument parser (shared with suite.py)."""
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=None,
+                            help=f"(default: {default})")
+
+
+def corpus_settings(args):
+    return {name: getattr(args, name) for name in DEFAULTS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark corpus.")
+    parser.add_argument("dest", help="Directory to create the corpus in.")
+    add_arguments(parser)
+    args = parser.parse_args()
+    try:
+        settings = generate(args.dest, **corpus_settings(args))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✔ Corpus ready in {args.dest}: {json.dumps(settings)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/pptx_text.py
+"""
+Compares the two text-only PPTX paths: reading slide XML straight from the
+zip (the default) and building python-pptx's object model.
+
+Run it from the project root:
+
+    python benchmarks/pptx_text.py [deck.pptx ...] [--slides N] [--repeat N]
+
+Without decks, a synthetic one is generated with text boxes, line breaks,
+fields, tables, groups, pictures and reordered slides. The script exits
+with status 1 if the two paths produce different text.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.file_handlers import pptx_handler
+
+
+def build_deck(path, slide_count):
+    """Writes a synthetic deck that exercises the cases the fast path has to match."""
+    from lxml import etree
+    from PIL import Image
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    image = io.BytesIO()
+    Image.new("RGB", (800, 600), "white").save(image, "PNG")
+
+    prs = Presentation()
+    for i in range(slide_count):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide title {i}"
+        body = slide.placeholders[1].text_frame
+        body.text = f"First paragraph {i}"
+        body.add_paragraph().text = "  Second paragraph with a\vline break  "
+        body.add_paragraph().text = ""
+
+        box = slide.shapes.add_textbox(Inches(1), Inches(5), Inches(4), Inches(1))
+        box.text_frame.text = f"Text box {i} & <escaped> \"chars\""
+        # A field (e.g. slide number) inside the paragraph
+        field = etree.SubElement(box.text_frame.paragraphs[0]._p, "{http://schemas.openxmlformats.org/drawingml/2006/main}fld")
+        field.set("id", "{B6F15528-21DE-4FAA-801E-634DDDAF4B2B}")
+        field.set("type", "slidenum")
+        etree.SubElement(field, "{http://schemas.openxmlformats.org/drawingml/2006/main}t").text = str(i + 1)
+
+        slide.shapes.add_textbox(Inches(1), Inches(6), Inches(1), Inches(1)).text_frame.text = "   "
+        table = slide.shapes.add_table(2, 2, Inches(5), Inches(1), Inches(3), Inches(1)).table
+        table.cell(0, 0).text = "table text is skipped"
+        group = slide.shapes.add_group_shape()
+        group.shapes.add_textbox(Inches(0), Inches(0), Inches(1), Inches(1)).text_frame.text = "grouped text is skipped"
+        image.seek(0)
+        slide.shapes.add_picture(image, Inches(6), Inches(4), Inches(2))
+
+    # Reorder slides so presentation order differs from the slideN.xml names
+    slide_ids = prs.slides._sldIdLst
+    slide_ids.insert(0, slide_ids[-1])
+    prs.save(path)
+
+
+def fast_text(path):
+    zf, slide_paths = pptx_handler._open_fast_text(path)
+    with zf:
+        slides = list(pptx_handler._iter_fast_text_slides(zf, slide_paths))
+    return _format(slides)
+
+
+def python_pptx_text(path):
+    return _format(pptx_handler._iter_python_pptx_slides(path, use_ocr=False))
+
+
+def _format(slides):
+    records = (pptx_handler._build_slide_record(slide) for slide in slides)
+    return "\n\n".join(pptx_handler.format_pptx_record(record) for record in records if record)
+
+
+def measure(func, path, repeat):
+    """
+    Returns (best time in seconds, peak traced memory in bytes, output).
+    tracemalloc only sees Python allocations, so lxml's trees (python-pptx) are undercounted.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(path)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fast PPTX text path against python-pptx.")
+    parser.add_argument("decks", nargs="*", help="Decks to benchmark (default: a generated one).")
+    parser.add_argument("--slides", type=int, default=200, help="Slides in the generated deck (default: 200).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per path; the best is kept (default: 3).")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        decks = args.decks
+        if not decks:
+            deck = os.path.join(temp_dir, "synthetic.pptx")
+            print(f"-> Generating a {args.slides}-slide deck...")
+            build_deck(deck, args.slides)
+            decks = [deck]
+
+        mismatches = 0
+        for deck in decks:
+            fast_time, fast_peak, fast_output = measure(fast_text, deck, args.repeat)
+            slow_time, slow_peak, slow_output = measure(python_pptx_text, deck, args.repeat)
+            print(f"{os.path.basename(deck)}:")
+            print(f"   python-pptx: {slow_time * 1000:8.1f} ms, peak {slow_peak / 2**20:6.1f} MiB")
+            print(f"   fast path:   {fast_time * 1000:8.1f} ms, peak {fast_peak / 2**20:6.1f} MiB"
+                  f"  ({slow_time / fast_time:.1f}x faster)")
+            if fast_output != slow_output:
+                mismatches += 1
+                print("   ❌ Outputs differ!")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
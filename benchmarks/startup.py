@@ -0,0 +1,92 @@
+# benchmarks/startup.py
+"""
+Startup benchmark: measures how long `main.py` takes to start and which
+modules it imports, using Python's `-X importtime`.
+
+Run it from the project root:
+
+    python benchmarks/startup.py [--runs N] [--budget-ms MS]
+
+It exits with status 1 if a heavy dependency is imported on a path that
+doesn't need it, or if the median startup time exceeds the budget.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(PROJECT_ROOT, "main.py")
+
+# Top-level packages that must stay out of a plain `--version` / `--help` run
+HEAVY_MODULES = [
+    "selenium", "inquirer", "tqdm", "markdownify", "bs4",
+    "PyPDF2", "pptx", "PIL", "pdf2image", "pytesseract",
+]
+
+SCENARIOS = {
+    "version": ["--version"],
+    "help": ["--help"],
+}
+
+
+def _parse_importtime(stderr):
+    """Returns {module: cumulative microseconds} from `-X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def run_scenario(args, runs):
+    """Runs main.py with args several times; returns (wall times in ms, imported modules)."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN_SCRIPT] + args, capture_output=True, cwd=PROJECT_ROOT)
+        times.append((time.perf_counter() - start) * 1000)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", MAIN_SCRIPT] + args,
+        capture_output=True, text=True, cwd=PROJECT_ROOT,
+    )
+    modules = _parse_importtime(result.stderr)
+    return times, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure TextNomNom's startup time and imports.")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per scenario (default: 10).")
+    parser.add_argument("--budget-ms", type=float, default=400, help="Maximum median startup time (default: 400).")
+    parser.add_argument("--top", type=int, default=5, help="How many of the slowest imports to list.")
+    args = parser.parse_args()
+
+    failed = False
+    for name, scenario_args in SCENARIOS.items():
+        times, modules = run_scenario(scenario_args, args.runs)
+        median = statistics.median(times)
+        print(f"{name}: median {median:.0f} ms, min {min(times):.0f} ms over {len(times)} run(s)")
+
+        top_level = {module: us for module, us in modules.items() if "." not in module}
+        for module, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"   {us / 1000:8.1f} ms  {module}")
+
+        heavy = [module for module in HEAVY_MODULES if module in modules]
+        if heavy:
+            print(f"   ❌ Heavy modules imported: {', '.join(heavy)}")
+            failed = True
+        if median > args.budget_ms:
+            print(f"   ❌ Over the {args.budget_ms:.0f} ms budget")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
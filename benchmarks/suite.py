@@ -0,0 +1,385 @@
+# benchmarks/suite.py
+"""
+Extraction benchmark suite. Generates a synthetic corpus (see corpus.py), then
+times the handlers, process_file, get_total_steps, conversions, the
+directory pipeline, HTML-to-Markdown conversion and OCR of the fixture
+images on it, reporting pages/sec, files/sec, peak RSS, (for HTML) the size
+of the output and (for OCR fixtures) the accuracy against their known text.
+
+Run it from the project root:
+
+    python benchmarks/suite.py [--output results.json] [--baseline old.json] [--threshold 0.15]
+                               [--cases NAME ...] [--repeat N] [--jobs N] [--pdf-backend NAME]
+                               [--lang LANGS] [--psm N] [--oem N] [--ocr-binarize]
+
+Every case runs in a fresh process, so peak RSS is measured per case and one
+case's caches don't help the next. Cases whose tools (Tesseract, Poppler,
+LibreOffice) aren't installed are skipped. With --baseline, the script exits
+with status 1 if a case got slower, or used more memory, by more than the
+threshold, or if its OCR accuracy dropped by more than ACCURACY_THRESHOLD.
+"""
+
+import argparse
+import contextlib
+import difflib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+import corpus
+
+OCR_TOOLS = ("tesseract", "pdftoppm")
+# Largest drop in OCR accuracy (0.0 - 1.0) allowed against a baseline
+ACCURACY_THRESHOLD = 0.02
+
+
+def _files(corpus_dir, folder):
+    folder = os.path.join(corpus_dir, folder)
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name != "truth.json")
+
+
+def _all_files(corpus_dir):
+    return [path for folder in ("text_pdfs", "scanned_pdfs", "decks", "images") for path in _files(corpus_dir, folder)]
+
+
+def _run_handler(func, paths, **kwargs):
+    """Runs an iter/extract style handler over paths; returns (pages, files)."""
+    steps = [0]
+
+    def step():
+        steps[0] += 1
+
+    for path in paths:
+        func(path, callback=step, **kwargs)
+    return steps[0], len(paths)
+
+
+def case_process_file(corpus_dir, args):
+    from app.file_processor import process_file
+    return _run_handler(process_file, _files(corpus_dir, "text_pdfs") + _files(corpus_dir, "decks"))
+
+
+def case_pdf_text(corpus_dir, args):
+    from app.file_handlers.pdf_handler import extract_text_from_pdf
+    return _run_handler(extract_text_from_pdf, _files(corpus_dir, "text_pdfs"))
+
+
+def case_pdf_ocr(corpus_dir, args):
+    from app.file_handlers.pdf_handler import extract_text_from_pdf
+    return _run_handler(extract_text_from_pdf, _files(corpus_dir, "scanned_pdfs"), ocr_mix=True)
+
+
+def case_pptx_text(corpus_dir, args):
+    from app.file_handlers.pptx_handler import extract_text_from_pptx
+    return _run_handler(extract_text_from_pptx, _files(corpus_dir, "decks"))
+
+
+def case_pptx_ocr(corpus_dir, args):
+    from app.file_handlers.pptx_handler import extract_text_from_pptx
+    return _run_handler(extract_text_from_pptx, _files(corpus_dir, "decks"), ocr_mix=True)
+
+
+def case_images(corpus_dir, args):
+    from app.file_handlers.image_handler import extract_text_from_image
+    paths = _files(corpus_dir, "images")
+    for path in paths:
+        extract_text_from_image(path)
+    return len(paths), len(paths)
+
+
+def case_total_steps(corpus_dir, args):
+    from main import get_total_steps
+    paths = _all_files(corpus_dir)
+    return get_total_steps(paths), len(paths)
+
+
+def case_conversion(corpus_dir, args):
+    from app.file_handlers.conversions import convert_files
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = [shutil.copy(path, work_dir) for path in _files(corpus_dir, "decks")]
+        results = convert_files(paths, "pdf", instances=args.jobs)
+    if not all(results.values()):
+        raise RuntimeError("Some decks could not be converted.")
+    return 0, len(paths)
+
+
+def case_directory(corpus_dir, args):
+    from main import process_directory
+    with tempfile.TemporaryDirectory() as work_dir:
+        for folder in ("text_pdfs", "decks"):
+            shutil.copytree(os.path.join(corpus_dir, folder), os.path.join(work_dir, folder))
+        process_directory(work_dir, save_all=True, jobs=args.jobs, force=True)
+    with open(os.path.join(corpus_dir, "corpus.json"), "r", encoding="utf-8") as f:
+        settings = json.load(f)
+    pages = settings["text_pdfs"] * settings["pages"] + settings["decks"] * settings["slides"]
+    return pages, settings["text_pdfs"] + settings["decks"]
+
+
+def _convert_pages(corpus_dir, convert):
+    """Converts every saved web page; also reports the size of the Markdown produced."""
+    from bs4 import BeautifulSoup
+    paths = _files(corpus_dir, "web_pages")
+    output_bytes = 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            soup = BeautifulSoup(f.read(), "html.parser")
+        output_bytes += len(convert(soup).encode("utf-8"))
+    return len(paths), len(paths), {"output_kib": round(output_bytes / 1024, 1)}
+
+
+def case_html_body(corpus_dir, args):
+    """The whole <body> re-serialized and run through markdownify, for reference."""
+    from markdownify import markdownify as md
+    return _convert_pages(corpus_dir, lambda soup: md(str(soup.body)))
+
+
+def case_html_full(corpus_dir, args):
+    from app.html_content import html_to_markdown
+    return _convert_pages(corpus_dir, lambda soup: html_to_markdown(soup, mode="full"))
+
+
+def case_html_article(corpus_dir, args):
+    from app.html_content import html_to_markdown
+    return _convert_pages(corpus_dir, lambda soup: html_to_markdown(soup, mode="article"))
+
+
+def _similarity(expected, actual):
+    """How close OCR output is to the expected text (1.0 = identical), ignoring how whitespace is laid out."""
+    expected, actual = " ".join(expected.split()), " ".join(actual.split())
+    if not expected:
+        return 1.0 if not actual else 0.0
+    return difflib.SequenceMatcher(None, expected, actual, autojunk=False).ratio()
+
+
+def _ocr_fixtures(corpus_dir, preprocess):
+    """OCRs every fixture image; also reports the mean accuracy against the text drawn on them."""
+    from app.file_handlers.ocr_utils import configure_ocr, ocr_image
+    configure_ocr(preprocess=preprocess)
+    with open(os.path.join(corpus_dir, "ocr_fixtures", "truth.json"), "r", encoding="utf-8") as f:
+        truth = json.load(f)
+    scores = [_similarity(truth[os.path.basename(path)], ocr_image(path)) for path in _files(corpus_dir, "ocr_fixtures")]
+    return len(scores), len(scores), {"accuracy": round(sum(scores) / len(scores), 4) if scores else None}
+
+
+def case_ocr_fixtures_raw(corpus_dir, args):
+    """The fixtures handed to Tesseract as they are, for reference."""
+    return _ocr_fixtures(corpus_dir, preprocess=False)
+
+
+def case_ocr_fixtures(corpus_dir, args):
+    return _ocr_fixtures(corpus_dir, preprocess=True)
+
+
+# name -> (function, external tools it needs)
+CASES = {
+    "process_file": (case_process_file, ()),
+    "pdf_text": (case_pdf_text, ()),
+    "pdf_ocr": (case_pdf_ocr, OCR_TOOLS),
+    "pptx_text": (case_pptx_text, ()),
+    "pptx_ocr": (case_pptx_ocr, ("tesseract",)),
+    "images": (case_images, ("tesseract",)),
+    "total_steps": (case_total_steps, ()),
+    "conversion": (case_conversion, ("soffice",)),
+    "directory": (case_directory, ()),
+    "html_body": (case_html_body, ()),
+    "html_full": (case_html_full, ()),
+    "html_article": (case_html_article, ()),
+    "ocr_fixtures_raw": (case_ocr_fixtures_raw, ("tesseract",)),
+    "ocr_fixtures": (case_ocr_fixtures, ("tesseract",)),
+}
+
+
+def _peak_rss_mb():
+    """
+    Peak resident memory of this process and its finished children, in MiB
+    (None on Windows). On Linux this process's own peak is VmHWM: ru_maxrss
+    survives fork and exec, so it would include the parent's peak (e.g. from
+    generating the corpus).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    own = None
+    with contextlib.suppress(OSError):
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    own = int(line.split()[1])  # KiB
+    if own is None:
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in KiB elsewhere
+        own = own / 1024 if sys.platform == "darwin" else own
+    # A child's ru_maxrss starts from this process's size when it was forked,
+    # which is already below this process's own peak
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    children = children / 1024 if sys.platform == "darwin" else children
+    return max(own, children) / 2**10
+
+
+def run_case_here(name, corpus_dir, args, result_path):
+    """Runs one case in this process (the child side of run_case) and writes its result as JSON."""
+    from app.file_handlers.ocr_utils import configure_ocr
+    from app.file_handlers.pdf_backends import configure_pdf_backend
+
+    # Measure the work, not cache hits from an earlier run
+    configure_ocr(cache=False, lang=args.lang, psm=args.psm, oem=args.oem, binarize=args.ocr_binarize or None)
+    configure_pdf_backend(args.pdf_backend)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        start = time.perf_counter()
+        pages, files, *extra = CASES[name][0](corpus_dir, args)
+        seconds = time.perf_counter() - start
+
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump({"seconds": seconds, "pages": pages, "files": files, "peak_rss_mb": _peak_rss_mb(), **(extra[0] if extra else {})}, f)
+
+
+def run_case(name, corpus_dir, args):
+    """Runs a case args.repeat times, each in a fresh process; keeps the best time and the highest peak RSS."""
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            result_path = os.path.join(temp_dir, "result.json")
+            command = [sys.executable, os.path.abspath(__file__), "--run-case", name, "--corpus", corpus_dir,
+                       "--result", result_path, "--jobs", str(args.jobs), "--pdf-backend", args.pdf_backend]
+            for option in ("lang", "psm", "oem"):
+                if getattr(args, option) is not None:
+                    command += [f"--{option}", str(getattr(args, option))]
+            if args.ocr_binarize:
+                command.append("--ocr-binarize")
+            process = subprocess.run(command, cwd=PROJECT_ROOT, capture_output=True, text=True)
+            if process.returncode != 0:
+                raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed")
+            with open(result_path, "r", encoding="utf-8") as f:
+                runs.append(json.load(f))
+
+    best = min(runs, key=lambda run: run["seconds"])
+    rss = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"] is not None]
+    seconds = best["seconds"]
+    return {
+        "seconds": round(seconds, 4),
+        "pages": best["pages"],
+        "files": best["files"],
+        "pages_per_sec": round(best["pages"] / seconds, 2) if seconds and best["pages"] else None,
+        "files_per_sec": round(best["files"] / seconds, 2) if seconds else None,
+        "peak_rss_mb": round(max(rss), 1) if rss else None,
+        # Anything else a case reports, such as output_kib
+        **{key: value for key, value in best.items() if key not in ("seconds", "pages", "files", "peak_rss_mb")},
+    }
+
+
+def compare(results, baseline, threshold):
+    """Prints how each case moved against the baseline; returns the names of regressed cases."""
+    regressions = []
+    print(f"\nCompared to the baseline (threshold {threshold:.0%}):")
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "seconds" not in result or "seconds" not in base:
+            continue
+        time_change = result["seconds"] / base["seconds"] - 1 if base["seconds"] else 0
+        line = f"   {name:<16} time {time_change:+7.1%}"
+        regressed = time_change > threshold
+        if result["peak_rss_mb"] and base.get("peak_rss_mb"):
+            rss_change = result["peak_rss_mb"] / base["peak_rss_mb"] - 1
+            line += f", peak RSS {rss_change:+7.1%}"
+            regressed = regressed or rss_change > threshold
+        if result.get("accuracy") is not None and base.get("accuracy") is not None:
+            accuracy_change = result["accuracy"] - base["accuracy"]
+            line += f", accuracy {accuracy_change:+.3f}"
+            regressed = regressed or accuracy_change < -ACCURACY_THRESHOLD
+        if regressed:
+            regressions.append(name)
+            line += "  ❌ regression"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TextNomNom's extraction paths on a synthetic corpus.")
+    parser.add_argument("--corpus", default=os.path.join(tempfile.gettempdir(), "textnomnom-benchmark-corpus"),
+                        help="Where the corpus is generated (reused while its settings don't change).")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), help="Cases to run (default: all).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest is kept (default: 3).")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes for the directory and conversion cases.")
+    parser.add_argument("--pdf-backend", default="auto", help="PDF text backend to benchmark (default: auto).")
+    parser.add_argument("--lang", help="Tesseract language(s) for the OCR cases (default: from config).")
+    parser.add_argument("--psm", type=int, help="Tesseract page segmentation mode for the OCR cases.")
+    parser.add_argument("--oem", type=int, help="Tesseract OCR engine mode for the OCR cases.")
+    parser.add_argument("--ocr-binarize", action="store_true", help="Binarize images in the OCR cases.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown/memory growth before failing (default: 0.15).")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    corpus.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.run_case:
+        return run_case_here(args.run_case, args.corpus, args, args.result)
+
+    print(f"-> Preparing the corpus in {args.corpus}...")
+    try:
+        settings = corpus.generate(args.corpus, **corpus.corpus_settings(args))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    from app import __version__
+    from app.file_handlers.pdf_backends import configure_pdf_backend, resolve_pdf_backend
+    configure_pdf_backend(args.pdf_backend)
+
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "jobs": args.jobs,
+        "pdf_backend": resolve_pdf_backend(),
+        "corpus": settings,
+        "results": {},
+    }
+    for name in args.cases or CASES:
+        missing = [tool for tool in CASES[name][1] if not shutil.which(tool)]
+        if missing:
+            report["results"][name] = {"skipped": f"{', '.join(missing)} not installed"}
+            print(f"   {name:<16} skipped ({', '.join(missing)} not installed)")
+            continue
+        try:
+            result = run_case(name, args.corpus, args)
+        except RuntimeError as e:
+            report["results"][name] = {"error": str(e)}
+            print(f"   {name:<16} ❌ failed: {e}")
+            continue
+        report["results"][name] = result
+        rates = ", ".join(
+            f"{result[key]:.1f} {unit}/s" for key, unit in (("pages_per_sec", "pages"), ("files_per_sec", "files"))
+            if result[key]
+        )
+        rss = f", peak {result['peak_rss_mb']:.0f} MiB" if result["peak_rss_mb"] else ""
+        output = f", output {result['output_kib']:.0f} KiB" if "output_kib" in result else ""
+        output += f", accuracy {result['accuracy']:.1%}" if result.get("accuracy") is not None else ""
+        print(f"   {name:<16} {result['seconds'] * 1000:9.1f} ms  ({rates}{rss}{output})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✔ Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(report["results"], baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
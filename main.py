@@ -3,50 +3,250 @@ import argparse
 import logging
 import os
 import sys
-import inquirer
-from tqdm import tqdm
-from PyPDF2 import PdfReader
-from pptx import Presentation
 
+# Only lightweight modules are imported up front. Heavier ones (tqdm, inquirer,
+# selenium, the document libraries...) are imported by the code paths that
+# need them, so a quick run doesn't pay for everything the tool can do.
 from app.logger_config import setup_logging, clear_log_file
-from app.file_processor import process_file, save_text_to_file
-from app.web_scraper import scrape_and_save
+from app.file_processor import (
+    extract_to_file, count_steps, open_combined_output, remove_partials, supported_extensions, COMPRESSION_SUFFIXES, DOCUMENT_EXTENSIONS,
+)
+from app.file_handlers.ocr_utils import configure_ocr
+from app.file_handlers.pdf_backends import BACKEND_CHOICES, configure_pdf_backend, resolve_pdf_backend
+from app.html_content import CONTENT_CHOICES, configure_content
+from app import stats
+from app.scanner import OUTPUT_DIR_NAME
+from app.manifest import (
+    load_manifest, save_manifest, is_unchanged, record_file, cached_text_file, remove_deleted, spool_path, get_entry,
+    open_journal, close_journal, journal_status, record_failure,
+)
 from app import __version__ as VERSION
 from app.config_manager import LOGS
-from app.file_handlers.conversions import convert_ppt_to_pptx, convert_pptx_to_pdf
 
 def get_output_path(input_path):
     """Generates the standard output path for a given input file."""
-    output_dir = os.path.join(os.path.dirname(input_path), "extracted_texts")
+    output_dir = os.path.join(os.path.dirname(input_path), OUTPUT_DIR_NAME)
     base_name = os.path.splitext(os.path.basename(input_path))[0]
     return os.path.join(output_dir, f"{base_name}.txt")
 
 def get_total_steps(file_list):
-    """Counts the total number of pages/slides in a list of files for the progress bar."""
-    total = 0
+    """
+    Estimates the total number of pages/slides in a list of files for the progress bar.
+    Files are not parsed here; the bar grows through grow_progress_bar once each
+    document is opened and its real page count is known.
+    """
+    from tqdm import tqdm
+
     print("-> Analyzing files to determine total progress...")
     # Use leave=False so this progress bar disappears after completion
-    for file_path in tqdm(file_list, desc="Analyzing files", unit="file", leave=False):
-        ext = os.path.splitext(file_path)[1].lower()
-        try:
-            if ext == '.pdf':
-                with open(file_path, 'rb') as f:
-                    # Use strict=False to be more lenient with potentially malformed PDFs
-                    reader = PdfReader(f, strict=False)
-                    total += len(reader.pages)
-            elif ext == '.pptx':
-                prs = Presentation(file_path)
-                total += len(prs.slides)
-            else:
-                total += 1 # Other files count as one step
-        except Exception:
-            total += 1 # If a file is unreadable, still count it as one step
-    return total
+    return sum(count_steps(f) for f in tqdm(file_list, desc="Analyzing files", unit="file", leave=False))
+
+def grow_progress_bar(pbar):
+    """Returns a total_callback that adjusts the bar's total by the given number of steps."""
+    def grow(extra_steps):
+        pbar.total += extra_steps
+        pbar.refresh()
+    return grow
+
+def process_directory(path, trigger_ocr=False, ocr_mix=False, ocr_smart=False, save_all=False, jobs=None, force=False, output=None, compression=None,
+                      include=(), exclude=(), max_depth=None, dedupe=True, resume=False, timeout=None, max_memory=None):
+    """
+    Extracts text from every supported file in a directory tree, saving per file or combined.
+    Files are found lazily by scan_directory (see it for include, exclude and
+    max_depth), so extraction starts while a large tree is still being walked.
+    Files that are unchanged since the last run (per the manifest) are skipped
+    unless force is set, and outputs of deleted inputs are removed.
+    With dedupe, byte-identical copies of a file are extracted once: the
+    others get a copy of its output, or in the combined output a reference to it.
+    With save_all, documents are streamed to the combined output (or to
+    `output`, where '-' means stdout) as soon as they are ready.
+    Workers write each document to disk page by page, so no document is
+    ever held in memory whole. timeout and max_memory limit each file (see process_files).
+
+    Every finished or failed file is logged in a journal as the run goes;
+    with resume, an interrupted run picks up where it stopped: the files it
+    finished are kept (even with force) and those that failed are skipped.
+    """
+    import shutil
+    from collections import deque
+    from tqdm import tqdm
+    from app.batch_processor import process_files
+    from app.dedupe import DuplicateFinder
+    from app.scanner import scan_directory
+
+    manifest = load_manifest(path)
+    resumed = open_journal(manifest, resume=resume)
+    if resume:
+        print("-> No interrupted run to resume." if resumed is None else f"-> Resuming: {resumed} file(s) were done before the run stopped.")
+    # Backends differ slightly in their text, so switching backends re-extracts
+    options = {
+        "ocr": trigger_ocr, "ocr_mix": ocr_mix, "ocr_smart": ocr_smart, "save_all": save_all,
+        "pdf_backend": resolve_pdf_backend(),
+    }
+    output_file = output or os.path.join(path, "all_extracted_text.txt" + COMPRESSION_SUFFIXES.get(compression, ""))
+    file_list = []  # Every file found, in scan order
+    # Files found but not handed back by process_files yet, as (path, the
+    # file it is a duplicate of or None)
+    queued = deque()
+    unchanged = failed_before = 0
+    finished = False
+    finder = DuplicateFinder() if dedupe else None
+    failed = set()  # Files that could not be extracted in this run
+    text_written = {}  # content hash -> the file whose text is in the combined output
+
+    def write_cached_text(file_path):
+        """Adds a file's text, as kept from its extraction, to the combined output. Copies of it are only referenced."""
+        text_file = cached_text_file(manifest, file_path) if save_all else None
+        if not text_file:
+            return
+        first = text_written.setdefault(get_entry(manifest, file_path)["sha256"], file_path) if finder else file_path
+        if first != file_path:
+            write_document(file_path, f"[Identical to {first}; its text is above.]")
+            return
+        with open(text_file, "r", encoding="utf-8") as f:
+            write_document(file_path, f)
+
+    def copy_from_original(file_path, original):
+        """Gives a duplicate the result of its identical original instead of extracting it again."""
+        entry = get_entry(manifest, original)
+        if original in failed or entry is None:
+            failed.add(file_path)
+            return
+        output_path = None
+        if not save_all and entry.get("output"):
+            output_path = get_output_path(file_path)
+            if output_path != entry["output"]:
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                shutil.copyfile(entry["output"], output_path)
+            print(f"✔ Successfully saved output to: {output_path} (same file as {original})")
+        record_file(manifest, file_path, options, output_path=output_path, digest=entry["sha256"], shared_text=entry.get("text", False))
+        write_cached_text(file_path)
+
+    def handle_queued(file_path, original):
+        if original:
+            copy_from_original(file_path, original)
+        else:
+            write_cached_text(file_path)
+
+    try:
+        with open_combined_output(output_file, compression) as write_document, \
+                tqdm(total=0, desc="Processing Pages/Slides", unit="step") as pbar:
+
+            # Per-file outputs are written straight to their final place; for
+            # --save-all, each document is spooled to disk, then copied into the combined output
+            output_for = (lambda f: spool_path(manifest, f)) if save_all else get_output_path
+
+            def files_to_process():
+                """Walks the tree for process_files; the bar grows as files to extract are found."""
+                nonlocal unchanged, failed_before
+                found = scan_directory(
+                    path, extensions=supported_extensions(trigger_ocr or ocr_mix or ocr_smart),
+                    include=include, exclude=exclude, max_depth=max_depth, skip_paths=[manifest["dir"]],
+                )
+                for file_path in found:
+                    file_list.append(file_path)
+                    status = journal_status(manifest, file_path) if resume else None
+                    if status == "failed":
+                        failed_before += 1
+                        continue
+                    if (not force or status == "done") and is_unchanged(manifest, file_path, options):
+                        unchanged += 1
+                        queued.append((file_path, None))
+                        if finder:
+                            # So that new copies of it are recognized; its hash is already known
+                            entry = get_entry(manifest, file_path)
+                            finder.original_of(file_path, size=entry["size"], digest=entry["sha256"])
+                        continue
+                    original = finder.original_of(file_path) if finder else None
+                    queued.append((file_path, original))
+                    if original:
+                        stats.increment("duplicate_files")
+                        stats.increment("duplicate_bytes", os.path.getsize(file_path))
+                        continue
+                    pbar.total += count_steps(file_path)
+                    pbar.refresh()
+                    # Left by a worker of an earlier run that was killed mid-file
+                    remove_partials(output_for(file_path))
+                    yield file_path
+
+            results = process_files(files_to_process(), trigger_ocr, ocr_mix, ocr_smart, jobs=jobs, callback=pbar.update,
+                                    total_callback=grow_progress_bar(pbar), output_for=output_for,
+                                    timeout=timeout, max_memory=max_memory)
+            # Results come back in scan order, so unchanged files and
+            # duplicates found before a result are slotted in ahead of it
+            for file_path, written in results:
+                while queued[0][0] != file_path:
+                    handle_queued(*queued.popleft())
+                queued.popleft()
+                pbar.set_description(f"-> Finished {os.path.basename(file_path)}")
+                if written is None:
+                    failed.add(file_path)
+                    record_failure(manifest, file_path)
+                    continue
+                digest = finder.digest(file_path) if finder else None
+                if save_all:
+                    record_file(manifest, file_path, options, text_file=spool_path(manifest, file_path) if written else None, digest=digest)
+                    write_cached_text(file_path)
+                else:
+                    output_path = None
+                    if written:
+                        output_path = get_output_path(file_path)
+                        print(f"✔ Successfully saved output to: {output_path}")
+                    record_file(manifest, file_path, options, output_path=output_path, digest=digest)
+            while queued:
+                handle_queued(*queued.popleft())
+
+        if unchanged:
+            print(f"-> Skipped {unchanged} unchanged file(s). Use --force to re-extract them.")
+        if failed_before:
+            print(f"-> Skipped {failed_before} file(s) that failed before the run stopped. Run without --resume to retry them.")
+        # Only once the whole tree has been walked is it known which inputs are gone
+        removed = remove_deleted(manifest, file_list)
+        if removed:
+            print(f"-> Removed outputs of {removed} deleted file(s).")
+        finished = True
+    finally:
+        # The journal is only dropped once everything it holds is in the saved manifest
+        close_journal(manifest, completed=save_manifest(manifest) and finished)
+
+    if save_all and write_document.count and output_file != "-":
+        print(f"\n✅ All text combined and saved to: {output_file}")
+    stats.report()
+
+def process_single_file(path, trigger_ocr=False, ocr_mix=False, ocr_smart=False, output=None, compression=None):
+    """
+    Extracts a single file's text and streams it, page by page, to a file next
+    to it or to `output` ('-' means stdout).
+    """
+    from tqdm import tqdm
+
+    output_path = output or get_output_path(path)
+    if not output:
+        compression = None  # --compress only applies to an explicit output file
+    if output_path != "-":
+        remove_partials(output_path)
+    file_ext = os.path.splitext(path)[1].lower()
+
+    # Check if it's a file type that supports page-by-page progress
+    if file_ext in ['.pdf', '.pptx']:
+        total_steps = get_total_steps([path])
+        with tqdm(total=total_steps, desc=f"-> Analyzing {os.path.basename(path)}", unit="step") as pbar:
+            written = extract_to_file(path, output_path, trigger_ocr, ocr_mix, ocr_smart, callback=pbar.update,
+                                      total_callback=grow_progress_bar(pbar), compression=compression)
+    else:
+        print(f"Processing file: {path}")
+        written = extract_to_file(path, output_path, trigger_ocr, ocr_mix, ocr_smart, compression=compression)
+
+    if written and output_path != "-":
+        print(f"✔ Successfully saved output to: {output_path}")
+    stats.report()
 
 def run_interactive_menu():
     """
     Displays an interactive menu for the user to choose an action.
     """
+    import inquirer
+
     print("Welcome to TextNomNom Interactive Mode!")
 
     while True:
@@ -80,12 +280,14 @@ def run_interactive_menu():
                 print(f"❌ Error: Path not found: {path}")
                 continue
 
-            ocr_q = [inquirer.Confirm('ocr', message="Enable mixed OCR (slower)?", default=False)]
+            ocr_q = [inquirer.List('ocr', message="OCR mode?",
+                                   choices=['No OCR', 'Smart OCR (only pages that need it)', 'Mixed OCR (slower)'])]
             ocr_answers = inquirer.prompt(ocr_q)
             if not ocr_answers:
                 print("\nOperation cancelled.")
                 continue
-            ocr_mix = ocr_answers['ocr']
+            ocr_mix = ocr_answers['ocr'].startswith('Mixed')
+            ocr_smart = ocr_answers['ocr'].startswith('Smart')
 
             if os.path.isdir(path):
                 save_all_q = [inquirer.Confirm('save_all', message="Combine all text into a single file?", default=False)]
@@ -95,46 +297,17 @@ def run_interactive_menu():
                     continue
                 save_all = save_all_answers['save_all']
 
-                file_list = [os.path.join(r, f) for r, _, fs in os.walk(path) for f in fs]
-                total_steps = get_total_steps(file_list)
-                all_texts = []
-
-                with tqdm(total=total_steps, desc="Processing Pages/Slides", unit="step") as pbar:
-                    for file_path in file_list:
-                        pbar.set_description(f"-> Analyzing {os.path.basename(file_path)}")
-                        text = process_file(file_path, ocr_mix=ocr_mix, callback=pbar.update)
-                        if text:
-                            if save_all:
-                                all_texts.append(f"### {file_path} ###\n{text}\n\n")
-                            else:
-                                output_path = get_output_path(file_path)
-                                save_text_to_file(output_path, text)
-
-                if save_all and all_texts:
-                    output_file = os.path.join(path, "all_extracted_text.txt")
-                    save_text_to_file(output_file, "\n".join(all_texts))
-                    print(f"\n✅ All text combined and saved to: {output_file}")
+                process_directory(path, ocr_mix=ocr_mix, ocr_smart=ocr_smart, save_all=save_all)
 
             else: # It's a file
-                file_ext = os.path.splitext(path)[1].lower()
-                if file_ext in ['.pdf', '.pptx']:
-                    total_steps = get_total_steps([path])
-                    with tqdm(total=total_steps, desc=f"-> Analyzing {os.path.basename(path)}", unit="step") as pbar:
-                        text = process_file(path, ocr_mix=ocr_mix, callback=pbar.update)
-                        if text:
-                            output_path = get_output_path(path)
-                            save_text_to_file(output_path, text)
-                else:
-                    print(f"Processing file: {path}")
-                    text = process_file(path, ocr_mix=ocr_mix)
-                    if text:
-                        output_path = get_output_path(path)
-                        save_text_to_file(output_path, text)
+                process_single_file(path, ocr_mix=ocr_mix, ocr_smart=ocr_smart)
 
         elif action == 'Scrape a Web URL':
             try:
                 url = input("[?] Enter the URL to scrape: ").strip().strip("'\"")
-                if url: scrape_and_save(url)
+                if url:
+                    from app.web_scraper import scrape_and_save
+                    scrape_and_save(url)
             except KeyboardInterrupt:
                 print()
                 continue
@@ -156,61 +329,91 @@ def run_interactive_menu():
 
         print("\n" + "="*20 + "\n")
 
-def _convert_single_file_to_pdf(file_path):
-    """Internal helper to convert a single PowerPoint file."""
-    filename = os.path.basename(file_path)
-
-    if not filename.lower().endswith(('.ppt', '.pptx')):
-        return
-
-    logging.info(f"-> Converting {filename}...")
-    try:
-        # If it's a .ppt, it must first be converted to .pptx
-        if filename.lower().endswith('.ppt'):
-            logging.info("   - Legacy .ppt format detected, converting to .pptx first...")
-            path_for_conversion = convert_ppt_to_pptx(file_path)
-            if not path_for_conversion:
-                logging.info(f"❌ Aborting PDF conversion for {filename} due to .ppt to .pptx failure.")
-                return
-        else:
-            path_for_conversion = file_path
-
-        pdf_path = convert_pptx_to_pdf(path_for_conversion)
-        if pdf_path:
-            logging.info(f"✔ Successfully converted to PDF: {pdf_path}")
-        else:
-            logging.info(f"❌ PDF conversion failed for {filename}.")
-
-    except FileNotFoundError as e:
-        print(f"❌ Dependency Error for {filename}: {e}", file=sys.stderr)
-    except Exception as e:
-        print(f"❌ An unexpected error occurred with {filename}: {e}", file=sys.stderr)
+def handle_pdf_conversion(path, instances=None):
+    """
+    Orchestrates conversion for a file or all valid files in a directory.
+    Files are converted in batches by several LibreOffice instances at once.
+    """
+    from tqdm import tqdm
+    from app.file_handlers.conversions import convert_files
 
-def handle_pdf_conversion(path):
-    """Orchestrates conversion for a file or all valid files in a directory."""
     if not os.path.exists(path):
         print(f"❌ Error: Path not found: {path}")
         return
 
     if os.path.isdir(path):
         print(f"-> Searching for PowerPoint files in directory: {path}...")
-        ppt_files = [
-            os.path.join(root, file)
-            for root, _, files in os.walk(path)
-            for file in files
-            if file.lower().endswith(('.ppt', '.pptx'))
-        ]
+        from app.scanner import scan_directory
+        ppt_files = list(scan_directory(path, extensions=(".ppt", ".pptx")))
 
         if not ppt_files:
             print("   -> No PowerPoint files found to convert.")
             return
 
         print(f"   -> Found {len(ppt_files)} file(s). Starting conversion...")
-        for file_path in tqdm(ppt_files, desc="Converting", unit="file"):
-            _convert_single_file_to_pdf(file_path)
+    elif path.lower().endswith(('.ppt', '.pptx')):
+        ppt_files = [path]
+    else:
+        return
+
+    try:
+        with tqdm(total=len(ppt_files), desc="Converting", unit="file") as pbar:
+            results = convert_files(ppt_files, "pdf", instances=instances, callback=pbar.update)
+    except FileNotFoundError as e:
+        print(f"❌ Dependency Error: {e}", file=sys.stderr)
+        return
 
-    else: # It's a single file
-        _convert_single_file_to_pdf(path)
+    for file_path, pdf_path in results.items():
+        if pdf_path:
+            logging.info(f"✔ Successfully converted to PDF: {pdf_path}")
+        else:
+            print(f"❌ PDF conversion failed for {os.path.basename(file_path)}.", file=sys.stderr)
+    converted = sum(1 for pdf_path in results.values() if pdf_path)
+    print(f"✔ Converted {converted} of {len(results)} file(s) to PDF.")
+
+def handle_url_batch(source, drivers=None):
+    """Scrapes every URL listed in a file (or stdin, with '-') using a pool of reused browsers."""
+    from tqdm import tqdm
+    from app.web_scraper import read_url_list, scrape_urls, get_save_directory
+
+    try:
+        urls = read_url_list(source)
+    except OSError as e:
+        print(f"❌ Error: Could not read the URL list: {e}", file=sys.stderr)
+        return
+    if not urls:
+        print("   -> No URLs found to scrape.")
+        return
+
+    print(f"-> Scraping {len(urls)} URL(s) into {get_save_directory()}...")
+    with tqdm(total=len(urls), desc="Scraping", unit="page") as pbar:
+        results = scrape_urls(urls, drivers=drivers, callback=pbar.update)
+
+    failed = [url for url, saved_path in results.items() if not saved_path]
+    for url in failed:
+        print(f"❌ Could not scrape {url}", file=sys.stderr)
+    print(f"✔ Scraped {len(urls) - len(failed)} of {len(urls)} URL(s).")
+    stats.report()
+
+def handle_crawl(url, depth, workers=None, include=None, exclude=None, restart=False):
+    """Crawls a site from url and saves its pages as Markdown, one file per page."""
+    from tqdm import tqdm
+    from app.crawler import crawl, INDEX_FILE
+    from app.web_scraper import get_save_directory, sanitize_filename
+    from urllib.parse import urlsplit
+
+    output_dir = os.path.join(get_save_directory(), sanitize_filename(urlsplit(url).netloc))
+    print(f"-> Crawling {url} up to {depth} link(s) deep into {output_dir}...")
+    with tqdm(desc="Crawling", unit="page") as pbar:
+        def page_done(page_url, saved_path):
+            pbar.update()
+            pbar.set_postfix_str(page_url[-40:])
+        state = crawl(url, depth, output_dir, workers=workers, include=include or (), exclude=exclude or (),
+                      restart=restart, callback=page_done)
+
+    saved = sum(1 for page in state["done"].values() if page["file"])
+    print(f"✔ Saved {saved} of {len(state['done'])} page(s). Index: {os.path.join(output_dir, INDEX_FILE)}")
+    stats.report()
 
 def main():
     """
@@ -225,19 +428,139 @@ def main():
     parser.add_argument("-a", "--save-all", action="store_true", help="Save all output to a single file.")
     parser.add_argument("--ocr", action="store_true", help="Enable OCR for image files.")
     parser.add_argument("--ocr-mix", action="store_true", help="Enable mixed-mode OCR.")
+    parser.add_argument("--ocr-smart", action="store_true", help="Enable mixed-mode OCR only for pages whose text layer is missing or sparse.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, metavar="N", help="Number of worker processes for directories (default: CPU count).")
+    parser.add_argument("--ocr-workers", type=int, default=None, metavar="N", help="Number of pages/slides OCRed in parallel within a document.")
+    parser.add_argument("--pdf-backend", choices=BACKEND_CHOICES, default=None,
+                        help="Library used to read PDF text layers (default: the fastest one installed).")
+    parser.add_argument("--no-ocr-cache", action="store_true", help="Don't read or write the on-disk OCR cache.")
+    parser.add_argument("--lang", default=None, metavar="LANGS", help="Tesseract language(s) for OCR, e.g. 'eng' or 'eng+deu'.")
+    parser.add_argument("--psm", type=int, choices=range(1, 14), default=None, metavar="N", help="Tesseract page segmentation mode (1-13).")
+    parser.add_argument("--oem", type=int, choices=range(4), default=None, metavar="N", help="Tesseract OCR engine mode (0-3).")
+    parser.add_argument("--osd", action=argparse.BooleanOptionalAction, default=None,
+                        help="Detect the orientation and script of images before OCR (needs osd.traineddata).")
+    parser.add_argument("--no-ocr-preprocess", action="store_true", help="Hand images to Tesseract as they are, without scaling them down or skipping blank ones.")
+    parser.add_argument("--ocr-binarize", action="store_true", help="Make images black and white before OCR.")
+    parser.add_argument("--force", action="store_true", help="Re-extract every file in a directory, even if it is unchanged since the last run.")
+    parser.add_argument("-o", "--output", type=str, metavar="FILE", help="Write the text to FILE instead ('-' for stdout). Implies --save-all for directories.")
+    parser.add_argument("--compress", choices=sorted(COMPRESSION_SUFFIXES), help="Compress the --save-all/--output file with gzip or xz.")
+    parser.add_argument("--serve", nargs="?", const="", default=None, metavar="ADDRESS",
+                        help="Run as an extraction server on HOST:PORT or unix:/path (default from config). Use -j for its workers.")
+    parser.add_argument("--serve-root", metavar="DIR", help="Only let --serve read files by path under DIR (needed to read them at all on a non-local address).")
+    parser.add_argument("--serve-remote-scrape", action="store_true", help="Accept /scrape requests when --serve listens on a non-local address.")
+    parser.add_argument("--max-queue", type=int, default=None, metavar="N", help="Requests --serve lets wait for a worker before answering 503.")
+    parser.add_argument("--warm-browser", action="store_true", help="Keep a browser running in --serve mode for /scrape requests.")
+    parser.add_argument("--metrics", type=str, metavar="FILE", help="Save per-stage timings and the slowest files as JSON.")
+    parser.add_argument("--profile", nargs="?", const="", default=None, metavar="FILE",
+                        help="Run under cProfile and print the hottest functions, or save the profile to FILE. Use -j 1 to include extraction.")
+    parser.add_argument("--content", choices=CONTENT_CHOICES, default=None,
+                        help="Save scraped pages whole ('full', the default) or only their main content ('article').")
+    parser.add_argument("--urls", type=str, metavar="FILE", help="Scrape every URL listed in FILE ('-' for stdin), one per line. Use -j for the number of browsers.")
+    parser.add_argument("--crawl", type=int, metavar="DEPTH", help="Crawl the site at the given URL, following same-host links up to DEPTH deep.")
+    parser.add_argument("--include", action="append", metavar="PATTERN",
+                        help="Only process files matching this glob (e.g. 'reports/*.pdf'); with --crawl, only follow paths matching this robots.txt-style pattern (repeatable).")
+    parser.add_argument("--exclude", action="append", metavar="PATTERN",
+                        help="Skip files and folders matching this glob; with --crawl, never follow paths matching this pattern (repeatable).")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted directory run instead of starting it over.")
+    parser.add_argument("--file-timeout", type=float, default=None, metavar="SECONDS",
+                        help="Stop extracting a file after this long and record it as failed (directories only).")
+    parser.add_argument("--max-memory", type=float, default=None, metavar="MB",
+                        help="Stop extracting a file whose worker uses more memory than this (directories only).")
+    parser.add_argument("--no-dedupe", action="store_true", help="Extract identical copies of a file separately instead of once.")
+    parser.add_argument("--max-depth", type=int, default=None, metavar="N", help="Only go N folder levels deep into a directory (0 = its own files only).")
     parser.add_argument("--convert", type=str, metavar="FORMAT", help="Convert a file to the specified format (e.g., 'pdf').")
     args = parser.parse_args()
 
+    if args.output == "-":
+        # Keep stdout clean for the extracted text; all messages go to stderr
+        sys.stdout = sys.stderr
+    if args.output:
+        args.save_all = True
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
+    for name in ("file_timeout", "max_memory"):
+        if getattr(args, name) is not None and getattr(args, name) <= 0:
+            parser.error(f"--{name.replace('_', '-')} must be positive.")
+    if args.max_depth is not None and args.max_depth < 0:
+        parser.error("--max-depth can't be negative.")
+    if args.ocr_workers is not None and args.ocr_workers < 1:
+        parser.error("--ocr-workers must be at least 1.")
+    configure_ocr(workers=args.ocr_workers, cache=False if args.no_ocr_cache else None, lang=args.lang, psm=args.psm, oem=args.oem,
+                  osd=args.osd, preprocess=False if args.no_ocr_preprocess else None, binarize=True if args.ocr_binarize else None)
+    configure_pdf_backend(args.pdf_backend)
+    configure_content(args.content)
+    try:
+        resolve_pdf_backend()
+    except EnvironmentError as e:
+        parser.error(str(e))
+
     # Setup logging based on --debug flag OR LOGS config from the start.
     if args.debug or LOGS:
         setup_logging(debug_mode=args.debug)
 
+    if args.metrics or args.profile is not None:
+        return run_measured(lambda: run(args, parser), metrics_path=args.metrics, profile_path=args.profile)
+    return run(args, parser)
+
+def run_measured(func, metrics_path=None, profile_path=None):
+    """
+    Runs func, optionally under cProfile, then writes the per-stage timings to
+    metrics_path. profile_path '' prints the hottest functions instead of saving
+    the profile. Only this process is profiled, not the --jobs workers.
+    """
+    import time
+    profiler = None
+    if profile_path is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(func) if profiler else func()
+    finally:
+        wall_seconds = time.perf_counter() - start
+        if profiler and profile_path:
+            profiler.dump_stats(profile_path)
+            print(f"✔ Profile saved to {profile_path} (open it with 'python -m pstats').", file=sys.stderr)
+        elif profiler:
+            import pstats
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(25)
+        if metrics_path:
+            stats.write_metrics(metrics_path, wall_seconds)
+            print(f"✔ Metrics saved to {metrics_path}", file=sys.stderr)
+
+def run(args, parser):
+    """Runs the mode selected on the command line. Returns 'cli' or 'interactive'."""
+    if args.serve is not None:
+        from app.server import serve
+        if args.max_queue is not None and args.max_queue < 0:
+            parser.error("--max-queue can't be negative.")
+        try:
+            serve(args.serve or None, workers=args.jobs, max_queue=args.max_queue, warm_browser=args.warm_browser,
+                  path_root=args.serve_root, remote_scrape=args.serve_remote_scrape or None)
+        except (OSError, ValueError) as e:
+            print(f"❌ Could not start the server: {e}", file=sys.stderr)
+        return "cli"
+
+    if args.crawl is not None:
+        if not args.path or not args.path.startswith("http"):
+            parser.error("--crawl needs a URL to start from.")
+        if args.crawl < 0:
+            parser.error("--crawl DEPTH can't be negative.")
+        handle_crawl(args.path, args.crawl, workers=args.jobs, include=args.include, exclude=args.exclude, restart=args.force)
+        return "cli"
+
+    if args.urls:
+        handle_url_batch(args.urls, drivers=args.jobs)
+        return "cli"
+
     if args.convert:
         if not args.path:
             print("❌ Error: The --convert flag requires a file path.")
             return "cli"
         if args.convert.lower() == 'pdf':
-            handle_pdf_conversion(args.path)
+            handle_pdf_conversion(args.path, instances=args.jobs)
         else:
             print(f"❌ Error: Unsupported conversion format '{args.convert}'. Only 'pdf' is supported.")
         return "cli"
@@ -248,7 +571,11 @@ def main():
             return "cli"
 
         if args.path.startswith("http"):
-            scrape_and_save(args.path)
+            from app.web_scraper import scrape_and_save
+            saved_path = scrape_and_save(args.path)
+            # A downloaded document (PDF, deck...) goes straight on to extraction
+            if saved_path and os.path.splitext(saved_path)[1].lower() in DOCUMENT_EXTENSIONS:
+                process_single_file(saved_path, args.ocr, args.ocr_mix, args.ocr_smart, output=args.output, compression=args.compress)
             return "cli"
 
         if not os.path.exists(args.path):
@@ -256,51 +583,28 @@ def main():
             return "cli"
 
         if os.path.isdir(args.path):
-            file_list = [os.path.join(r, f) for r, _, fs in os.walk(args.path) for f in fs]
-            total_steps = get_total_steps(file_list)
-            all_texts = []
-
-            with tqdm(total=total_steps, desc="Processing Pages/Slides", unit="step") as pbar:
-                for file_path in file_list:
-                    pbar.set_description(f"-> Analyzing {os.path.basename(file_path)}")
-                    text = process_file(file_path, args.ocr, args.ocr_mix, callback=pbar.update)
-                    if text:
-                        if args.save_all:
-                            all_texts.append(f"### {file_path} ###\n{text}\n\n")
-                        else:
-                            output_path = get_output_path(file_path)
-                            save_text_to_file(output_path, text)
-
-            if args.save_all and all_texts:
-                output_file = os.path.join(args.path, "all_extracted_text.txt")
-                save_text_to_file(output_file, "\n".join(all_texts))
-                print(f"\n✅ All text combined and saved to: {output_file}")
+            process_directory(args.path, args.ocr, args.ocr_mix, args.ocr_smart, save_all=args.save_all, jobs=args.jobs, force=args.force,
+                              output=args.output, compression=args.compress, include=args.include or (), exclude=args.exclude or (),
+                              max_depth=args.max_depth, dedupe=not args.no_dedupe, resume=args.resume,
+                              timeout=args.file_timeout, max_memory=args.max_memory)
 
         else: # It's a file
-            file_ext = os.path.splitext(args.path)[1].lower()
-
-            # Check if it's a file type that supports page-by-page progress
-            if file_ext in ['.pdf', '.pptx']:
-                total_steps = get_total_steps([args.path])
-                with tqdm(total=total_steps, desc=f"-> Analyzing {os.path.basename(args.path)}", unit="step") as pbar:
-                    text = process_file(args.path, args.ocr, args.ocr_mix, callback=pbar.update)
-                    if text:
-                        output_path = get_output_path(args.path)
-                        save_text_to_file(output_path, text)
-            else:
-                print(f"Processing file: {args.path}")
-                text = process_file(args.path, args.ocr, args.ocr_mix)
-                if text:
-                    output_path = get_output_path(args.path)
-                    save_text_to_file(output_path, text)
+            process_single_file(args.path, args.ocr, args.ocr_mix, args.ocr_smart, output=args.output, compression=args.compress)
 
         return "cli"
     else:
         run_interactive_menu()
         return "interactive"
 
+def _writes_to_stdout(argv):
+    """Checks the raw arguments for '-o -' / '--output=-' before argparse runs."""
+    return any(
+        arg in ("-o-", "--output=-") or (arg in ("-o", "--output") and next_arg == "-")
+        for arg, next_arg in zip(argv, argv[1:] + [None])
+    )
+
 if __name__ == "__main__":
-    print(f"\nTextNomNom v{VERSION} - 0xQan\n")
+    print(f"\nTextNomNom v{VERSION} - 0xQan\n", file=sys.stderr if _writes_to_stdout(sys.argv[1:]) else sys.stdout)
     try:
         run_mode = main()
         if run_mode == "cli":
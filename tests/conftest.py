@@ -0,0 +1,47 @@
+# tests/conftest.py
+
+import http.server
+import os
+import sys
+import threading
+
+import pytest
+
+# Run from anywhere: the app package lives in the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _SiteHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        page = self.server.pages.get(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+        content_type, body = page
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve_site():
+    """Returns a function that serves {path: (content_type, body)} on a free local port and returns its base URL."""
+    servers = []
+
+    def start(pages):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _SiteHandler)
+        server.pages = pages
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
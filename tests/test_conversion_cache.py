@@ -0,0 +1,47 @@
+# tests/test_conversion_cache.py
+
+import os
+
+import pytest
+
+from app.file_handlers import conversion_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(conversion_cache, "CONVERSION_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(conversion_cache, "CONVERSION_CACHE_MAX_MB", 0.01)  # ~10 KB
+    return tmp_path
+
+
+def _convert(tmp_path, name, size):
+    """Caches a fake conversion of a new source file; returns (index path, cached path)."""
+    source = tmp_path / f"{name}.ppt"
+    source.write_bytes(name.encode() * 10)
+    digest = conversion_cache.source_digest(str(source))
+    with conversion_cache.temporary_directory() as temp_dir:
+        converted = os.path.join(temp_dir, f"{name}.pptx")
+        with open(converted, "wb") as f:
+            f.write(b"x" * size)
+        return conversion_cache._index_path(str(source)), conversion_cache.put(digest, converted)
+
+
+def test_index_entries_go_with_their_evicted_files(cache):
+    first_index, first = _convert(cache, "first", 6000)
+    os.utime(first, (1, 1))  # Least recently used
+    second_index, second = _convert(cache, "second", 6000)
+
+    assert not os.path.exists(first) and not os.path.exists(first_index)
+    assert os.path.exists(second) and os.path.exists(second_index)
+
+
+def test_index_entries_of_failed_conversions_are_pruned(cache):
+    failed = cache / "failed.ppt"
+    failed.write_bytes(b"broken")
+    conversion_cache.source_digest(str(failed))  # Hashed, but never converted
+    failed_index = conversion_cache._index_path(str(failed))
+    assert os.path.exists(failed_index)
+
+    index, converted = _convert(cache, "fine", 100)
+    assert not os.path.exists(failed_index)
+    assert os.path.exists(index) and os.path.exists(converted)
@@ -0,0 +1,44 @@
+# tests/test_crawler.py
+
+import json
+import os
+
+import pytest
+
+from app.crawler import STATE_FILE, crawl, page_file_name
+
+SITE = {
+    "/": '<a href="/docs/a.html">A (html)</a> <a href="/docs/a">A</a>',
+    "/docs/a.html": "<h1>Page A html</h1>",
+    "/docs/a": "<h1>Page A bare</h1>",
+}
+
+
+@pytest.fixture
+def site(serve_site):
+    return serve_site({
+        path: ("text/html; charset=utf-8", f"<html><head><title>{path}</title></head><body>{body}</body></html>")
+        for path, body in SITE.items()
+    })
+
+
+def test_colliding_urls_get_their_own_files(site, tmp_path):
+    output_dir = str(tmp_path)
+    assert page_file_name(site + "docs/a.html") == page_file_name(site + "docs/a")
+
+    state = crawl(site, 1, output_dir, workers=2, delay=0)
+    html_file, bare_file = state["done"][site + "docs/a.html"]["file"], state["done"][site + "docs/a"]["file"]
+    assert html_file != bare_file
+    with open(os.path.join(output_dir, html_file), encoding="utf-8") as f:
+        assert "Page A html" in f.read()
+    with open(os.path.join(output_dir, bare_file), encoding="utf-8") as f:
+        assert "Page A bare" in f.read()
+
+    with open(os.path.join(output_dir, "crawl_index.md"), encoding="utf-8") as f:
+        index = f.read()
+    assert f"({html_file.replace(os.sep, '/')})" in index and f"({bare_file.replace(os.sep, '/')})" in index
+
+    # The names are kept, so a resumed crawl writes each page to the same file
+    with open(os.path.join(output_dir, STATE_FILE), encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    assert files[site + "docs/a.html"] == html_file and files[site + "docs/a"] == bare_file
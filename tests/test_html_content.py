@@ -0,0 +1,33 @@
+# tests/test_html_content.py
+
+import os
+
+from bs4 import BeautifulSoup
+from markdownify import markdownify
+
+from app.html_content import html_to_markdown
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "article_page.html")
+
+
+def _page():
+    with open(FIXTURE, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_full_mode_matches_plain_markdownify():
+    page = _page()
+    expected = markdownify(str(BeautifulSoup(page, "html.parser").body))
+    assert html_to_markdown(BeautifulSoup(page, "html.parser"), mode="full") == expected
+
+
+def test_article_mode_keeps_only_the_main_content():
+    full = html_to_markdown(BeautifulSoup(_page(), "html.parser"), mode="full")
+    article = html_to_markdown(BeautifulSoup(_page(), "html.parser"), mode="article")
+
+    assert len(article) < len(full)
+    assert "Tuning the soffice worker pool\n===" in article and "retried one file at a time" in article
+    for furniture in ("Archive", "Popular posts", "Copyright", "enable JavaScript", "chart label",
+                      "Subscribe", "Embedded player", "Pool diagram"):
+        assert furniture in full
+        assert furniture not in article
@@ -0,0 +1,54 @@
+# tests/test_http_fetch.py
+
+import os
+
+from bs4 import BeautifulSoup
+
+from app.http_fetch import MIN_STATIC_TEXT_CHARS, fetch_url, needs_javascript
+
+TEXT = "Plain server-rendered text that reads fine without running any script. " * 4
+PAGES = {
+    "/static": ("text/html; charset=utf-8",
+                f"<html><head><title>Static page</title><script src='/a.js'></script></head><body><p>{TEXT}</p></body></html>"),
+    "/shell": ("text/html", "<html><body><div id='app'>Loading</div><script src='/app.js'></script></body></html>"),
+    "/noscript": ("text/html", f"<html><body><noscript>Please enable JavaScript.</noscript><p>{TEXT}</p></body></html>"),
+    "/paper": ("application/octet-stream", b"%PDF-1.4\n%fake\n"),
+}
+
+
+def _soup(html):
+    return BeautifulSoup(html, "html.parser")
+
+
+def test_needs_javascript():
+    assert not needs_javascript(_soup(PAGES["/static"][1]))
+    assert needs_javascript(_soup(PAGES["/shell"][1]))
+    assert needs_javascript(_soup(PAGES["/noscript"][1]))
+    # Little text is fine as long as there is nothing to run
+    assert not needs_javascript(_soup("<html><body><p>Short page.</p></body></html>"))
+    assert len(TEXT) > MIN_STATIC_TEXT_CHARS
+
+
+def test_static_pages_and_documents_are_saved_without_a_browser(serve_site, tmp_path):
+    site = serve_site(PAGES)
+
+    page_path = fetch_url(site + "static", str(tmp_path))
+    assert os.path.basename(page_path) == "Static page.md"
+    with open(page_path, encoding="utf-8") as f:
+        assert TEXT.strip() in f.read()
+
+    # Sniffed from its first bytes, since the server only says octet-stream
+    pdf_path = fetch_url(site + "paper", str(tmp_path))
+    assert os.path.basename(pdf_path) == "paper.pdf"
+    with open(pdf_path, "rb") as f:
+        assert f.read() == PAGES["/paper"][1]
+
+
+def test_the_browser_is_left_to_pages_that_need_it(serve_site, tmp_path):
+    site = serve_site(PAGES)
+    assert fetch_url(site + "shell", str(tmp_path)) is None
+    assert fetch_url(site + "noscript", str(tmp_path)) is None
+    assert fetch_url(site + "missing", str(tmp_path)) is None
+    # The browser's PDF viewer path only wants documents
+    assert fetch_url(site + "static", str(tmp_path), documents_only=True) is None
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,42 @@
+# tests/test_ocr_cache.py
+
+import os
+
+import pytest
+
+from app.file_handlers import ocr_cache
+
+ENTRY = "x" * 1000
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ocr_cache, "OCR_CACHE_MAX_MB", 0.1)  # ~105 KB
+    monkeypatch.setattr(ocr_cache, "_cache_size", None)
+    monkeypatch.setattr(ocr_cache, "_written_since_scan", 0)
+    return tmp_path
+
+
+def _disk_size():
+    return sum(size for _, size, _ in ocr_cache._iter_entries())
+
+
+def test_replacing_an_entry_is_not_counted_twice(cache):
+    ocr_cache.put("a" * 64, ENTRY)
+    for _ in range(5):
+        ocr_cache.put("a" * 64, ENTRY)
+    assert ocr_cache._cache_size == _disk_size() == len(ENTRY)
+
+
+def test_entries_written_by_other_processes_count_towards_the_limit(cache):
+    limit = ocr_cache.OCR_CACHE_MAX_MB * 1024 * 1024
+    for n in range(400):
+        ocr_cache.put(ocr_cache.make_key("here", n), ENTRY)
+        # Another worker writing to the same cache directory, unseen by this process
+        other = ocr_cache._entry_path(ocr_cache.make_key("other", n))
+        os.makedirs(os.path.dirname(other), exist_ok=True)
+        with open(other, "w", encoding="utf-8") as f:
+            f.write(ENTRY)
+        # The other worker's share of the overshoot is at most what it wrote between our scans
+        assert _disk_size() <= limit * (1 + ocr_cache.RESCAN_FRACTION) + 2 * len(ENTRY)
@@ -0,0 +1,114 @@
+# tests/test_ocr_utils.py
+
+import threading
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.file_handlers import ocr_utils
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """OCR settings each test can change through configure_ocr, without the cache."""
+    monkeypatch.setattr(ocr_utils, "_settings", dict(ocr_utils._settings, cache=False, preprocess=True, binarize=False,
+                                                     psm=None, oem=None, osd=False))
+    return ocr_utils._settings
+
+
+def _scan(size=(1200, 1600), mode="RGB"):
+    """A page with a few lines of dark 'text' on a light background."""
+    image = Image.new(mode, size, "#f4efe0")
+    draw = ImageDraw.Draw(image)
+    for top in range(100, size[1] - 100, 120):
+        draw.rectangle((80, top, size[0] - 80, top + 30), fill="#202020")
+    return image
+
+
+def test_large_color_scans_become_grayscale_at_the_target_dpi(settings):
+    image, dpi = ocr_utils.prepare_image(_scan(), dpi=600)
+    assert image.mode == "L" and image.size == (600, 800)
+    assert dpi == ocr_utils.OCR_TARGET_DPI
+
+
+def test_images_without_a_resolution_are_capped_in_size(settings, monkeypatch):
+    monkeypatch.setattr(ocr_utils, "OCR_MAX_IMAGE_SIDE", 400)
+    image, dpi = ocr_utils.prepare_image(_scan())
+    assert image.size == (300, 400) and dpi is None
+
+
+def test_tiny_and_blank_images_are_skipped(settings):
+    icon = _scan().resize((ocr_utils.OCR_MIN_IMAGE_SIDE - 1, 40))
+    assert ocr_utils.prepare_image(icon) == (None, None)
+    assert ocr_utils.prepare_image(Image.new("RGB", (800, 600), "white")) == (None, None)
+
+
+def test_transparency_is_flattened_onto_white(settings):
+    logo = Image.new("RGBA", (200, 100), (0, 0, 0, 0))
+    ImageDraw.Draw(logo).rectangle((20, 40, 180, 60), fill=(0, 0, 0, 255))
+    image, _ = ocr_utils.prepare_image(logo)
+    assert image.getpixel((5, 5)) == 255 and image.getpixel((100, 50)) == 0
+
+
+def test_binarize_leaves_only_black_and_white(settings):
+    ocr_utils.configure_ocr(binarize=True)
+    image, _ = ocr_utils.prepare_image(_scan(size=(400, 500)))
+    histogram = image.histogram()
+    assert [level for level, count in enumerate(histogram) if count] == [0, 255]
+
+
+def test_files_that_need_no_work_are_passed_to_tesseract_as_they_are(settings, tmp_path):
+    path = str(tmp_path / "page.png")
+    _scan(size=(400, 500), mode="L").save(path, dpi=(300, 300))
+    prepared, dpi = ocr_utils.prepare_image(path)
+    assert prepared == path and dpi == pytest.approx(300, abs=0.01)  # PNGs store dots per metre
+
+
+def test_tesseract_options(settings):
+    assert ocr_utils._tesseract_config() == ""
+    ocr_utils.configure_ocr(osd=True)
+    assert ocr_utils._tesseract_config(dpi=300) == "--psm 1 --dpi 300"
+    # An explicit page mode wins over OSD
+    ocr_utils.configure_ocr(psm=6, oem=1)
+    assert ocr_utils._tesseract_config() == "--psm 6 --oem 1"
+
+
+def test_ocr_image_applies_the_settings(settings, monkeypatch):
+    import pytesseract
+
+    calls = []
+    monkeypatch.setattr(pytesseract, "image_to_string", lambda image, lang, config: calls.append((image, lang, config)) or "text")
+    ocr_utils.configure_ocr(lang="eng+deu", psm=6)
+
+    assert ocr_utils.ocr_image(_scan(), dpi=600) == "text"
+    image, lang, config = calls[-1]
+    assert image.mode == "L" and lang == "eng+deu" and config == "--psm 6 --dpi 300"
+
+    # Blank images never reach Tesseract
+    assert ocr_utils.ocr_image(Image.new("RGB", (800, 600), "white")) == ""
+    assert len(calls) == 1
+
+    # Without preprocessing, Tesseract gets the image untouched
+    ocr_utils.configure_ocr(preprocess=False)
+    original = _scan()
+    ocr_utils.ocr_image(original, dpi=600)
+    assert calls[-1] == (original, "eng+deu", "--psm 6 --dpi 600")
+
+
+def test_map_in_order_stops_pulling_items_behind_a_slow_one():
+    pulled = []
+    pulled_while_first_ran = []
+
+    def items():
+        for i in range(50):
+            pulled.append(i)
+            yield i
+
+    def work(i):
+        if i == 0:
+            threading.Event().wait(0.3)  # Every later item finishes meanwhile
+            pulled_while_first_ran.append(len(pulled))
+        return i * 10
+
+    assert list(ocr_utils.map_in_order(work, items(), max_workers=2)) == [i * 10 for i in range(50)]
+    assert pulled_while_first_ran == [4]  # 2 * max_workers
@@ -0,0 +1,77 @@
+# tests/test_pdf_handler.py
+
+import contextlib
+
+from app.file_handlers import ocr_utils, pdf_handler
+
+PAGES = 40
+
+
+class _FakeReader:
+    page_count = PAGES
+
+    def __init__(self, f):
+        self.pages = [object() for _ in range(self.page_count)]
+
+
+def _fake_pdf(tmp_path, monkeypatch, passes):
+    """Fakes a PDF whose every third page needs OCR; passes counts the pages read per pass over its text layer."""
+    pdf_path = tmp_path / "scan.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4\n")
+
+    @contextlib.contextmanager
+    def fake_open_pdf_text(file_path):
+        passes.append(0)
+
+        def texts():
+            for page_num in range(1, PAGES + 1):
+                passes[-1] += 1
+                yield f"text of page {page_num}"
+
+        yield PAGES, texts()
+
+    def fake_rasterize(file_path, page_numbers):
+        for page_num in page_numbers:
+            yield page_num, str(tmp_path / f"page-{page_num}.png")
+
+    monkeypatch.setattr(pdf_handler, "open_pdf_text", fake_open_pdf_text)
+    monkeypatch.setattr(pdf_handler, "PdfReader", _FakeReader)
+    monkeypatch.setattr(pdf_handler, "check_pdf_ocr_dependencies", lambda: None)
+    monkeypatch.setattr(pdf_handler, "cache_enabled", lambda: False)
+    monkeypatch.setattr(pdf_handler, "iter_rasterized_pages", fake_rasterize)
+    monkeypatch.setattr(pdf_handler, "ocr_image", lambda image_path, **kwargs: f"ocr of {image_path}")
+    # Every third page needs OCR
+    monkeypatch.setattr(pdf_handler, "page_needs_ocr", lambda page, text: int(text.split()[-1]) % 3 == 0)
+    monkeypatch.setitem(ocr_utils._settings, "workers", 2)
+    return str(pdf_path)
+
+
+def test_smart_ocr_streams_records_before_the_last_page_is_read(tmp_path, monkeypatch):
+    passes = []
+    pdf_path = _fake_pdf(tmp_path, monkeypatch, passes)
+    monkeypatch.setattr(pdf_handler, "OCR_RASTER_BATCH_SIZE", 4)
+
+    steps = []
+    records = pdf_handler.iter_pdf_pages(pdf_path, ocr_smart=True, callback=lambda: steps.append(1))
+    first = next(records)
+    assert first.page_num == 1 and first.source == "text"
+    assert passes[0] < PAGES
+
+    rest = list(records)
+    ocr_pages = [record.page_num for record in rest if record.source == "ocr"]
+    assert ocr_pages == list(range(3, PAGES + 1, 3))
+    page_order = [record.page_num for record in [first] + rest]
+    assert page_order == sorted(page_order)
+    # One progress step per page, from a single pass over the text layer
+    assert len(steps) == PAGES
+    assert passes == [PAGES]
+
+
+def test_smart_ocr_ocrs_pages_pypdf2_cannot_see(tmp_path, monkeypatch):
+    pdf_path = _fake_pdf(tmp_path, monkeypatch, [])
+    monkeypatch.setattr(_FakeReader, "page_count", PAGES - 2)
+
+    records = list(pdf_handler.iter_pdf_pages(pdf_path, ocr_smart=True))
+    assert [record.page_num for record in records if record.source == "text"] == list(range(1, PAGES + 1))
+    ocr_pages = [record.page_num for record in records if record.source == "ocr"]
+    assert ocr_pages == list(range(3, PAGES - 2, 3)) + [PAGES - 1, PAGES]
@@ -0,0 +1,87 @@
+# tests/test_server.py
+
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from app.server import ExtractionHandler, _ThreadingHTTPServer, _allowed_path, _is_loopback
+
+
+def test_paths_are_only_served_locally_without_a_root(tmp_path):
+    document = str(tmp_path / "a.pdf")
+    assert _allowed_path(SimpleNamespace(path_root=None, local_only=True), document) == document
+    assert _allowed_path(SimpleNamespace(path_root=None, local_only=False), document) is None
+
+
+def test_paths_must_stay_under_the_root(tmp_path):
+    root = tmp_path / "shared"
+    (root / "docs").mkdir(parents=True)
+    (root / "docs" / "a.pdf").write_bytes(b"%PDF")
+    (tmp_path / "secret.pdf").write_bytes(b"%PDF")
+    os.symlink(tmp_path / "secret.pdf", root / "link.pdf")
+    server = SimpleNamespace(path_root=os.path.realpath(root), local_only=False)
+
+    inside = os.path.join(server.path_root, "docs", "a.pdf")
+    assert _allowed_path(server, "docs/a.pdf") == inside
+    assert _allowed_path(server, inside) == inside
+    assert _allowed_path(server, "../secret.pdf") is None
+    assert _allowed_path(server, str(tmp_path / "secret.pdf")) is None
+    assert _allowed_path(server, "link.pdf") is None
+
+
+def test_loopback_hosts():
+    assert _is_loopback("127.0.0.1") and _is_loopback("localhost")
+    assert not _is_loopback("0.0.0.0")
+
+
+@pytest.fixture
+def running_server():
+    """A server on a free local port whose jobs are stubbed out; yields (server, post)."""
+    server = _ThreadingHTTPServer(("127.0.0.1", 0), ExtractionHandler)
+    server.path_root, server.local_only, server.scrape_allowed = None, True, True
+    server.scraped = []
+    server.admit, server.release = (lambda: True), (lambda: None)
+    server.extract = lambda path, flags: None
+    server.scrape = lambda url: server.scraped.append(url)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def post(route, body):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_address[1]}{route}", data=body,
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    yield server, post
+    server.shutdown()
+    server.server_close()
+
+
+def test_scrape_is_refused_unless_allowed(running_server):
+    server, post = running_server
+    server.scrape_allowed = False
+    status, body = post("/scrape", b'{"url": "http://example.com/"}')
+    assert status == 403 and "--serve-remote-scrape" in json.loads(body)["error"]
+    assert server.scraped == []
+
+    server.scrape_allowed = True
+    status, _ = post("/scrape", b'{"url": "http://example.com/"}')
+    assert status == 502  # The stub saves nothing
+    assert server.scraped == ["http://example.com/"]
+
+
+@pytest.mark.parametrize("body", [b"[1, 2]", b'"a.pdf"', b"3", b"{not json"])
+def test_json_bodies_must_be_objects(running_server, body):
+    _, post = running_server
+    status, response = post("/extract", body)
+    assert status == 400 and "error" in json.loads(response)
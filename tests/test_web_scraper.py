@@ -0,0 +1,80 @@
+# tests/test_web_scraper.py
+
+import os
+import threading
+
+import pytest
+
+from app import web_scraper
+
+ARTICLE = "<p>" + "A static page with plenty of text that needs no browser at all. " * 5 + "</p>"
+PAGES = {
+    "/static": ("text/html", f"<html><head><title>Static</title></head><body>{ARTICLE}</body></html>"),
+    "/app": ("text/html", '<html><head><title>App</title></head><body><div id="root"></div>'
+                          '<script src="/app.js"></script></body></html>'),
+    "/report.pdf": ("application/pdf", b"%PDF-1.4\n%fake\n"),
+}
+
+
+class _FakeDriver:
+    """Stands in for a browser: every page "renders" to a paragraph naming its URL."""
+    name = "fake"
+
+    def __init__(self):
+        self.current_url = self.title = None
+        self.quit_calls = 0
+
+    def get(self, url):
+        self.current_url, self.title = url, "Rendered " + url.rsplit("/", 1)[-1]
+
+    def execute_script(self, script, selector):
+        return f"<body><p>rendered by the browser: {self.current_url}</p></body>"
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+@pytest.fixture
+def site(serve_site, tmp_path, monkeypatch):
+    monkeypatch.setattr(web_scraper, "SCRAPED_FILES_DIR", str(tmp_path))
+    monkeypatch.setattr(web_scraper, "SCRAPE_HTTP_FIRST", True)
+    return serve_site(PAGES)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_batch_uses_the_browser_only_for_pages_that_need_it(site, tmp_path):
+    urls = [site + "static", site + "app", site + "report.pdf"]
+    started, done = [], []
+    lock = threading.Lock()
+
+    def factory():
+        with lock:
+            started.append(_FakeDriver())
+            return started[-1]
+
+    results = web_scraper.scrape_urls(urls, drivers=2, callback=lambda: done.append(1), driver_factory=factory)
+
+    assert list(results) == urls and all(results.values())
+    assert all(os.path.dirname(path) == str(tmp_path) for path in results.values())
+    assert "plenty of text" in _read(results[site + "static"])
+    assert _read(results[site + "app"]) == f"rendered by the browser: {site}app"
+    with open(results[site + "report.pdf"], "rb") as f:
+        assert f.read() == PAGES["/report.pdf"][1]
+    # Only the JavaScript page needed a browser, which is quit at the end
+    assert len(started) == 1 and started[0].quit_calls == 1
+    assert len(done) == len(urls)
+
+
+def test_urls_left_over_when_no_browser_starts_are_reported(site):
+    def factory():
+        raise RuntimeError("no browser installed")
+
+    done = []
+    urls = [site + "app", site + "static"]
+    results = web_scraper.scrape_urls(urls, drivers=1, callback=lambda: done.append(1), driver_factory=factory)
+    assert results == {url: None for url in urls}
+    assert len(done) == len(urls)